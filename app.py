@@ -11,10 +11,13 @@
 
 from webapp import create_app
 
-# Create a Flask application
+# Create a Flask application. A preforking server creates it once in its master process and forks
+# the workers from it, e.g. `gunicorn --preload --workers 1 --threads 8 app:application` (with PRELOAD_VISUALISER).
+# The render jobs and the in-memory artifacts live in the worker process that queued them, so the status 
+# of a job is only known there: use a single worker process, or route every job id to the same worker.
 application = create_app() 
 
 if __name__ == "__main__":
 
-    # Run the flask application
-    application.run(host='0.0.0.0', debug=False)  
+    # Run the flask application. Requests are handled in threads, the visualiser renders without global state.
+    application.run(host='0.0.0.0', debug=False, threaded=True)  
@@ -0,0 +1,394 @@
+###################################################################
+# Script Name	 : "BENCHMARK.PY"
+# Description	 : Benchmarks of the static data reader, simulator,
+#                  visualiser and webapp on synthetic stop sets of
+#                  1x, 10x and 100x the berlin stops, compared to a
+#                  stored baseline to catch regressions.
+# Args           : --scales, --repeat, --max-time, --baseline,
+#                  --update, --tolerance, --output, --filter
+# Author       	 : Floris Remmen
+# Email          : floris.remmen@gmail.com
+# Date           : "18 October 2026"
+###################################################################
+
+import warnings
+warnings.simplefilter(action='ignore', category=FutureWarning)
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+import tracemalloc
+from statistics import median
+
+from benchmarks.synthetic import write_scaled_stops
+
+# the default baseline, written with --update on the machine that the benchmarks are compared on
+default_baseline_file = os.path.join('benchmarks', 'baseline.json')
+
+# bounding boxes (x1, y1, x2, y2) of the simulations: a few blocks around Alexanderplatz,
+# the default of the trigger page, and all of berlin
+bounding_boxes = {
+    'small': (13.405, 52.518, 13.42, 52.527),
+    'medium': (13.34014892578125, 52.5279190800025, 13.506317138671875, 52.562995039558004),
+    'city': (13.088, 52.338, 13.761, 52.675)
+}
+
+# numbers of requests of the simulations
+numbers_of_requests = (100, 10000, 1000000)
+
+# the batch simulations: scenarios of the small and medium bounding box, shifted over berlin, with a few requests each
+batch_sizes = ('small', 'medium')
+number_of_scenarios = 1000
+requests_per_scenario = 6
+
+# differences below these are noise, never a regression
+min_seconds = 0.001
+min_megabytes = 1.0
+
+# the most seconds a new process may take to start: to import the webapp, to create the app on the
+# stop set (with the parsed arrays cached), and to create it with the plotting stack preloaded
+cold_start_budgets = {
+    'cold_import_webapp': 1.0,
+    'cold_create_app': 1.5,
+    'cold_create_app_preloaded': 3.0
+}
+
+def measure(function, setup=None, repeat: int = 5, max_time: float = 2.0) -> dict:
+    """
+    Times `function` up to `repeat` times, or until `max_time` seconds have passed after the first run.
+    `setup` is called before every run, outside of the timing, and its result is passed to `function`.
+    The peak memory is measured with tracemalloc in one extra run, so it does not slow down the timed runs.
+    Returns the median and minimum seconds, the number of timed runs and the peak memory in megabytes.
+    :rtype dict
+    """
+    def run():
+        argument = setup() if setup is not None else None
+        start = time.perf_counter()
+        function(argument) if setup is not None else function()
+        return time.perf_counter() - start
+
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < repeat and (not timings or time.perf_counter() - started < max_time):
+        timings.append(run())
+
+    argument = setup() if setup is not None else None
+    tracemalloc.start()
+    try:
+        function(argument) if setup is not None else function()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'median': median(timings),
+        'min': min(timings),
+        'runs': len(timings),
+        'peak_mb': peak / 2 ** 20
+    }
+
+def measure_process(code: str, repeat: int = 5, max_time: float = 2.0) -> dict:
+    """
+    Times new python processes that run `code`, like `measure`. The peak memory is the largest
+    resident set size of the processes (from /proc, on linux), which includes the interpreter and every imported module.
+    :rtype dict
+    """
+    # the high water mark of the resident set size of the process itself (getrusage would include the parent it forked from)
+    code += "\nprint(next(line for line in open('/proc/self/status') if line.startswith('VmHWM')).split()[1])"
+    peaks = []
+
+    def run():
+        output = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True).stdout
+        # the resident set size in kilobytes, on the last line
+        peaks.append(int(output.split()[-1]) / 1024)
+
+    result = measure(run, repeat=repeat, max_time=max_time)
+    result['peak_mb'] = max(peaks)
+
+    return result
+
+def compare(results: dict, baseline: dict, tolerance: float = 0.25) -> list:
+    """
+    Compares results to the results of a baseline. A benchmark regressed if its median time or its peak memory
+    grew by more than `tolerance` (relative) and by more than the noise floor (absolute).
+    Benchmarks that are not in both are skipped. Returns (name, metric, baseline value, value) of every regression.
+    :rtype list
+    """
+    regressions = []
+    for name in sorted(results.keys() & baseline.keys()):
+        for metric, noise in (('median', min_seconds), ('peak_mb', min_megabytes)):
+            value, baseline_value = results[name][metric], baseline[name][metric]
+            if value > baseline_value * (1 + tolerance) and value - baseline_value > noise:
+                regressions.append((name, metric, baseline_value, value))
+
+    return regressions
+
+def over_budget(results: dict, budgets: dict = cold_start_budgets) -> list:
+    """
+    Returns (name, 'budget', budget, median) of every benchmark whose median time is over its budget.
+    :rtype list
+    """
+    return [
+        (name, 'budget', budgets[name.split('@')[0]], result['median'])
+        for name, result in sorted(results.items())
+        if name.split('@')[0] in budgets and result['median'] > budgets[name.split('@')[0]]
+    ]
+
+class Benchmark:
+    """
+    The benchmarks of one synthetic stop set: `scale` copies of the berlin stops, written to `directory`
+    with the bounds of berlin. Every benchmark is named `<case>@<scale>x`.
+    """
+
+    def __init__(self, directory: str, scale: int, berlin_bounds_file='data/berlin_bounds.poly',
+            berlin_stops_file='data/berlin_stops.geojson', repeat: int = 5, max_time: float = 2.0):
+        self.scale = scale
+        self.directory = os.path.join(directory, f'{scale}x')
+        self.repeat = repeat
+        self.max_time = max_time
+        os.makedirs(self.directory, exist_ok=True)
+
+        self.berlin_bounds_file = shutil.copy(berlin_bounds_file, self.directory)
+        self.berlin_stops_file = os.path.join(self.directory, 'berlin_stops.geojson')
+        self.number_of_stops = write_scaled_stops(berlin_stops_file, self.berlin_stops_file, scale)
+
+        # the parsed arrays are cached next to the synthetic files, the cold benchmarks parse into fresh directories
+        self.cache_dir = os.path.join(self.directory, 'cache')
+        self._cold_runs = 0
+
+    def __repr__(self):
+        return f"Benchmark of {self.number_of_stops} stops ({self.scale}x) in {self.directory}."
+
+    def measure(self, function, setup=None) -> dict:
+        """
+        Measures a function with the repeat and time budget of the benchmark.
+        :rtype dict
+        """
+        return measure(function, setup, repeat=self.repeat, max_time=self.max_time)
+
+    def reader(self, cache_dir: str = None):
+        """
+        Returns a StaticDataReader of the synthetic files.
+        :rtype utilities.staticdatareader.StaticDataReader
+        """
+        from utilities.staticdatareader import StaticDataReader
+
+        return StaticDataReader(self.berlin_bounds_file, self.berlin_stops_file, cache_dir=cache_dir or self.cache_dir)
+
+    def cold_cache_dir(self) -> str:
+        """
+        Returns a new, empty cache directory, so the reader parses the files.
+        :rtype str
+        """
+        self._cold_runs += 1
+        return os.path.join(self.directory, f'cold_cache_{self._cold_runs}')
+
+    def run(self, selected=lambda name: True) -> dict:
+        """
+        Runs the benchmarks whose name is selected. Returns the measurements by name.
+        :rtype dict
+        """
+        import numpy as np
+        from simulator.simulator import Simulator
+        from visualiser.visualiser import Visualiser
+        from visualiser.baselayer import BaseLayer
+        from utilities.bounding_box import BoundingBox
+        from utilities.artifactcache import MemoryArtifactCache
+        from utilities.timing import Timings
+
+        results = {}
+
+        def benchmark(case, function, setup=None, process=False):
+            name = f'{case}@{self.scale}x'
+            if selected(name):
+                if process:
+                    results[name] = measure_process(function, repeat=self.repeat, max_time=self.max_time)
+                else:
+                    results[name] = self.measure(function, setup)
+                print(format_result(name, results[name]), flush=True)
+
+        # the overhead of 100k stage timers, while timing is disabled (the default) and enabled
+        def time_stages():
+            for _ in range(100000):
+                with Timings.stage('benchmark.stage'):
+                    pass
+
+        enabled = Timings.enabled
+        for state in ('disabled', 'enabled'):
+            Timings.enabled = state == 'enabled'
+            benchmark(f'stage_timers_{state}', time_stages)
+        Timings.enabled = enabled
+
+        # reading the static data: parsing the files, and loading the parsed arrays from the cache
+        benchmark('read_static_data_cold', lambda cache_dir: self.reader(cache_dir), setup=self.cold_cache_dir)
+        static_data = self.reader()
+        benchmark('read_static_data_cached', lambda: self.reader())
+        benchmark('build_stop_index', lambda data: data.stop_index, setup=self.reader)
+
+        # simulations by number of requests and size of the bounding box
+        static_data.stop_index
+        for size, bounding_box in bounding_boxes.items():
+            for number_of_requests in numbers_of_requests:
+                simulator = Simulator(bounding_box, static_data=static_data)
+                benchmark(f'simulate_{number_of_requests}_{size}',
+                    lambda simulator=simulator, number_of_requests=number_of_requests: simulator.simulate(number_of_requests, seed=0))
+
+        # batch simulations, the same scenarios at every scale
+        rng = np.random.default_rng(0)
+        simulator = Simulator(bounding_boxes['medium'], static_data=static_data)
+        x1, y1, x2, y2 = bounding_boxes['city']
+        for size in batch_sizes:
+            width, height = np.subtract(bounding_boxes[size][2:], bounding_boxes[size][:2])
+            corners = np.c_[rng.uniform(x1, x2 - width, number_of_scenarios), rng.uniform(y1, y2 - height, number_of_scenarios)]
+            batch = np.c_[corners, corners + (width, height)]
+            benchmark(f'simulate_many_{size}', lambda batch=batch: simulator.simulate_many(batch, requests_per_scenario, seed=0))
+
+        # the visualisations of a simulation of the default trigger page, without web tiles
+        bounding_box = BoundingBox(bounding_boxes['medium'])
+        simulation_results = Simulator(bounding_box.bounding_box, static_data=static_data).simulate(1000, seed=0)
+        visualiser = Visualiser(
+            bounding_box=bounding_box,
+            simulation_results=simulation_results,
+            static_data=static_data,
+            static_path=self.directory,
+            basemap=False,
+            store=MemoryArtifactCache(max_bytes=2 ** 30)
+        )
+        benchmark('render_base_layer', lambda: BaseLayer.render(static_data, basemap=False))
+        BaseLayer.get(static_data, basemap=False)
+        benchmark('generate_overview_figure', visualiser.generate_overview_figure)
+        benchmark('generate_closeup_figure', visualiser.generate_closeup_figure)
+        benchmark('generate_gmap', visualiser.generate_gmap)
+
+        # new processes of the webapp
+        self._run_cold_start(benchmark)
+
+        # the trigger page, from the post of the form until all visualisations are rendered
+        if selected(f'trigger_page@{self.scale}x') or selected(f'trigger_page_cached@{self.scale}x'):
+            self._run_webapp(benchmark)
+
+        return results
+
+    def _run_webapp(self, benchmark):
+        """
+        Runs the benchmarks of the webapp, on an app of the synthetic files that keeps its artifacts in memory.
+        """
+        from webapp import create_app
+        from webapp.config import Config
+
+        class BenchmarkConfig(Config):
+            BERLIN_BOUNDS_FILE = self.berlin_bounds_file
+            BERLIN_STOPS_FILE = self.berlin_stops_file
+            WTF_CSRF_ENABLED = False
+            ARTIFACT_STORE = 'memory'
+            BASEMAP = False
+
+        application = create_app(BenchmarkConfig)
+        client = application.test_client()
+        job_queue = application.extensions['render_jobs']
+        x1, y1, x2, y2 = bounding_boxes['medium']
+        seeds = iter(range(1, 10 ** 9))
+
+        def post(seed):
+            response = client.post('/', data={
+                'x1_field': x1, 'y1_field': y1, 'x2_field': x2, 'y2_field': y2,
+                'number_of_requests_field': 1000, 'seed_field': seed})
+            job = job_queue.get(response.headers['Location'].rsplit('/', 1)[-1])
+            while job is not None and not job.finished:
+                time.sleep(0.001)
+            if job is not None and job.state == 'failed':
+                raise RuntimeError(job.error)
+
+        # every run is a new seed, a new simulation. The cached run posts the same inputs again.
+        benchmark('trigger_page', post, setup=lambda: next(seeds))
+        benchmark('trigger_page_cached', lambda: post(0))
+
+    def _run_cold_start(self, benchmark):
+        """
+        Runs the benchmarks of the start of new processes, after the parsed arrays of the synthetic files are cached.
+        """
+        create_app = (
+            'from webapp import create_app\n'
+            'from webapp.config import Config\n'
+            'class BenchmarkConfig(Config):\n'
+            f'    BERLIN_BOUNDS_FILE = {self.berlin_bounds_file!r}\n'
+            f'    BERLIN_STOPS_FILE = {self.berlin_stops_file!r}\n'
+            '    PRELOAD_VISUALISER = %s\n'
+            'create_app(BenchmarkConfig)'
+        )
+
+        benchmark('cold_import_webapp', 'import webapp', process=True)
+        benchmark('cold_create_app', create_app % False, process=True)
+        benchmark('cold_create_app_preloaded', create_app % True, process=True)
+
+def format_result(name: str, result: dict) -> str:
+    """
+    Returns a measurement as a line of the report.
+    :rtype str
+    """
+    return f"{name:<40} {result['median'] * 1000:>12.2f} ms {result['min'] * 1000:>12.2f} ms {result['runs']:>5} runs {result['peak_mb']:>10.1f} MB"
+
+def machine() -> dict:
+    """
+    Returns a description of the machine, stored with the baseline.
+    :rtype dict
+    """
+    return {
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpus': os.cpu_count(),
+        'python': platform.python_version()
+    }
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Benchmarks the reader, simulator, visualiser and webapp on scaled copies of the berlin stops.')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100], help='the number of copies of the berlin stops of every stop set')
+    parser.add_argument('--repeat', type=int, default=5, help='the maximum number of timed runs of every benchmark')
+    parser.add_argument('--max-time', type=float, default=2.0, help='the seconds after which a benchmark is not repeated again')
+    parser.add_argument('--baseline', default=default_baseline_file, help='the baseline json file to compare with')
+    parser.add_argument('--update', action='store_true', help='write the results to the baseline file')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='the relative slowdown or memory growth that is a regression')
+    parser.add_argument('--output', help='a json file to write the results to')
+    parser.add_argument('--filter', default='', help='only run the benchmarks whose name contains this text')
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for scale in args.scales:
+            benchmark = Benchmark(directory, scale, repeat=args.repeat, max_time=args.max_time)
+            print(benchmark, flush=True)
+            results.update(benchmark.run(lambda name: args.filter in name))
+
+    report = {'machine': machine(), 'results': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    regressions = over_budget(results)
+    for name, _, budget, value in regressions:
+        print(f'OVER BUDGET {name}: {value:.3f}s, the budget is {budget:.3f}s')
+
+    if os.path.isfile(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline['machine'] != report['machine']:
+            print(f"The baseline was measured on another machine: {baseline['machine']}")
+        baseline_regressions = compare(results, baseline['results'], args.tolerance)
+        for name, metric, baseline_value, value in baseline_regressions:
+            print(f'REGRESSION {name} {metric}: {baseline_value:.4g} -> {value:.4g} ({value / baseline_value - 1:+.0%})')
+        print(f'{len(baseline_regressions)} regressions against {args.baseline}.')
+        regressions += baseline_regressions
+
+    if args.update:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'Wrote the baseline {args.baseline}.')
+    elif regressions:
+        sys.exit(1)
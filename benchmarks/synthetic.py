@@ -0,0 +1,38 @@
+###################################################################
+# Script Name	 : "SYNTHETIC.PY"
+# Description	 : Synthetic, scaled copies of the berlin stops file
+#                  for the benchmarks.
+# Args           :
+# Author       	 : Floris Remmen
+# Email          : floris.remmen@gmail.com
+# Date           : "18 October 2026"
+###################################################################
+
+import json
+import numpy as np
+
+def write_scaled_stops(source_file: str, target_file: str, scale: int, jitter: float = 0.002, seed: int = 0) -> int:
+    """
+    Writes a stops geojson with `scale` copies of every stop of the source file. The first copy is
+    the original stop, the others are moved by a normal jitter (in degrees, 0.002 is about 200m) so the
+    stops keep the spatial distribution of berlin. Every stop gets a unique 12 character id.
+    Returns the number of written stops.
+    :rtype int
+    """
+    with open(source_file) as f:
+        features = json.load(f)['features']
+
+    coordinates = np.array([feature['geometry']['coordinates'] for feature in features], dtype=np.float64)
+    rng = np.random.default_rng(seed)
+
+    scaled = []
+    for copy in range(scale):
+        moved = coordinates if copy == 0 else coordinates + rng.normal(0, jitter, coordinates.shape)
+        for index, (feature, (lon, lat)) in enumerate(zip(features, moved.tolist())):
+            properties = dict(feature['properties'], id=f'b{copy:04d}{index:07d}')
+            scaled.append({'type': 'Feature', 'properties': properties, 'geometry': {'type': 'Point', 'coordinates': [lon, lat]}})
+
+    with open(target_file, 'w') as f:
+        json.dump({'type': 'FeatureCollection', 'features': scaled}, f)
+
+    return len(scaled)
@@ -0,0 +1,212 @@
+###################################################################
+# Script Name	 : "DISTANCEMATRIX.PY"
+# Description	 : Precomputed stop-to-stop distance matrix. Can be
+#                  run as a script to build the matrix offline.
+# Args           : --stops, --cache-dir, --bins
+# Author       	 : Floris Remmen
+# Email          : floris.remmen@gmail.com
+# Date           : "18 October 2026"
+###################################################################
+
+import os
+import argparse
+import threading
+
+import numpy as np
+
+from simulator.distances import StopCoordinates
+
+class DistanceMatrix:
+    """
+    Precomputed stop-to-stop distances, memory mapped from the cache directory.
+
+    Three .npy files are stored next to the binary static data cache:
+    - distances: (S, S) uint16 haversine distances, floored to whole metres.
+    - neighbours: (S, S) stop indices, every row sorted by distance from that stop.
+    - bin_offsets: (S, bins + 1) offsets of the 1km distance bins in every neighbour row,
+      so the stops between b and b + 1 km from stop i are neighbours[i, bin_offsets[i, b]:bin_offsets[i, b + 1]].
+    A meta file holds the mtime and size of the stops file, the matrix is stale when it changes.
+    """
+
+    # the largest distance that fits in the matrix, in metres
+    max_distance = np.iinfo(np.uint16).max
+
+    # (stops file, cache dir) -> (signature, DistanceMatrix or None)
+    _loaded = {}
+    _lock = threading.Lock()
+
+    def __init__(self, distances, neighbours, bin_offsets, source=None):
+        self.distances = distances
+        self.neighbours = neighbours
+        self.bin_offsets = bin_offsets
+
+        # (stops file, cache dir) of a memory mapped matrix
+        self.source = source
+
+    def __reduce__(self):
+        # a memory mapped matrix is sent to worker processes by its files, not by its data
+        if self.source is not None:
+            return (DistanceMatrix.load, self.source)
+        return (DistanceMatrix, (self.distances, self.neighbours, self.bin_offsets))
+
+    def __repr__(self):
+        return f"DistanceMatrix between {len(self)} stops with {self.number_of_bins} distance bins."
+
+    def __len__(self):
+        return len(self.distances)
+
+    @property
+    def number_of_bins(self) -> int:
+        """
+        The number of 1km distance bins of the neighbour lists.
+        :rtype int
+        """
+        return self.bin_offsets.shape[1] - 1
+
+    @staticmethod
+    def _files(stops_file: str, cache_dir: str) -> dict:
+        """
+        Returns the paths of the matrix files of a stops file.
+        :rtype dict
+        """
+        name = os.path.basename(stops_file)
+        return {
+            part: os.path.join(cache_dir, f'{name}.{part}.npy')
+            for part in ('meta', 'distances', 'neighbours', 'bin_offsets')}
+
+    @staticmethod
+    def _signature(stops_file: str) -> np.ndarray:
+        """
+        Returns the mtime and size of the stops file.
+        :rtype numpy.ndarray
+        """
+        stat = os.stat(stops_file)
+        return np.array([stat.st_mtime_ns, stat.st_size], dtype=np.int64)
+
+    def distance(self, i, j) -> np.ndarray:
+        """
+        Returns the distance in km between the stops at the index arrays i and j.
+        :rtype numpy.ndarray
+        """
+        return self.distances[i, j] / 1000.0
+
+    @classmethod
+    def build(cls, lon, lat, stops_file: str, cache_dir: str, number_of_bins: int, block_size: int = 256):
+        """
+        Computes the matrix for the stops at lon, lat and writes it to the cache directory.
+        The rows are computed in blocks, so memory use does not grow with the square of the stops.
+        :rtype simulator.distancematrix.DistanceMatrix
+        """
+        os.makedirs(cache_dir, exist_ok=True)
+        files = cls._files(stops_file, cache_dir)
+
+        coordinates = StopCoordinates(lon, lat)
+        n = len(coordinates)
+        index_dtype = np.uint16 if n <= np.iinfo(np.uint16).max else np.int32
+
+        distances = np.lib.format.open_memmap(files['distances'], mode='w+', dtype=np.uint16, shape=(n, n))
+        neighbours = np.lib.format.open_memmap(files['neighbours'], mode='w+', dtype=index_dtype, shape=(n, n))
+        bin_offsets = np.lib.format.open_memmap(files['bin_offsets'], mode='w+', dtype=np.int32, shape=(n, number_of_bins + 1))
+
+        bin_edges = np.arange(number_of_bins + 1) * 1000
+        for start in range(0, n, block_size):
+            rows = np.arange(start, min(start + block_size, n))
+
+            # floored metres, so the bin of a stored distance is the bin of the exact distance
+            block = np.floor(coordinates.distance(rows[:, None], np.arange(n)[None, :]) * 1000)
+            block = np.minimum(block, cls.max_distance).astype(np.uint16)
+
+            distances[rows] = block
+            neighbours[rows] = np.argsort(block, axis=1, kind='stable')
+            bin_offsets[rows] = (block[:, :, None] < bin_edges[None, None, :]).sum(axis=1)
+
+        for array in (distances, neighbours, bin_offsets):
+            array.flush()
+        # the meta file is written last, a partially built matrix is never loaded
+        np.save(files['meta'], cls._signature(stops_file))
+
+        return cls.load(stops_file, cache_dir)
+
+    @classmethod
+    def load(cls, stops_file: str, cache_dir: str):
+        """
+        Memory maps the matrix of a stops file from the cache directory.
+        Returns None if the matrix was not built or the stops file changed since.
+        :rtype simulator.distancematrix.DistanceMatrix
+        """
+        files = cls._files(stops_file, cache_dir)
+        try:
+            if not np.array_equal(np.load(files['meta']), cls._signature(stops_file)):
+                return None
+            return cls(
+                distances=np.load(files['distances'], mmap_mode='r'),
+                neighbours=np.load(files['neighbours'], mmap_mode='r'),
+                bin_offsets=np.load(files['bin_offsets'], mmap_mode='r'),
+                source=(stops_file, cache_dir)
+            )
+        except (OSError, ValueError):
+            return None
+
+    @classmethod
+    def get(cls, stops_file: str, cache_dir: str):
+        """
+        Returns the matrix of a stops file, shared by the whole process.
+        The files are only opened again when the stops file changed.
+        :rtype simulator.distancematrix.DistanceMatrix
+        """
+        key = (stops_file, cache_dir)
+        try:
+            signature = tuple(cls._signature(stops_file))
+        except OSError:
+            return None
+
+        cached = cls._loaded.get(key)
+        if cached is None or cached[0] != signature:
+            with cls._lock:
+                cached = (signature, cls.load(stops_file, cache_dir))
+                cls._loaded[key] = cached
+
+        return cached[1]
+
+    def sample_dropoffs(self, pickups, distance_bin: int, dropoff_weights, max_neighbours: int, rng) -> tuple:
+        """
+        Draws one dropoff per pickup from the stops in the distance bin of that pickup, in O(1) per draw.
+        A draw is accepted with probability (neighbours of the pickup in the bin / max_neighbours) * dropoff_weights[dropoff],
+        where dropoff_weights are weights over all stops scaled to at most 1. The accepted trips of a pickup are
+        then spread over every possible dropoff in proportion to its weight, whatever the number of neighbours of
+        the pickup, so stops with a weight of 0 are never dropoffs. Dropoffs at the pickup itself, which is its own
+        neighbour at distance 0, are rejected.
+        Returns the dropoffs and a mask of the accepted draws.
+        :rtype tuple
+        """
+        lo = self.bin_offsets[pickups, distance_bin]
+        hi = self.bin_offsets[pickups, distance_bin + 1]
+
+        # a pickup without stops in the bin gets a dummy draw, which is rejected
+        position = lo + np.floor(rng.random(len(pickups)) * (hi - lo)).astype(np.int64)
+        dropoffs = self.neighbours[pickups, np.minimum(position, len(self) - 1)].astype(np.intp)
+        accepted = rng.random(len(pickups)) * max_neighbours < (hi - lo) * dropoff_weights[dropoffs]
+
+        return dropoffs, accepted & (hi > lo) & (dropoffs != pickups)
+
+if __name__ == "__main__":
+
+    from utilities.staticdatareader import StaticDataReader
+    from simulator.simulator import Simulator
+
+    parser = argparse.ArgumentParser(description='Builds the stop-to-stop distance matrix of a stops file.')
+    parser.add_argument('--stops', default='data/berlin_stops.geojson', help='the stops geojson file')
+    parser.add_argument('--bounds', default='data/berlin_bounds.poly', help='the bounds poly file')
+    parser.add_argument('--cache-dir', default=None, help='the cache directory, defaults to a cache directory next to the stops file')
+    parser.add_argument('--bins', type=int, default=len(Simulator.booking_distance_distribution), help='the number of 1km distance bins')
+    args = parser.parse_args()
+
+    static_data = StaticDataReader(args.bounds, args.stops, cache_dir=args.cache_dir)
+    matrix = DistanceMatrix.build(
+        static_data.berlin_stops.lon,
+        static_data.berlin_stops.lat,
+        stops_file=args.stops,
+        cache_dir=static_data.get_cache_dir(args.stops),
+        number_of_bins=args.bins
+    )
+    print(matrix)
@@ -0,0 +1,47 @@
+###################################################################
+# Script Name	 : "DISTANCES.PY"
+# Description	 : Vectorised distance functions for the simulator
+# Args           :
+# Author       	 : Floris Remmen
+# Email          : floris.remmen@gmail.com
+# Date           : "18 October 2026"
+###################################################################
+
+import numpy as np
+
+# mean earth radius in km
+EARTH_RADIUS = 6371.0088
+
+def haversine(lon1, lat1, lon2, lat2) -> np.ndarray:
+    """
+    Returns the great circle distance in km between arrays of WGS84 coordinates.
+    :rtype numpy.ndarray
+    """
+    lon1, lat1, lon2, lat2 = (np.radians(np.asarray(c, dtype=np.float64)) for c in (lon1, lat1, lon2, lat2))
+
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(a))
+
+class StopCoordinates:
+    """
+    WGS84 coordinates of a set of stops, prepared for fast haversine distances between them.
+    The radians and the cosine of the latitude are only computed once per stop.
+    """
+
+    def __init__(self, lon, lat):
+        self.lon = np.radians(np.asarray(lon, dtype=np.float64))
+        self.lat = np.radians(np.asarray(lat, dtype=np.float64))
+        self.cos_lat = np.cos(self.lat)
+
+    def __len__(self):
+        return len(self.lon)
+
+    def distance(self, i, j) -> np.ndarray:
+        """
+        Returns the great circle distance in km between the stops at the index arrays i and j.
+        :rtype numpy.ndarray
+        """
+        a = np.sin((self.lat[j] - self.lat[i]) / 2) ** 2 + self.cos_lat[i] * self.cos_lat[j] * np.sin((self.lon[j] - self.lon[i]) / 2) ** 2
+
+        return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(a))
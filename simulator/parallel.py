@@ -0,0 +1,45 @@
+###################################################################
+# Script Name	 : "PARALLEL.PY"
+# Description	 : Ordered process pool map for the simulator
+# Args           :
+# Author       	 : Floris Remmen
+# Email          : floris.remmen@gmail.com
+# Date           : "18 October 2026"
+###################################################################
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+# the shared state of a worker process, set once by the pool initializer
+_worker_state = None
+
+def _set_worker_state(state):
+    global _worker_state
+    _worker_state = state
+
+def _call(function, task):
+    return function(_worker_state, task)
+
+def parallel_map(function, state, tasks, workers: int = 1):
+    """
+    Yields function(state, task) for every task, in the order of the tasks.
+
+    With more than one worker the tasks run in a ProcessPoolExecutor. The state is sent
+    to every worker once, when it starts, instead of with every task. At most two tasks
+    per worker are in flight, so results are streamed and memory use stays bounded.
+    `function` has to be a module level function, so it can be sent to the workers.
+    """
+    if workers <= 1:
+        for task in tasks:
+            yield function(state, task)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_set_worker_state, initargs=(state,)) as pool:
+        futures = deque()
+        for task in tasks:
+            futures.append(pool.submit(_call, function, task))
+            if len(futures) >= 2 * workers:
+                yield futures.popleft().result()
+
+        while futures:
+            yield futures.popleft().result()
@@ -0,0 +1,140 @@
+###################################################################
+# Script Name	 : "SAMPLING.PY"
+# Description	 : Random streams and vectorised sampling helpers
+#                  for the simulator.
+# Args           :
+# Author       	 : Floris Remmen
+# Email          : floris.remmen@gmail.com
+# Date           : "18 October 2026"
+###################################################################
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+class RandomStreams:
+    """
+    Independent random number streams spawned from a single seed.
+
+    Stream i is always the same for the same seed, no matter in which process or in
+    which order the streams are created. Work that is split in fixed chunks, with one
+    stream per chunk, is therefore reproducible for any number of workers.
+    """
+
+    def __init__(self, seed=None):
+        # an int, None (fresh entropy) or a numpy SeedSequence
+        self.seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+
+    def __repr__(self):
+        return f"RandomStreams with entropy {self.seed_sequence.entropy}"
+
+    def seed(self, i: int) -> np.random.SeedSequence:
+        """
+        Returns the seed sequence of stream i. This is a child of the root seed sequence,
+        equal to the i-th child of SeedSequence.spawn.
+        :rtype numpy.random.SeedSequence
+        """
+        return np.random.SeedSequence(
+            self.seed_sequence.entropy, spawn_key=self.seed_sequence.spawn_key + (i,))
+
+    def generator(self, i: int) -> np.random.Generator:
+        """
+        Returns a numpy Generator for stream i.
+        :rtype numpy.random.Generator
+        """
+        return np.random.default_rng(self.seed(i))
+
+class AliasTable:
+    """
+    Walker/Vose alias table for drawing indices with given weights in O(1) per draw.
+
+    The table is built once in O(n). A draw picks a uniform column and keeps it with the
+    probability of that column, otherwise it takes the alias of the column. Drawing is
+    fully vectorised.
+    """
+
+    def __init__(self, weights):
+        weights = np.asarray(weights, dtype=np.float64)
+        n = len(weights)
+
+        # a bad weight would silently skew every draw
+        if not np.all(np.isfinite(weights)) or np.any(weights < 0):
+            raise ValueError('the weights of an alias table must be finite and non-negative')
+
+        # weights that are all zero are treated as uniform
+        if not n or weights.sum() <= 0:
+            weights = np.ones(n)
+        scaled = weights * n / weights.sum() if n else weights
+        self.weights = weights
+
+        self.probability = np.ones(n)
+        self.alias = np.arange(n)
+
+        # Vose's algorithm: pair every column below 1 with a column above 1
+        small = np.flatnonzero(scaled < 1).tolist()
+        large = np.flatnonzero(scaled >= 1).tolist()
+        scaled = scaled.tolist()
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self.probability[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] += scaled[s] - 1
+            (small if scaled[l] < 1 else large).append(l)
+
+    def __repr__(self):
+        return f"AliasTable over {len(self)} weights."
+
+    def __len__(self):
+        return len(self.probability)
+
+    def draw(self, size: int, rng) -> np.ndarray:
+        """
+        Draws `size` indices with probability proportional to their weights.
+        :rtype numpy.ndarray
+        """
+        column = rng.integers(len(self), size=size)
+        keep = rng.random(size) < self.probability[column]
+
+        return np.where(keep, column, self.alias[column])
+
+class AliasTableCache:
+    """
+    Process-wide LRU cache of alias tables, keyed by the weights and the indices of a
+    spatial index query. The table of a bounding box is only built once.
+    """
+
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        self._tables = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"AliasTableCache with {len(self._tables)} tables."
+
+    def get(self, weights: np.ndarray, indices: np.ndarray) -> AliasTable:
+        """
+        Returns the alias table of weights[indices].
+        :rtype simulator.sampling.AliasTable
+        """
+        key = (id(weights), hashlib.sha1(np.ascontiguousarray(indices).tobytes()).digest())
+
+        with self._lock:
+            cached = self._tables.get(key)
+            # the weights are stored with the table, their id can not be reused while cached
+            if cached is not None and cached[0] is weights:
+                self._tables.move_to_end(key)
+                return cached[1]
+
+        table = AliasTable(weights[indices])
+
+        with self._lock:
+            self._tables[key] = (weights, table)
+            while len(self._tables) > self.max_size:
+                self._tables.popitem(last=False)
+
+        return table
+
+# alias tables shared by all simulators of the process
+alias_tables = AliasTableCache()
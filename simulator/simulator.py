@@ -1,42 +1,321 @@
-import geopandas as gpd
-from shapely.geometry import box
+import numpy as np
+
+from simulator.distancematrix import DistanceMatrix
+from simulator.parallel import parallel_map
+from simulator.sampling import RandomStreams, alias_tables
+from simulator.trips import TripSampler, sample_grouped_trips, sample_trip_chunk
+from utilities.datastore import StaticDataStore
+from utilities.staticdatareader import StaticDataReader
+from utilities.stoptable import StopTable
+from utilities.timing import Timings
 
 class Simulator:
     booking_distance_distribution = [0.2, 0.1, 0.3, 0.4]
     max_popular_points = 10
-    
-    def __init__(self, bounding_box: tuple, path_to_stops='data/berlin_stops.geojson'):
+    trip_chunk_size = 100000
+    scenario_block_size = 1024
+    max_sampling_rounds = 16
+    max_grouped_requests = 1024
+
+    def __init__(self, bounding_box: tuple, path_to_stops='data/berlin_stops.geojson', static_data: StaticDataReader = None, distance_matrix: DistanceMatrix = None, workers: int = 1, demand_weights=None):
         self.bounding_box = bounding_box
         self.path_to_stops = path_to_stops
 
-    def simulate(self, number_of_requests: int) -> dict:
+        # number of worker processes for trip generation and batch simulations
+        self.workers = workers
+
+        # the stops are shared through the static data store, so they are only parsed once per process
+        if static_data is None:
+            static_data = StaticDataStore.get(berlin_stops_file=path_to_stops)
+        self.static_data = static_data
+
+        # the precomputed distance matrix, if it was built for these stops (python -m simulator.distancematrix)
+        if distance_matrix is None:
+            distance_matrix = DistanceMatrix.get(
+                static_data.berlin_stops_file, static_data.get_cache_dir(static_data.berlin_stops_file))
+        if distance_matrix is not None and (
+                len(distance_matrix) != len(static_data.berlin_stops)
+                or distance_matrix.number_of_bins < len(self.booking_distance_distribution)):
+            distance_matrix = None
+        self.distance_matrix = distance_matrix
+
+        # demand weight per stop: an array over all stops, a csv side file with id and weight columns,
+        # or None for the weights of the stops file. Without any weights the demand is uniform.
+        if demand_weights is None or isinstance(demand_weights, str):
+            demand_weights = static_data.get_demand_weights(demand_weights)
+        self.demand_weights = demand_weights
+
+    @Timings.timed('simulator.simulate')
+    def simulate(self, number_of_requests: int, seed=None, trips=True) -> dict:
+        # one independent random stream for the trips (see stream_trips) and one for each set of points
+        _, dropoff_seed, pickup_seed = np.random.SeedSequence(seed).spawn(3)
+
+        # the results are aggregated from concrete generated trips: the booking distance bins are
+        # counted, and the most popular points are the stops used most often for pickups/dropoffs.
+        # With trips=False the original mock results are returned: the booking distance bins are
+        # the distribution times number_of_requests, and the points are random stops.
+        if trips:
+            trip_counts = self.new_trip_counts()
+            for _ in self.stream_trips(number_of_requests, seed, trip_counts):
+                pass
+
+            return self.get_trip_results(trip_counts)
+
         booking_distance_bins = self.get_booking_distance_bins(
             number_of_requests)
         number_of_sample_points = min(
             number_of_requests, self.max_popular_points)
         most_popular_dropoff_points = self.get_random_points(
-            number_of_sample_points)
+            number_of_sample_points, rng=np.random.default_rng(dropoff_seed))
         most_popular_pickup_points = self.get_random_points(
-            number_of_sample_points)
-            
+            number_of_sample_points, rng=np.random.default_rng(pickup_seed))
+
         return {
             'booking_distance_bins': booking_distance_bins,
             'most_popular_dropoff_points': most_popular_dropoff_points,
             'most_popular_pickup_points': most_popular_pickup_points
         }
 
+    def simulate_many(self, bounding_boxes, numbers_of_requests, seed=None) -> dict:
+        # batch of simulations: one scenario per (bounding box, number of requests) pair.
+        # The scenarios are split in fixed blocks with their own random stream, which run in
+        # parallel over the workers. Within a block the bbox membership of all scenarios is
+        # found in a single pass over the spatial index. Like simulate, every scenario generates
+        # concrete trips, which are sampled together for the scenarios with up to max_grouped_requests
+        # requests of a block: its booking distance bins are counted from the trips (a row per scenario),
+        # and its most popular points are the stops used most often, as a ragged array
+        # (stop indices, offsets) with the counts of those stops in most_popular_*_counts.
+        bounding_boxes = np.asarray(bounding_boxes, dtype=np.float64).reshape(-1, 4)
+        numbers_of_requests = np.broadcast_to(
+            np.asarray(numbers_of_requests, dtype=np.int64), (len(bounding_boxes),))
+        streams = RandomStreams(seed)
+
+        tasks = (
+            (bounding_boxes[start:start + self.scenario_block_size],
+             numbers_of_requests[start:start + self.scenario_block_size],
+             streams.seed(i))
+            for i, start in enumerate(range(0, len(bounding_boxes), self.scenario_block_size)))
+        stops = self.static_data.berlin_stops
+        state = (
+            self.static_data.stop_index, stops.lon, stops.lat, self.booking_distance_distribution,
+            self.max_sampling_rounds, self.max_popular_points, self.trip_chunk_size,
+            self.max_grouped_requests, self.distance_matrix, self.demand_weights)
+        blocks = list(parallel_map(_simulate_block, state, tasks, self.workers))
+
+        def merge(column):
+            # concatenates the ragged (values, sizes) results of the blocks
+            values = np.concatenate([block[column][0] for block in blocks] or [np.empty(0, dtype=np.intp)])
+            sizes = np.concatenate([block[column][1] for block in blocks] or [np.empty(0, dtype=np.intp)])
+            return values, np.concatenate(([0], np.cumsum(sizes)))
+
+        return {
+            'booking_distance_labels': list(self.get_booking_distance_bins(0)),
+            'booking_distance_bins': np.concatenate(
+                [block['booking_distance_bins'] for block in blocks]
+                or [np.empty((0, len(self.booking_distance_distribution)), dtype=np.int64)]),
+            'stops_within_bounds': np.diff(merge('stops')[1]),
+            'most_popular_dropoff_points': merge('dropoff'),
+            'most_popular_dropoff_counts': merge('dropoff_counts')[0],
+            'most_popular_pickup_points': merge('pickup'),
+            'most_popular_pickup_counts': merge('pickup_counts')[0]
+        }
+
     def get_booking_distance_bins(self, number_of_requests: int) -> dict:
         return {
             f'From {i}->{i+1}km': round(number_of_requests * x)
             for i, x in enumerate(self.booking_distance_distribution)}
 
-    def get_random_points(self, n: int) -> gpd.GeoDataFrame:
-        bounding_box_shape = box(*self.bounding_box)
-        geodataframe = gpd.read_file(self.path_to_stops, crs='epsg:4326')
-        within_bounds = geodataframe[geodataframe.within(bounding_box_shape)]
+    def stream_trips(self, number_of_requests: int, seed=None, trip_counts: dict = None):
+        # generates the trips of simulate(number_of_requests, seed) chunk by chunk, so they can be
+        # streamed without holding all of them. The chunks are tallied in trip_counts (see
+        # new_trip_counts) while they pass, get_trip_results turns them into the simulation results.
+        trips_seed = np.random.SeedSequence(seed).spawn(3)[0]
+        trips = self.generate_trips(number_of_requests, seed=trips_seed)
+        if trip_counts is None:
+            return trips
+
+        return self.tally_trips(trips, trip_counts)
+
+    def new_trip_counts(self) -> dict:
+        # empty counts of a stream of trips: the booking distance bins, and how often every stop
+        # is used for a pickup and a dropoff.
+        number_of_stops = len(self.static_data.berlin_stops)
+
+        return {
+            'booking_distance_bins': {
+                f'From {i}->{i+1}km': 0
+                for i in range(len(self.booking_distance_distribution))},
+            'pickup_counts': np.zeros(number_of_stops, dtype=np.int64),
+            'dropoff_counts': np.zeros(number_of_stops, dtype=np.int64)
+        }
+
+    def tally_trips(self, trips, trip_counts: dict):
+        # adds every chunk of a stream of trips to trip_counts with np.bincount, and passes it on.
+        number_of_stops = len(trip_counts['pickup_counts'])
+        number_of_bins = len(trip_counts['booking_distance_bins'])
+
+        for chunk in trips:
+            with Timings.stage('simulator.tally_trips'):
+                bin_counts = np.bincount(chunk['distance_bin'], minlength=number_of_bins)
+                for label, count in zip(trip_counts['booking_distance_bins'], bin_counts):
+                    trip_counts['booking_distance_bins'][label] += int(count)
+                trip_counts['pickup_counts'] += np.bincount(chunk['pickup'], minlength=number_of_stops)
+                trip_counts['dropoff_counts'] += np.bincount(chunk['dropoff'], minlength=number_of_stops)
+
+            yield chunk
+
+    def count_trips(self, trips) -> dict:
+        # aggregates a stream of trip chunks, as made by generate_trips: the booking distance bins,
+        # and how often every stop is used for a pickup and a dropoff.
+        trip_counts = self.new_trip_counts()
+        for _ in self.tally_trips(trips, trip_counts):
+            pass
+
+        return trip_counts
+
+    def get_trip_results(self, trip_counts: dict) -> dict:
+        # the simulation results of the counts of a stream of trips
+        return {
+            'booking_distance_bins': trip_counts['booking_distance_bins'],
+            'most_popular_dropoff_points': self.get_most_popular_points(trip_counts['dropoff_counts']),
+            'most_popular_pickup_points': self.get_most_popular_points(trip_counts['pickup_counts'])
+        }
+
+    def get_most_popular_points(self, counts) -> StopTable:
+        # the max_popular_points stops with the highest counts, most popular first, found with
+        # argpartition in O(S). Stops that were never used are left out. The counts are returned
+        # with the points.
+        with Timings.stage('simulator.most_popular_points'):
+            counts = np.asarray(counts)
+            top = _top_counts(counts, self.max_popular_points)
+
+            return self.static_data.berlin_stops.take(top, counts=counts[top])
+
+    def generate_trips(self, number_of_requests: int, seed=None, chunk_size: int = None):
+        # generates concrete trips between the stops within the bounding box, streamed as chunks of
+        # at most chunk_size trips. Every chunk is a dict of arrays: pickup and dropoff stop indices,
+        # the haversine distance in km and the booking distance bin of every trip.
+        # The distance bins follow booking_distance_distribution. With a distance matrix the
+        # dropoffs are drawn from the neighbours of the pickup in the bin, without any geometry.
+        # With demand weights, pickups and dropoffs are drawn in O(1) from the alias table of the
+        # bounding box, which is built once per spatial index result.
+        # Chunk i always uses random stream i of the seed, so the trips are the same for any
+        # number of workers.
+        chunk_size = chunk_size or self.trip_chunk_size
+        streams = RandomStreams(seed)
+
+        within_bounds = self.get_stop_indices()
+        if not len(within_bounds):
+            return
+
+        alias_table = None
+        if self.demand_weights is not None:
+            alias_table = alias_tables.get(self.demand_weights, within_bounds)
+
+        stops = self.static_data.berlin_stops
+        sampler = TripSampler(
+            stops.lon, stops.lat, within_bounds, self.booking_distance_distribution,
+            self.max_sampling_rounds, self.distance_matrix, alias_table)
+
+        tasks = (
+            (min(chunk_size, number_of_requests - start), streams.seed(i))
+            for i, start in enumerate(range(0, number_of_requests, chunk_size)))
+
+        # every chunk is timed while it is generated, not while it is consumed
+        chunks = parallel_map(sample_trip_chunk, sampler, tasks, self.workers)
+        while True:
+            with Timings.stage('simulator.generate_trips'):
+                chunk = next(chunks, None)
+            if chunk is None:
+                return
+            yield chunk
+
+    def get_stop_indices(self) -> np.ndarray:
+        # row indices of the stops within the bounding box, from the prebuilt spatial index
+        with Timings.stage('simulator.stop_indices'):
+            return self.static_data.stop_index.query(self.bounding_box)
+
+    def get_random_points(self, n: int, rng=None) -> StopTable:
+        rng = rng if rng is not None else np.random.default_rng()
+        within_bounds = self.get_stop_indices()
 
         # if less than n points are available, return the ones that are available.
-        if len(within_bounds) < n: 
-            return within_bounds
+        if len(within_bounds) > n:
+            within_bounds = rng.choice(within_bounds, n, replace=False)
+
+        return self.static_data.berlin_stops.take(within_bounds) # .to_json()
+
+
+def _top_counts(counts, k: int) -> np.ndarray:
+    # positions of the k highest counts, highest first, found with argpartition in O(len(counts)).
+    # Zero counts are left out.
+    k = min(k, np.count_nonzero(counts))
+    if k < len(counts):
+        top = np.argpartition(-counts, k)[:k] if k else np.empty(0, dtype=np.intp)
+    else:
+        top = np.arange(len(counts))[counts > 0]
+
+    return top[np.argsort(-counts[top], kind='stable')]
+
+def _ragged_top_counts(counts, offsets, k: int) -> tuple:
+    # positions of the k highest counts of every group counts[offsets[i]:offsets[i + 1]], highest
+    # first, and the number of them per group. Zero counts are left out, so only the nonzero
+    # counts are sorted.
+    nonzero = np.flatnonzero(counts)
+    group = np.searchsorted(offsets, nonzero, side='right') - 1
+    order = np.lexsort((-counts[nonzero], group))
+    nonzero, group = nonzero[order], group[order]
+
+    # the rank of every count within its group
+    sizes = np.bincount(group, minlength=len(offsets) - 1)
+    rank = np.arange(len(nonzero)) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    top = rank < k
+
+    return nonzero[top], np.minimum(sizes, k)
+
+def _simulate_block(state, task) -> dict:
+    # simulates a block of scenarios of simulate_many, used with simulator.parallel.parallel_map.
+    # The scenarios with up to max_grouped_requests requests are sampled together with
+    # sample_grouped_trips, the larger ones in chunks with a TripSampler over the stops in their
+    # bounding box, whose cost is spread over their trips. Every scenario is counted with
+    # np.bincount over the stops of the block, so the most popular points of all of them are found at once.
+    # Returns the booking distance bins as a row per scenario, the rest as ragged results
+    # (values, size per scenario).
+    stop_index, lon, lat, distribution, max_rounds, max_popular_points, chunk_size, max_grouped_requests, distance_matrix, demand_weights = state
+    bounding_boxes, numbers_of_requests, seed = task
+
+    stop_indices, stop_offsets = stop_index.query_many(bounding_boxes)
+    number_of_bins = len(distribution)
+    grouped_seed, scenario_seeds = seed.spawn(2)
+
+    grouped = numbers_of_requests <= max_grouped_requests
+    trips = sample_grouped_trips(
+        lon, lat, stop_indices, stop_offsets, np.where(grouped, numbers_of_requests, 0), distribution,
+        max_rounds, np.random.default_rng(grouped_seed), distance_matrix, demand_weights)
+    booking_distance_bins = np.bincount(
+        trips['scenario'] * number_of_bins + trips['distance_bin'],
+        minlength=len(bounding_boxes) * number_of_bins).reshape(len(bounding_boxes), number_of_bins)
+    pickup_counts = np.bincount(trips['pickup'], minlength=len(stop_indices))
+    dropoff_counts = np.bincount(trips['dropoff'], minlength=len(stop_indices))
+
+    for scenario in np.flatnonzero(~grouped & (np.diff(stop_offsets) > 0)):
+        # the child stream of the scenario, as spawned by scenario_seeds, without spawning all of them
+        rng = np.random.default_rng(np.random.SeedSequence(scenario_seeds.entropy, spawn_key=scenario_seeds.spawn_key + (int(scenario),)))
+        start, end = stop_offsets[scenario], stop_offsets[scenario + 1]
+        within_bounds = stop_indices[start:end]
+        alias_table = alias_tables.get(demand_weights, within_bounds) if demand_weights is not None else None
+        sampler = TripSampler(lon, lat, within_bounds, distribution, max_rounds, distance_matrix, alias_table)
+
+        for chunk_start in range(0, numbers_of_requests[scenario], chunk_size):
+            chunk = sampler.sample(min(chunk_size, numbers_of_requests[scenario] - chunk_start), rng)
+            booking_distance_bins[scenario] += np.bincount(chunk['distance_bin'], minlength=number_of_bins)
+            pickup_counts[start:end] += np.bincount(sampler.local_index[chunk['pickup']], minlength=end - start)
+            dropoff_counts[start:end] += np.bincount(sampler.local_index[chunk['dropoff']], minlength=end - start)
+
+    results = {'stops': (stop_indices, np.diff(stop_offsets))}
+    for role, counts in (('pickup', pickup_counts), ('dropoff', dropoff_counts)):
+        top, sizes = _ragged_top_counts(counts, stop_offsets, max_popular_points)
+        results[role] = (stop_indices[top], sizes)
+        results[f'{role}_counts'] = (counts[top], sizes)
 
-        return within_bounds.sample(n) # .to_json()
+    return {'booking_distance_bins': booking_distance_bins, **results}
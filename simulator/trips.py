@@ -0,0 +1,371 @@
+###################################################################
+# Script Name	 : "TRIPS.PY"
+# Description	 : Class definition for the trip sampler
+# Args           :
+# Author       	 : Floris Remmen
+# Email          : floris.remmen@gmail.com
+# Date           : "18 October 2026"
+###################################################################
+
+import numpy as np
+
+from simulator.distances import StopCoordinates, haversine
+
+class TripSampler:
+    """
+    Samples chunks of concrete trips between the stops within a bounding box.
+
+    The distance bin of every trip is drawn from the booking distance distribution,
+    after which a (pickup, dropoff) pair with a distance in that bin is sampled. With a
+    DistanceMatrix the dropoffs are drawn from the neighbours of the pickup in the bin,
+    otherwise pairs are rejected on their vectorised haversine distance. Both give every pair
+    of stops within the bounding box in the bin the same probability.
+    With an AliasTable over the stops within the bounding box, pickups and dropoffs are
+    drawn by their demand weights, i.e. a pair by the product of its weights.
+    A trip never has the same pickup and dropoff stop, unless there is only one stop.
+
+    Bins that can not occur between the stops, e.g. long trips in a small bounding box, are
+    not sampled at all. The acceptance rate of every bin is estimated once, from a pilot
+    sample with a fixed seed, and used by every chunk.
+    The sampler holds no random state, so it can be sent to worker processes as is.
+    """
+
+    # number of stop pairs in the pilot sample of the acceptance rates
+    pilot_size = 4096
+
+    # up to this number of stops, the bins that occur are found from all of their pairs
+    max_pairwise_stops = 256
+
+    def __init__(self, lon, lat, within_bounds, distribution, max_rounds: int, distance_matrix=None, alias_table=None):
+
+        # row indices of the stops within the bounding box
+        self.within_bounds = np.asarray(within_bounds, dtype=np.intp)
+        self.coordinates = StopCoordinates(lon[self.within_bounds], lat[self.within_bounds])
+
+        # position of every stop in within_bounds, -1 for stops outside of the bounding box
+        self.local_index = np.full(len(lon), -1, dtype=np.intp)
+        self.local_index[self.within_bounds] = np.arange(len(self.within_bounds))
+
+        distribution = np.asarray(distribution, dtype=np.float64)
+        self.distribution = distribution / distribution.sum()
+        self.max_rounds = max_rounds
+        self.distance_matrix = distance_matrix
+        self.alias_table = alias_table
+
+        # the bins that can occur between two different stops within the bounding box
+        number_of_bins = len(self.distribution)
+        self.feasible = np.arange(number_of_bins) <= self.max_distance()
+        if 1 < len(self.within_bounds) <= self.max_pairwise_stops:
+            i, j = np.triu_indices(len(self.within_bounds), k=1)
+            self.feasible &= np.bincount(
+                np.minimum(self.distance(i, j), number_of_bins).astype(np.intp), minlength=number_of_bins + 1)[:number_of_bins] > 0
+
+        # with a matrix, the dropoffs are drawn from the neighbours of the pickup and accepted by the
+        # number of neighbours of the pickup in the bin and the weight of the dropoff, both relative to
+        # their maximum within the bounding box. Stops outside of the bounding box have a weight of 0.
+        if distance_matrix is not None:
+            offsets = np.asarray(distance_matrix.bin_offsets[self.within_bounds, :number_of_bins + 1])
+            self.max_neighbours = np.diff(offsets, axis=1).max(axis=0, initial=0)
+            weights = np.ones(len(self.within_bounds)) if alias_table is None else alias_table.weights
+            self.dropoff_weights = np.zeros(len(lon))
+            if len(weights):
+                self.dropoff_weights[self.within_bounds] = weights / weights.max()
+            # a bin only occurs if a stop in the bounding box has neighbours in it
+            if len(self.within_bounds) > self.max_pairwise_stops:
+                self.feasible &= self.max_neighbours > 0
+
+        # the acceptance rate of every bin, from a pilot sample that is the same for every chunk.
+        # The neighbour lists of the matrix do not need it.
+        self.acceptance_rates = np.full(number_of_bins, 0.5)
+        if len(self.within_bounds) > 1 and distance_matrix is None:
+            rng = np.random.default_rng(0)
+            pickup, dropoff = self.draw_stops(self.pilot_size, rng), self.draw_stops(self.pilot_size, rng)
+            trip_distance = self.distance(pickup[pickup != dropoff], dropoff[pickup != dropoff])
+            self.acceptance_rates = np.maximum(
+                np.bincount(np.floor(trip_distance).astype(np.intp), minlength=number_of_bins)[:number_of_bins] / self.pilot_size,
+                1 / self.pilot_size)
+
+    def __repr__(self):
+        return f"TripSampler between {len(self.within_bounds)} stops."
+
+    def draw_stops(self, size: int, rng) -> np.ndarray:
+        """
+        Draws `size` stops within the bounding box, as positions in within_bounds.
+        Stops are drawn by their demand weights if the sampler has an alias table, uniformly otherwise.
+        :rtype numpy.ndarray
+        """
+        if self.alias_table is not None:
+            return self.alias_table.draw(size, rng)
+        return rng.integers(len(self.within_bounds), size=size)
+
+    def max_distance(self) -> float:
+        """
+        Returns an upper bound of the distance in km between any two stops within the bounding box:
+        the longest distance between the corners of the box around them.
+        :rtype float
+        """
+        if not len(self.within_bounds):
+            return 0.0
+
+        lon, lat = np.degrees(self.coordinates.lon), np.degrees(self.coordinates.lat)
+        corners_lon = np.array([lon.min(), lon.max(), lon.min(), lon.max()])
+        corners_lat = np.array([lat.min(), lat.min(), lat.max(), lat.max()])
+
+        return float(haversine(corners_lon[:, None], corners_lat[:, None], corners_lon[None, :], corners_lat[None, :]).max())
+
+    def distance(self, i, j) -> np.ndarray:
+        """
+        Returns the distance in km between the stops at the positions i and j in within_bounds,
+        looked up in the distance matrix if there is one.
+        :rtype numpy.ndarray
+        """
+        if self.distance_matrix is not None:
+            return self.distance_matrix.distance(self.within_bounds[i], self.within_bounds[j])
+        return self.coordinates.distance(i, j)
+
+    def sample(self, size: int, rng) -> dict:
+        """
+        Samples `size` trips. Returns a dict of arrays: pickup and dropoff stop indices,
+        the distance in km and the booking distance bin of every trip.
+        :rtype dict
+        """
+        number_of_bins = len(self.distribution)
+        bin_counts = np.bincount(rng.choice(number_of_bins, size=size, p=self.distribution), minlength=number_of_bins)
+
+        # the trips of a bin that can not occur are unconstrained right away, without any rounds
+        if self.distance_matrix is not None:
+            chunks = [
+                _sample_trips_in_bin_from_matrix(
+                    self.distance_matrix, self.within_bounds, self.local_index, self.dropoff_weights,
+                    self.max_neighbours[distance_bin], self.draw_stops, self.distance,
+                    distance_bin, count, number_of_bins, self.max_rounds * self.feasible[distance_bin], rng)
+                for distance_bin, count in enumerate(bin_counts) if count]
+        else:
+            chunks = [
+                _sample_trips_in_bin(
+                    self.draw_stops, self.distance, distance_bin, count, number_of_bins,
+                    self.max_rounds * self.feasible[distance_bin], rng, self.acceptance_rates[distance_bin])
+                for distance_bin, count in enumerate(bin_counts) if count]
+        pickup, dropoff, distance, distance_bin = (np.concatenate(column) for column in zip(*chunks))
+
+        # the trips are generated per bin, shuffle them
+        shuffle = rng.permutation(size)
+        return {
+            'pickup': self.within_bounds[pickup[shuffle]],
+            'dropoff': self.within_bounds[dropoff[shuffle]],
+            'distance': distance[shuffle],
+            'distance_bin': distance_bin[shuffle]
+        }
+
+def sample_trip_chunk(sampler: TripSampler, task: tuple) -> dict:
+    """
+    Samples one chunk of trips. The task is a tuple (size, seed sequence of the chunk).
+    Used as the function of simulator.parallel.parallel_map.
+    :rtype dict
+    """
+    size, seed = task
+    return sampler.sample(size, np.random.default_rng(seed))
+
+def sample_grouped_trips(lon, lat, stop_indices, stop_offsets, numbers_of_requests, distribution, max_rounds: int, rng, distance_matrix=None, demand_weights=None, max_pairwise_stops: int = 16) -> dict:
+    """
+    Samples the trips of many scenarios at once, scenario i having numbers_of_requests[i] trips between the
+    stops stop_indices[stop_offsets[i]:stop_offsets[i + 1]], as returned by GridIndex.query_many.
+    The trips have the same distribution as those of a TripSampler over every scenario, but are drawn by
+    rejection for all scenarios together, without building a sampler per scenario.
+    Returns a dict of arrays: the scenario of every trip, its pickup and dropoff as positions in stop_indices
+    and its booking distance bin.
+    :rtype dict
+    """
+    sizes = np.diff(stop_offsets)
+    number_of_bins = len(distribution)
+    distribution = np.asarray(distribution, dtype=np.float64)
+
+    scenario = np.repeat(np.arange(len(sizes)), np.where(sizes > 0, np.maximum(numbers_of_requests, 0), 0))
+    distance_bin = rng.choice(number_of_bins, size=len(scenario), p=distribution / distribution.sum())
+
+    # the cumulative weights of every scenario, for drawing its stops by weight
+    if demand_weights is not None:
+        cumulative = np.cumsum(demand_weights[stop_indices], dtype=np.float64)
+        base = np.concatenate(([0.0], cumulative))[stop_offsets[:-1]]
+        total = np.concatenate(([0.0], cumulative))[stop_offsets[1:]] - base
+
+    def draw_stops(scenarios) -> np.ndarray:
+        # draws a stop of every given scenario, as a position in stop_indices. The stops are drawn by their
+        # weights, uniformly if they have none or if all of their weights are 0 like an AliasTable.
+        u = rng.random(len(scenarios))
+        position = stop_offsets[scenarios] + np.floor(u * sizes[scenarios]).astype(np.intp)
+        if demand_weights is not None:
+            weighted = total[scenarios] > 0
+            position[weighted] = np.searchsorted(
+                cumulative, base[scenarios[weighted]] + u[weighted] * total[scenarios[weighted]], side='right')
+        return np.minimum(position, stop_offsets[scenarios + 1] - 1)
+
+    def distance(i, j) -> np.ndarray:
+        i, j = stop_indices[i], stop_indices[j]
+        if distance_matrix is not None:
+            return distance_matrix.distance(i, j)
+        return haversine(lon[i], lat[i], lon[j], lat[j])
+
+    # the bins that can occur in a scenario, from the longest distance between the corners of the
+    # box around its stops. A scenario with a single stop has no trips between two stops.
+    feasible = np.zeros((len(sizes), number_of_bins), dtype=bool)
+    occupied = np.flatnonzero(sizes > 1)
+    if len(occupied):
+        starts = stop_offsets[:-1][sizes > 0]
+        lon_min, lon_max = (reduce.reduceat(lon[stop_indices], starts)[sizes[sizes > 0] > 1] for reduce in (np.minimum, np.maximum))
+        lat_min, lat_max = (reduce.reduceat(lat[stop_indices], starts)[sizes[sizes > 0] > 1] for reduce in (np.minimum, np.maximum))
+        max_distance = np.maximum.reduce([
+            haversine(lon_min, lat_min, lon_max, lat_max), haversine(lon_min, lat_max, lon_max, lat_min),
+            haversine(lon_min, lat_min, lon_max, lat_min), haversine(lon_min, lat_max, lon_max, lat_max)])
+        feasible[occupied] = np.arange(number_of_bins) <= max_distance[:, None]
+
+    # the bins that occur are found from all pairs of the scenarios with up to max_pairwise_stops
+    # stops, and of those with fewer pairs than 20 per trip, which costs less than a round of rejections
+    pairs = sizes * (sizes - 1) // 2
+    pairwise = np.flatnonzero((sizes > 1) & ((sizes <= max_pairwise_stops) | (pairs <= 20 * np.bincount(scenario, minlength=len(sizes)))))
+    if len(pairwise):
+        pair_scenario = np.repeat(pairwise, pairs[pairwise])
+        k = np.arange(len(pair_scenario)) - np.repeat(np.cumsum(pairs[pairwise]) - pairs[pairwise], pairs[pairwise])
+        # the k-th pair (i, j) with i < j of a scenario, from the triangular numbers
+        j = np.floor((1 + np.sqrt(1 + 8 * k)) / 2).astype(np.intp)
+        j -= j * (j - 1) // 2 > k
+        j += j * (j + 1) // 2 <= k
+        i = k - j * (j - 1) // 2
+        pair_bin = np.minimum(distance(stop_offsets[pair_scenario] + i, stop_offsets[pair_scenario] + j), number_of_bins).astype(np.intp)
+        feasible[pairwise] &= np.bincount(
+            pair_scenario * (number_of_bins + 1) + pair_bin,
+            minlength=len(sizes) * (number_of_bins + 1)).reshape(len(sizes), number_of_bins + 1)[pairwise, :number_of_bins] > 0
+
+    # rejection rounds over the trips that are left, with a growing number of pairs per trip, of at most
+    # round_size pairs once there are fewer trips. Like a TripSampler, the trips of a bin of a scenario get
+    # at most max_rounds * (20n + 1024) pairs together, after which they are left unconstrained.
+    pickup = np.zeros(len(scenario), dtype=np.intp)
+    dropoff = np.zeros(len(scenario), dtype=np.intp)
+    filled = np.zeros(len(scenario), dtype=bool)
+    group = scenario * number_of_bins + distance_bin
+    budget = max_rounds * (20 * np.bincount(group, minlength=len(sizes) * number_of_bins) + 1024)
+    used = np.zeros(len(budget), dtype=np.int64)
+    remaining = np.flatnonzero(feasible[scenario, distance_bin])
+    proposals, round_size = 4, 1 << 17
+
+    while len(remaining):
+        proposals = max(min(proposals, round_size // len(remaining)), 1)
+        scenarios = np.repeat(scenario[remaining], proposals)
+        pickups, dropoffs = draw_stops(scenarios), draw_stops(scenarios)
+        trip_distance = distance(pickups, dropoffs)
+        bins = np.repeat(distance_bin[remaining], proposals)
+
+        in_bin = ((trip_distance >= bins) & (trip_distance < bins + 1) & (pickups != dropoffs)).reshape(-1, proposals)
+        accepted = in_bin.any(axis=1)
+        first = (np.argmax(in_bin, axis=1) + np.arange(len(remaining)) * proposals)[accepted]
+        pickup[remaining[accepted]] = pickups[first]
+        dropoff[remaining[accepted]] = dropoffs[first]
+        filled[remaining[accepted]] = True
+
+        used += np.bincount(group[remaining], minlength=len(used)) * proposals
+        remaining = remaining[~accepted]
+        remaining = remaining[used[group[remaining]] < budget[group[remaining]]]
+        proposals = min(2 * proposals, 1024)
+
+    # the remaining trips get the bin of their actual distance, clipped to the last bin
+    remaining = np.flatnonzero(~filled)
+    if len(remaining):
+        scenarios = scenario[remaining]
+        pickup[remaining], dropoff[remaining] = draw_stops(scenarios), draw_stops(scenarios)
+        # draw the dropoffs at the pickup again, there is no other stop if they keep coming up
+        for _ in range(32):
+            same = remaining[(pickup[remaining] == dropoff[remaining]) & (sizes[scenarios] > 1)]
+            if not len(same):
+                break
+            dropoff[same] = draw_stops(scenario[same])
+        trip_distance = distance(pickup[remaining], dropoff[remaining])
+        distance_bin[remaining] = np.minimum(trip_distance, number_of_bins - 1).astype(np.intp)
+
+    return {'scenario': scenario, 'pickup': pickup, 'dropoff': dropoff, 'distance_bin': distance_bin}
+
+def _sample_trips_in_bin(draw_stops, distance, distance_bin, n, number_of_bins, max_rounds, rng, acceptance_rate=0.5, round_size=1 << 17) -> tuple:
+    # samples n trips (pickup, dropoff) between the given stops, with a distance in
+    # [distance_bin, distance_bin + 1) km. Trip pairs are drawn with draw_stops and rejected if
+    # their distance falls outside of the bin, or if pickup and dropoff are the same stop. At most
+    # max_rounds * (20n + 1024) pairs are drawn, in rounds of at most round_size pairs so the arrays
+    # stay in cache. The number of pairs drawn per round follows the expected acceptance rate, after
+    # the first round that of the previous round. If the bin can not be filled, e.g. because the bounding
+    # box is too small for long trips, the remaining trips get the bin of their actual distance, clipped
+    # to the last bin.
+    pickups, dropoffs, distances = [], [], []
+    needed, budget = n, max_rounds * (20 * n + 1024)
+
+    while budget > 0:
+        proposals = min(int(needed / acceptance_rate * 1.1) + 16, budget, round_size)
+        budget -= proposals
+        pickup = draw_stops(proposals, rng)
+        dropoff = draw_stops(proposals, rng)
+        trip_distance = distance(pickup, dropoff)
+
+        in_bin = (trip_distance >= distance_bin) & (trip_distance < distance_bin + 1) & (pickup != dropoff)
+        accepted = np.flatnonzero(in_bin)[:needed]
+        pickups.append(pickup[accepted])
+        dropoffs.append(dropoff[accepted])
+        distances.append(trip_distance[accepted])
+
+        needed -= len(accepted)
+        if not needed:
+            break
+        acceptance_rate = max(np.mean(in_bin), 1 / proposals)
+
+    bins = [np.full(n - needed, distance_bin, dtype=np.int8)]
+
+    # fall back to unconstrained trips for a bin that could not be filled
+    if needed:
+        pickup = draw_stops(needed, rng)
+        dropoff = draw_stops(needed, rng)
+        # draw the dropoffs at the pickup again, there is no other stop if they keep coming up
+        for _ in range(32):
+            same = np.flatnonzero(pickup == dropoff)
+            if not len(same):
+                break
+            dropoff[same] = draw_stops(len(same), rng)
+        trip_distance = distance(pickup, dropoff)
+        pickups.append(pickup)
+        dropoffs.append(dropoff)
+        distances.append(trip_distance)
+        bins.append(np.minimum(trip_distance, number_of_bins - 1).astype(np.int8))
+
+    return np.concatenate(pickups), np.concatenate(dropoffs), np.concatenate(distances), np.concatenate(bins)
+
+def _sample_trips_in_bin_from_matrix(matrix, within_bounds, local_index, dropoff_weights, max_neighbours, draw_stops, distance, distance_bin, n, number_of_bins, max_rounds, rng) -> tuple:
+    # samples n trips with a distance in [distance_bin, distance_bin + 1) km using the neighbour
+    # lists of a DistanceMatrix: a pickup from draw_stops, then a uniform neighbour of that pickup
+    # in the bin. The trip is accepted in proportion to the number of neighbours of the pickup in the
+    # bin and the weight of the dropoff, which is 0 outside of the bounding box, so every pair is drawn
+    # in proportion to the product of its weights as by _sample_trips_in_bin.
+    # Trips that can not be drawn this way are left unconstrained by _sample_trips_in_bin.
+    pickups, dropoffs, distances = [], [], []
+    needed, acceptance_rate = n, 0.5
+
+    for _ in range(max_rounds):
+        proposals = min(int(needed / acceptance_rate * 1.1) + 16, 20 * n + 1024, 1 << 17)
+        pickup = within_bounds[draw_stops(proposals, rng)]
+        dropoff, in_bin = matrix.sample_dropoffs(pickup, distance_bin, dropoff_weights, max_neighbours, rng)
+
+        accepted = np.flatnonzero(in_bin)[:needed]
+        pickups.append(local_index[pickup[accepted]])
+        dropoffs.append(local_index[dropoff[accepted]])
+        distances.append(matrix.distance(pickup[accepted], dropoff[accepted]))
+
+        needed -= len(accepted)
+        if not needed:
+            break
+        acceptance_rate = max(np.mean(in_bin), 1 / proposals)
+
+    bins = [np.full(n - needed, distance_bin, dtype=np.int8)]
+
+    if needed:
+        pickup, dropoff, distance, remaining_bins = _sample_trips_in_bin(
+            draw_stops, distance, distance_bin, needed, number_of_bins, 0, rng)
+        pickups.append(pickup)
+        dropoffs.append(dropoff)
+        distances.append(distance)
+        bins.append(remaining_bins)
+
+    return np.concatenate(pickups), np.concatenate(dropoffs), np.concatenate(distances), np.concatenate(bins)
@@ -0,0 +1,137 @@
+###################################################################
+# Script Name	 : "TEST_API.PY"
+# Description	 : Tests for the webapp/api.py file
+# Args           :
+# Author       	 : Floris Remmen
+# Email          : floris.remmen@gmail.com
+# Date           : "18 October 2026"
+###################################################################
+
+import unittest
+from webapp import create_app
+
+from simulator.simulator import Simulator
+
+import json
+
+class TestApi(unittest.TestCase):
+    """
+    Testcase for the json api of the webapp
+    """
+
+    @classmethod
+    def setUpClass(self):
+        """
+        Creates the application once, it loads the static data.
+        """
+        self.application = create_app()
+        self.bounding_box = (13.34014892578125, 52.52791908000258, 13.506317138671875, 52.562995039558004)
+        self.arguments = dict(zip(('x1', 'y1', 'x2', 'y2'), self.bounding_box))
+
+    def setUp(self):
+        self.client = self.application.test_client()
+
+    def test_simulate_geojson(self):
+        """
+        Small simulations should be a GeoJSON FeatureCollection with the same results as the simulator.
+        """
+        response = self.client.get('/api/simulate', query_string=dict(self.arguments, number_of_requests=50, seed=3))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/geo+json')
+
+        collection = response.get_json(force=True)
+        self.assertEqual(collection['type'], 'FeatureCollection')
+        self.assertEqual(collection['bounding_box'], list(self.bounding_box))
+
+        trips = [f for f in collection['features'] if f['properties']['role'] == 'trip']
+        pickups = [f for f in collection['features'] if f['properties']['role'] == 'pickup']
+        self.assertEqual(len(trips), 50)
+        self.assertEqual(trips[0]['geometry']['type'], 'LineString')
+
+        simulation = Simulator(bounding_box=self.bounding_box).simulate(50, seed=3)
+        self.assertDictEqual(collection['booking_distance_bins'], simulation['booking_distance_bins'])
+        self.assertListEqual(
+            [f['properties']['id'] for f in pickups],
+            list(simulation['most_popular_pickup_points'].decoded_ids))
+        self.assertListEqual(
+            [f['properties']['count'] for f in pickups],
+            list(simulation['most_popular_pickup_points'].counts))
+
+    def test_simulate_ndjson(self):
+        """
+        Large simulations should be streamed as one feature per line, followed by the booking distance bins.
+        """
+        self.application.config['API_GEOJSON_MAX_REQUESTS'] = 100
+        try:
+            response = self.client.get('/api/simulate', query_string=dict(self.arguments, number_of_requests=25000))
+        finally:
+            self.application.config['API_GEOJSON_MAX_REQUESTS'] = 10000
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        self.assertTrue(response.is_streamed)
+
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual(sum(1 for line in lines[:-1] if line['properties']['role'] == 'trip'), 25000)
+        self.assertEqual(sum(lines[-1]['booking_distance_bins'].values()), 25000)
+        self.assertEqual(lines[-1]['bounding_box'], list(self.bounding_box))
+
+    def test_bbox_stats(self):
+        """
+        The number of stops should be the number of stops the simulator finds in the bounding box.
+        """
+        response = self.client.get('/api/bbox-stats', query_string=self.arguments)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.get_json()['stops'],
+            len(Simulator(bounding_box=self.bounding_box).get_stop_indices()))
+
+        # a box without width, e.g. while its corner is typed
+        response = self.client.get('/api/bbox-stats', query_string=dict(self.arguments, x2=self.arguments['x1']))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['stops'], 0)
+
+        response = self.client.get('/api/bbox-stats', query_string=dict(self.arguments, x2=''))
+        self.assertEqual(response.status_code, 400)
+
+        self.assertFalse(self.client.get('/api/bbox-stats', query_string=self.arguments).get_json()['outside_city'])
+        response = self.client.get('/api/bbox-stats', query_string={'x1': 2.29, 'y1': 48.84, 'x2': 2.39, 'y2': 48.88})
+        self.assertTrue(response.get_json()['outside_city'])
+
+    def test_city_boundary(self):
+        """
+        Bounding boxes outside of berlin should be rejected, those that reach outside of it clipped.
+        """
+        response = self.client.get('/api/simulate', query_string={'x1': 2.29, 'y1': 48.84, 'x2': 2.39, 'y2': 48.88, 'number_of_requests': 5})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()['error'], 'the bounding box is outside of berlin')
+
+        # a bounding box around all of berlin is clipped to the envelope of its boundary
+        response = self.client.get('/api/simulate', query_string={'x1': 12.0, 'y1': 51.0, 'x2': 15.0, 'y2': 54.0, 'number_of_requests': 5})
+        self.assertEqual(response.status_code, 200)
+        x1, y1, x2, y2 = response.get_json(force=True)['bounding_box']
+        self.assertTrue(12.0 < x1 < x2 < 15.0 and 51.0 < y1 < y2 < 54.0)
+
+        self.application.config['CLIP_TO_CITY'] = False
+        try:
+            response = self.client.get('/api/simulate', query_string={'x1': 12.0, 'y1': 51.0, 'x2': 15.0, 'y2': 54.0, 'number_of_requests': 5})
+        finally:
+            self.application.config['CLIP_TO_CITY'] = True
+        self.assertEqual(response.get_json(force=True)['bounding_box'], [12.0, 51.0, 15.0, 54.0])
+
+    def test_bad_requests(self):
+        """
+        Invalid arguments should be answered with status 400 and an error message.
+        """
+        for arguments in (
+                {'number_of_requests': 5},
+                dict(self.arguments, number_of_requests='many'),
+                dict(self.arguments, number_of_requests=0),
+                dict(self.arguments, number_of_requests=5, seed=-1),
+                dict(self.arguments, number_of_requests=5, format='csv'),
+                dict(self.arguments, number_of_requests=20000, format='geojson')):
+            response = self.client.get('/api/simulate', query_string=arguments)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('error', response.get_json())
+
+    if __name__ == "__main__":
+        unittest.main()
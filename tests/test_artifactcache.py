@@ -0,0 +1,186 @@
+###################################################################
+# Script Name	 : "TEST_ARTIFACTCACHE.PY"
+# Description	 : Tests for the utilities/artifactcache.py file
+# Args           :
+# Author       	 : Floris Remmen
+# Email          : floris.remmen@gmail.com
+# Date           : "18 October 2026"
+###################################################################
+
+import unittest
+from utilities.artifactcache import ArtifactCache, MemoryArtifactCache
+from webapp.jobs import JobQueue
+
+import os
+import tempfile
+import threading
+
+class TestArtifactCache(unittest.TestCase):
+    """
+    Testcase for the ArtifactCache Class
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = ArtifactCache(self.directory.name, max_bytes=250)
+        self.names = ('overview_plot.png', 'map.html')
+
+    def write(self, key: str, mtime: int):
+        """
+        Writes 100 bytes for every artifact of a key, last used at mtime.
+        """
+        for name in self.names:
+            with open(self.cache.path(key, name), 'wb') as f:
+                f.write(b'0' * 50)
+            os.utime(self.cache.path(key, name), (mtime, mtime))
+
+    def test_key(self):
+        """
+        Keys should be stable and depend on every input.
+        """
+        key = self.cache.key((13.3, 52.5, 13.5, 52.6), 6, 0, ((1, 2),))
+        self.assertEqual(len(key), ArtifactCache.key_length)
+        self.assertEqual(key, self.cache.key((13.3, 52.5, 13.5, 52.6), 6, 0, ((1, 2),)))
+        self.assertNotEqual(key, self.cache.key((13.3, 52.5, 13.5, 52.6), 6, 1, ((1, 2),)))
+        self.assertNotEqual(key, self.cache.key((13.3, 52.5, 13.5, 52.6), 6, 0, ((1, 3),)))
+
+    def test_lookup(self):
+        """
+        A lookup should only hit if all artifacts exist, and mark them as used.
+        """
+        key = self.cache.key('a')
+        self.assertFalse(self.cache.lookup(key, self.names))
+
+        self.write(key, mtime=1000)
+        self.assertTrue(self.cache.lookup(key, self.names))
+        self.assertGreater(os.stat(self.cache.path(key, 'map.html')).st_mtime, 1000)
+
+        os.remove(self.cache.path(key, 'map.html'))
+        self.assertFalse(self.cache.lookup(key, self.names))
+        self.assertFalse(self.cache.lookup('../' + key[3:], self.names))
+
+    def test_evict(self):
+        """
+        The least recently used keys should be removed until the cache fits, except protected keys.
+        """
+        keys = [self.cache.key(i) for i in range(4)]
+        for i, key in enumerate(keys):
+            self.write(key, mtime=1000 + i)
+
+        # another file in the static folder is never removed
+        with open(os.path.join(self.directory.name, 'style.css'), 'w') as f:
+            f.write('body {}')
+
+        # the oldest key is in use again
+        self.cache.lookup(keys[0], self.names)
+
+        self.assertEqual(self.cache.evict(protected={keys[1]}), 2)
+        self.assertTrue(self.cache.lookup(keys[0], self.names))
+        self.assertTrue(self.cache.lookup(keys[1], self.names))
+        self.assertFalse(self.cache.lookup(keys[2], self.names))
+        self.assertFalse(self.cache.lookup(keys[3], self.names))
+        self.assertTrue(os.path.exists(os.path.join(self.directory.name, 'style.css')))
+
+        self.assertEqual(self.cache.evict(), 0)
+
+    def test_put(self):
+        """
+        A stored artifact should be readable, and leave no temporary files.
+        """
+        key = self.cache.key('a')
+        self.assertIsNone(self.cache.get(key, 'map.html'))
+
+        self.cache.put(key, 'map.html', b'<html></html>')
+        self.assertEqual(self.cache.get(key, 'map.html'), b'<html></html>')
+        self.assertListEqual(os.listdir(self.directory.name), [f'{key}_map.html'])
+        # a web server in front of the static folder can read it
+        self.assertEqual(os.stat(self.cache.path(key, 'map.html')).st_mode & 0o777, 0o644)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+class TestMemoryArtifactCache(unittest.TestCase):
+    """
+    Testcase for the MemoryArtifactCache Class
+    """
+
+    def setUp(self):
+        self.cache = MemoryArtifactCache(max_bytes=250)
+        self.names = ('overview_plot.png', 'map.html')
+
+    def test_put(self):
+        """
+        Artifacts should be readable from memory, and lookups should need all of them.
+        """
+        key = self.cache.key('a')
+        self.cache.put(key, 'overview_plot.png', b'0' * 50)
+        self.assertFalse(self.cache.lookup(key, self.names))
+        self.assertIsNone(self.cache.get(key, 'map.html'))
+
+        self.cache.put(key, 'map.html', b'0' * 50)
+        self.assertTrue(self.cache.lookup(key, self.names))
+        self.assertEqual(self.cache.get(key, 'map.html'), b'0' * 50)
+
+        # replacing an artifact does not count its old size
+        self.cache.put(key, 'map.html', b'0' * 20)
+        self.assertEqual(self.cache.size, 70)
+
+    def test_evict(self):
+        """
+        The least recently used keys should be dropped once the cache is full, except protected keys.
+        Storing an artifact should never drop other keys.
+        """
+        keys = [self.cache.key(i) for i in range(4)]
+        for key in keys[:2]:
+            for name in self.names:
+                self.cache.put(key, name, b'0' * 50)
+
+        # the oldest key is in use again, the next one is dropped to fit the new key
+        self.cache.lookup(keys[0], self.names)
+        for name in self.names:
+            self.cache.put(keys[2], name, b'0' * 50)
+        self.assertEqual(self.cache.size, 300)
+        self.assertEqual(self.cache.evict(), 1)
+        self.assertTrue(self.cache.lookup(keys[0], self.names))
+        self.assertFalse(self.cache.lookup(keys[1], self.names))
+        self.assertTrue(self.cache.lookup(keys[2], self.names))
+        self.assertEqual(self.cache.size, 200)
+
+        self.cache.max_bytes = 0
+        self.assertEqual(self.cache.evict(protected={keys[2]}), 1)
+        self.assertTrue(self.cache.lookup(keys[2], self.names))
+        self.assertEqual(self.cache.size, 100)
+
+    def test_concurrent_jobs(self):
+        """
+        The artifacts of jobs that are rendering at the same time should all be kept, also beyond max_bytes.
+        """
+        queue = JobQueue(workers=2)
+        both_rendering = threading.Barrier(3, timeout=5)
+        release = threading.Event()
+
+        def render(job):
+            self.cache.put(job.id, 'overview_plot.png', b'0' * 50)
+            both_rendering.wait()
+            release.wait(5)
+            self.cache.put(job.id, 'map.html', b'0' * 50)
+
+        self.cache.max_bytes = 50
+        jobs = [queue.submit(render, job_id=self.cache.key(i)) for i in range(2)]
+        both_rendering.wait()
+        # a new job is triggered while both jobs are rendering
+        self.assertEqual(self.cache.evict(protected=queue.active()), 0)
+        release.set()
+        queue._pool.shutdown(wait=True)
+
+        for job in jobs:
+            self.assertEqual(job.state, 'done')
+            self.assertTrue(self.cache.lookup(job.id, self.names))
+        self.assertEqual(self.cache.size, 200)
+
+        # once they are done, they are evicted like any other key
+        self.assertEqual(self.cache.evict(), 2)
+        self.assertEqual(self.cache.size, 0)
+
+    if __name__ == "__main__":
+        unittest.main()
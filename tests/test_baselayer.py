@@ -0,0 +1,77 @@
+###################################################################
+# Script Name	 : "TEST_BASELAYER.PY"
+# Description	 : Tests for the visualiser/baselayer.py file
+# Args           :
+# Author       	 : Floris Remmen
+# Email          : floris.remmen@gmail.com
+# Date           : "18 October 2026"
+###################################################################
+
+import unittest
+from visualiser.baselayer import BaseLayer
+
+import numpy as np
+
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+class TestBaseLayer(unittest.TestCase):
+    """
+    Testcase for the BaseLayer Class
+    """
+
+    def setUp(self):
+        """
+        Sets up a plain blue base layer over a 200 x 100 extent, so no tiles have to be downloaded.
+        """
+        image = np.zeros((50, 100, 4), dtype=np.uint8)
+        image[..., 2] = image[..., 3] = 255
+        self.base_layer = BaseLayer(image, extent=(0.0, 200.0, 0.0, 100.0))
+
+    def _figure(self, limits):
+        figure = Figure(figsize=(4, 3), dpi=50)
+        FigureCanvasAgg(figure)
+        ax = figure.add_axes([0.1, 0.1, 0.8, 0.8])
+        ax.scatter([100], [50], color='red', s=100)
+        ax.set_xlim(*limits[0])
+        ax.set_ylim(*limits[1])
+        ax.set_aspect('equal')
+        ax.set_axis_off()
+        return figure, ax
+
+    def test_composite(self):
+        """
+        The base layer should fill the axes under the markers, the rest of the figure stays white.
+        The background should be resampled only once for the same layout.
+        """
+        figure, ax = self._figure(((0, 200), (0, 100)))
+        image = np.asarray(self.base_layer.composite(figure, ax))
+
+        self.assertEqual(image.shape, (150, 200, 4))
+        x0, y0, x1, y1 = np.round(ax.bbox.extents).astype(int)
+        self.assertListEqual(list(image[150 - y1 + 2, x0 + 2]), [0, 0, 255, 255])
+        self.assertListEqual(list(image[2, 2]), [255, 255, 255, 255])
+        # the marker is drawn on top of the base layer
+        self.assertListEqual(list(image[150 - (y0 + y1) // 2, (x0 + x1) // 2][:3]), [255, 0, 0])
+
+        figure, ax = self._figure(((0, 200), (0, 100)))
+        self.base_layer.composite(figure, ax)
+        self.assertEqual(self.base_layer.background.cache_info().hits, 1)
+
+    def test_composite_outside(self):
+        """
+        Axes that reach outside of the base layer should still show the base layer where it is.
+        """
+        figure, ax = self._figure(((-200, 200), (-100, 100)))
+        image = np.asarray(self.base_layer.composite(figure, ax))
+
+        x0, y0, x1, y1 = np.round(ax.bbox.extents).astype(int)
+        self.assertListEqual(list(image[150 - y1 + 2, x1 - 2]), [0, 0, 255, 255])
+        self.assertListEqual(list(image[150 - y0 - 2, x0 + 2]), [255, 255, 255, 255])
+        self.assertEqual(self.base_layer.background.cache_info().misses, 0)
+
+    def tearDown(self):
+        pass
+
+    if __name__ == "__main__":
+        unittest.main()
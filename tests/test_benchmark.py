@@ -0,0 +1,101 @@
+###################################################################
+# Script Name	 : "TEST_BENCHMARK.PY"
+# Description	 : Tests for the benchmarks/benchmark.py and
+#                  benchmarks/synthetic.py files
+# Args           :
+# Author       	 : Floris Remmen
+# Email          : floris.remmen@gmail.com
+# Date           : "18 October 2026"
+###################################################################
+
+import unittest
+from benchmarks.benchmark import measure, compare, over_budget
+from benchmarks.synthetic import write_scaled_stops
+
+import os
+import json
+import tempfile
+import numpy as np
+
+class TestBenchmark(unittest.TestCase):
+    """
+    Testcase for the benchmarks
+    """
+
+    def test_write_scaled_stops(self):
+        """
+        A scaled stop set should hold every stop `scale` times, the first copy unchanged, with unique ids.
+        """
+        with open('data/berlin_stops.geojson') as f:
+            original = json.load(f)['features']
+
+        with tempfile.TemporaryDirectory() as directory:
+            stops_file = os.path.join(directory, 'stops.geojson')
+            number_of_stops = write_scaled_stops('data/berlin_stops.geojson', stops_file, 3)
+            with open(stops_file) as f:
+                features = json.load(f)['features']
+
+        self.assertEqual(number_of_stops, 3 * len(original))
+        self.assertEqual(len(features), number_of_stops)
+
+        ids = [feature['properties']['id'] for feature in features]
+        self.assertEqual(len(set(ids)), len(ids))
+        self.assertTrue(all(len(identifier) == 12 for identifier in ids))
+
+        coordinates = np.array([feature['geometry']['coordinates'] for feature in features]).reshape(3, len(original), 2)
+        self.assertTrue(np.array_equal(coordinates[0], [feature['geometry']['coordinates'] for feature in original]))
+        # the jittered copies stay close to the original stops
+        self.assertLess(np.abs(coordinates[1:] - coordinates[0]).max(), 0.05)
+        self.assertFalse(np.array_equal(coordinates[1], coordinates[0]))
+
+    def test_measure(self):
+        """
+        A measurement should hold at most `repeat` timed runs and the peak memory of the function.
+        """
+        result = measure(lambda: np.ones(2 ** 20), repeat=3)
+
+        self.assertLessEqual(result['runs'], 3)
+        self.assertLessEqual(result['min'], result['median'])
+        self.assertGreaterEqual(result['peak_mb'], 8)
+
+        calls = []
+        measure(calls.append, setup=lambda: len(calls), repeat=2, max_time=10)
+        self.assertEqual(calls, [0, 1, 2])
+
+    def test_compare(self):
+        """
+        Only growth beyond the tolerance and the noise floor should be a regression.
+        """
+        baseline = {
+            'slower@1x': {'median': 0.1, 'peak_mb': 10},
+            'noise@1x': {'median': 0.0001, 'peak_mb': 0.1},
+            'bigger@1x': {'median': 0.1, 'peak_mb': 10},
+            'removed@1x': {'median': 0.1, 'peak_mb': 10}
+        }
+        results = {
+            'slower@1x': {'median': 0.2, 'peak_mb': 10},
+            'noise@1x': {'median': 0.0005, 'peak_mb': 0.5},
+            'bigger@1x': {'median': 0.09, 'peak_mb': 20},
+            'added@1x': {'median': 0.1, 'peak_mb': 10}
+        }
+
+        self.assertEqual(compare(results, baseline, tolerance=0.25), [
+            ('bigger@1x', 'peak_mb', 10, 20),
+            ('slower@1x', 'median', 0.1, 0.2)
+        ])
+        self.assertEqual(compare(results, baseline, tolerance=1.5), [])
+
+    def test_over_budget(self):
+        """
+        Cold starts with a median time over their budget should be flagged, at every scale.
+        """
+        results = {
+            'cold_import_webapp@1x': {'median': 0.5},
+            'cold_import_webapp@10x': {'median': 2.0},
+            'simulate_100_small@1x': {'median': 100.0}
+        }
+
+        self.assertEqual(over_budget(results, {'cold_import_webapp': 1.0}), [('cold_import_webapp@10x', 'budget', 1.0, 2.0)])
+
+    if __name__ == "__main__":
+        unittest.main()
@@ -9,8 +9,11 @@
 
 import unittest
 from utilities.bounding_box import BoundingBox
+from utilities.projection import get_transformer
 import math
 
+import numpy as np
+
 import warnings
 
 class TestBoundingBox(unittest.TestCase):
@@ -45,6 +48,19 @@ class TestBoundingBox(unittest.TestCase):
         self.assertRaises((ValueError, TypeError), self.bad_bbox.to_crs()) 
         self.assertEqual(self.good_bbox.to_crs(), ((1485018.5855244042, 6896148.6918886015, 1503516.3463694167, 6902569.402264554)))
     
+    def test_to_crs_many(self): 
+        """
+        Projecting many bounding boxes at once should give the same values as projecting them one by one,
+        and the transformer should be shared between calls.
+        """
+        bounding_boxes = [self.good_bbox.bounding_box, [13.1, 52.4, 13.2, 52.45]]
+        projected = BoundingBox.to_crs_many(bounding_boxes)
+
+        self.assertEqual(projected.shape, (2, 4))
+        for bounding_box, row in zip(bounding_boxes, projected): 
+            np.testing.assert_allclose(row, BoundingBox(bounding_box).to_crs())
+        self.assertIs(get_transformer(4326, 3857), get_transformer(4326, 3857))
+
     def test_lats(self):
         """
         Tests the lats property. Should return TypeError for bad_bbox.
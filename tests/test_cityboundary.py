@@ -0,0 +1,85 @@
+###################################################################
+# Script Name	 : "TEST_CITYBOUNDARY.PY"
+# Description	 : Tests for the utilities/cityboundary.py file
+# Args           :
+# Author       	 : Floris Remmen
+# Email          : floris.remmen@gmail.com
+# Date           : "18 October 2026"
+###################################################################
+
+import unittest
+from utilities.cityboundary import CityBoundary
+from utilities.staticdatareader import StaticDataReader
+
+import numpy as np
+
+class TestCityBoundary(unittest.TestCase):
+    """
+    Testcase for the CityBoundary Class
+    """
+
+    @classmethod
+    def setUpClass(self):
+        """
+        Builds the boundary of berlin once.
+        """
+        self.city_boundary = StaticDataReader('data/berlin_bounds.poly', 'data/berlin_stops.geojson').city_boundary
+
+        self.bounding_box = (13.34014892578125, 52.52791908000258, 13.506317138671875, 52.562995039558004)
+        self.paris = (2.29, 48.84, 2.39, 48.88)
+
+    def test_polygon(self):
+        """
+        The boundary should be a valid polygon around the center of berlin.
+        """
+        self.assertTrue(self.city_boundary.polygon.is_valid)
+        west, south, east, north = self.city_boundary.bounds
+        self.assertTrue(west < 13.40 < east and south < 52.52 < north)
+
+    def test_within(self):
+        """
+        A bounding box within the city should be returned as it is, with or without clipping.
+        """
+        self.assertEqual(self.city_boundary.validate(self.bounding_box), self.bounding_box)
+        self.assertEqual(self.city_boundary.validate(self.bounding_box, clip=False), self.bounding_box)
+
+    def test_outside(self):
+        """
+        A bounding box outside of the city should be None, with or without clipping.
+        """
+        self.assertIsNone(self.city_boundary.validate(self.paris))
+        self.assertIsNone(self.city_boundary.validate(self.paris, clip=False))
+        # within the envelope of the boundary, but not within the city
+        west, south, east, north = self.city_boundary.bounds
+        self.assertIsNone(self.city_boundary.validate((west, south, west + 0.01, south + 0.01)))
+        self.assertIsNone(self.city_boundary.validate((np.nan, 52.5, 13.5, 52.6)))
+
+    def test_clip(self):
+        """
+        A bounding box that reaches outside of the city should be clipped to its part within the city.
+        """
+        west, south, east, north = self.city_boundary.bounds
+
+        # a bounding box around the city is clipped to its envelope
+        self.assertEqual(self.city_boundary.validate((12.0, 51.0, 15.0, 54.0)), self.city_boundary.bounds)
+        self.assertEqual(self.city_boundary.validate((12.0, 51.0, 15.0, 54.0), clip=False), (12.0, 51.0, 15.0, 54.0))
+
+        # a bounding box over the eastern border, in reversed corner order
+        x1, y1, x2, y2 = self.city_boundary.validate((14.0, 52.55, 13.6, 52.45))
+        self.assertTrue(13.6 <= x1 < x2 <= east < 14.0)
+        self.assertTrue(52.45 <= y1 < y2 <= 52.55)
+
+    def test_cache(self):
+        """
+        The results of repeated bounding boxes should be cached.
+        """
+        boundary = CityBoundary(*np.array(self.city_boundary.polygon.exterior.coords).T)
+
+        for _ in range(3):
+            boundary.validate(self.bounding_box)
+            boundary.validate(list(self.bounding_box), clip=False)
+        self.assertEqual(boundary.clip.cache_info().misses, 1)
+        self.assertEqual(boundary.clip.cache_info().hits, 5)
+
+    if __name__ == "__main__":
+        unittest.main()
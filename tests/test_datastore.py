@@ -0,0 +1,57 @@
+###################################################################
+# Script Name	 : "TEST_DATASTORE.PY"
+# Description	 : Tests for the utilities/datastore.py file
+# Args           :
+# Author       	 : Floris Remmen
+# Email          : floris.remmen@gmail.com
+# Date           : "18 October 2026"
+###################################################################
+
+import unittest
+from utilities.datastore import StaticDataStore
+
+import os
+import shutil
+import tempfile
+
+class TestStaticDataStore(unittest.TestCase):
+    """
+    Testcase for the StaticDataStore Class
+    """
+
+    def setUp(self):
+        """
+        Copies the static data files to a temporary directory, so their mtime can be changed.
+        """
+        self.directory = tempfile.mkdtemp()
+        self.berlin_bounds_file = shutil.copy('data/berlin_bounds.poly', self.directory)
+        self.berlin_stops_file = shutil.copy('data/berlin_stops.geojson', self.directory)
+
+    def test_get_is_shared(self):
+        """
+        Two calls with the same files should return the same reader instance.
+        """
+        first = StaticDataStore.get(self.berlin_bounds_file, self.berlin_stops_file)
+        second = StaticDataStore.get(self.berlin_bounds_file, self.berlin_stops_file)
+
+        self.assertIs(first, second)
+        self.assertFalse(first.berlin_stops.empty)
+
+    def test_get_reloads_changed_files(self):
+        """
+        Changing the mtime of one of the files should reload the reader.
+        """
+        first = StaticDataStore.get(self.berlin_bounds_file, self.berlin_stops_file)
+
+        stat = os.stat(self.berlin_stops_file)
+        os.utime(self.berlin_stops_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+        second = StaticDataStore.get(self.berlin_bounds_file, self.berlin_stops_file)
+        self.assertIsNot(first, second)
+
+    def tearDown(self):
+        StaticDataStore.clear()
+        shutil.rmtree(self.directory)
+
+    if __name__ == "__main__":
+        unittest.main()
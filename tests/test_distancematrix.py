@@ -0,0 +1,128 @@
+###################################################################
+# Script Name	 : "TEST_DISTANCEMATRIX.PY"
+# Description	 : Tests for the simulator/distancematrix.py file
+# Args           :
+# Author       	 : Floris Remmen
+# Email          : floris.remmen@gmail.com
+# Date           : "18 October 2026"
+###################################################################
+
+import unittest
+from simulator.distancematrix import DistanceMatrix
+from simulator.distances import haversine
+from simulator.simulator import Simulator
+from simulator.sampling import AliasTable
+from simulator.trips import TripSampler
+from utilities.staticdatareader import StaticDataReader
+
+import numpy as np
+import shutil
+import tempfile
+
+class TestDistanceMatrix(unittest.TestCase):
+    """
+    Testcase for the DistanceMatrix Class
+    """
+
+    @classmethod
+    def setUpClass(self):
+        """
+        Builds a distance matrix for the berlin stops in a temporary cache directory.
+        """
+        self.cache_dir = tempfile.mkdtemp()
+        self.static_data = StaticDataReader('data/berlin_bounds.poly', 'data/berlin_stops.geojson', cache_dir=self.cache_dir)
+        self.stops = self.static_data.berlin_stops
+        self.matrix = DistanceMatrix.build(
+            self.stops.lon, self.stops.lat, 'data/berlin_stops.geojson', self.cache_dir, number_of_bins=4)
+
+    def test_build(self):
+        """
+        The matrix should hold the floored haversine distances, and every neighbour row should
+        be sorted by distance with the bin offsets at the 1km edges.
+        """
+        rows = np.array([0, 1, 1000, len(self.stops) - 1])
+        expected = haversine(self.stops.lon[rows, None], self.stops.lat[rows, None], self.stops.lon[None, :], self.stops.lat[None, :])
+        np.testing.assert_allclose(self.matrix.distance(rows[:, None], np.arange(len(self.stops))[None, :]), expected, atol=1e-3)
+
+        for row in rows:
+            sorted_distances = self.matrix.distances[row, self.matrix.neighbours[row]]
+            self.assertTrue(np.all(np.diff(sorted_distances.astype(np.int64)) >= 0))
+
+            for distance_bin in range(self.matrix.number_of_bins):
+                lo, hi = self.matrix.bin_offsets[row, distance_bin], self.matrix.bin_offsets[row, distance_bin + 1]
+                self.assertTrue(np.all(sorted_distances[lo:hi] // 1000 == distance_bin))
+
+    def test_load(self):
+        """
+        The matrix should be loaded memory mapped from the cache directory, and not at all from an empty directory.
+        """
+        matrix = DistanceMatrix.load('data/berlin_stops.geojson', self.cache_dir)
+
+        self.assertIsInstance(matrix.distances, np.memmap)
+        self.assertIsNone(DistanceMatrix.load('data/berlin_stops.geojson', tempfile.gettempdir() + '/does_not_exist'))
+
+    def test_generate_trips(self):
+        """
+        Trips generated with the matrix should be between two different stops within the bounding box and in their distance bin.
+        """
+        simulator = Simulator(
+            bounding_box=(13.34014892578125, 52.52791908000258, 13.506317138671875, 52.562995039558004),
+            static_data=self.static_data,
+            distance_matrix=self.matrix
+        )
+        chunk = next(simulator.generate_trips(5000, seed=1))
+
+        within_bounds = set(simulator.get_stop_indices())
+        self.assertTrue(set(chunk['pickup']) <= within_bounds)
+        self.assertTrue(set(chunk['dropoff']) <= within_bounds)
+        self.assertFalse(np.any(chunk['pickup'] == chunk['dropoff']))
+        np.testing.assert_array_equal(chunk['distance_bin'], np.floor(chunk['distance']))
+
+    def test_feasible_bins(self):
+        """
+        A bin without neighbours of any stop in the bounding box should not be sampled, and trips that the 
+        matrix can not draw should not be drawn again by rejection on the haversine distance.
+        """
+        within_bounds = self.static_data.stop_index.query((13.405, 52.518, 13.42, 52.527))
+
+        class Sampler(TripSampler):
+            # only the matrix tells which bins occur
+            max_pairwise_stops = 0
+
+        sampler = Sampler(self.stops.lon, self.stops.lat, within_bounds, Simulator.booking_distance_distribution, 16, self.matrix)
+        offsets = np.asarray(self.matrix.bin_offsets[within_bounds])
+        np.testing.assert_array_equal(sampler.feasible[:2], (offsets[:, 1:3] > offsets[:, :2]).any(axis=0))
+        self.assertFalse(sampler.feasible[2:].any())
+
+        # every bin but the first is filled up without any rounds on the haversine distance
+        calls = []
+        distance = sampler.distance
+        sampler.distance = lambda i, j: calls.append(len(i)) or distance(i, j)
+        trips = sampler.sample(20000, np.random.default_rng(0))
+        self.assertEqual(len(trips['pickup']), 20000)
+        self.assertLessEqual(len(calls), 3)
+
+    def test_same_distribution(self):
+        """
+        Trips drawn with the matrix should have the same pickup and dropoff counts as trips drawn by rejection on
+        the haversine distance, up to the difference between two seeds, with and without demand weights.
+        """
+        within_bounds = self.static_data.stop_index.query((13.34014892578125, 52.52791908000258, 13.506317138671875, 52.562995039558004))
+        weights = np.random.default_rng(0).uniform(0, 3, len(within_bounds))
+
+        for alias_table in (None, AliasTable(weights)):
+            def counts(distance_matrix, seed):
+                sampler = TripSampler(self.stops.lon, self.stops.lat, within_bounds, Simulator.booking_distance_distribution, 16, distance_matrix, alias_table)
+                trips = sampler.sample(200000, np.random.default_rng(seed))
+                return np.concatenate([np.bincount(trips[column], minlength=len(self.stops)) for column in ('pickup', 'dropoff')]) / 200000
+
+            noise = np.abs(counts(None, 1) - counts(None, 2)).sum()
+            self.assertLess(np.abs(counts(None, 1) - counts(self.matrix, 1)).sum(), 1.5 * noise)
+
+    @classmethod
+    def tearDownClass(self):
+        del self.matrix
+        shutil.rmtree(self.cache_dir)
+
+    if __name__ == "__main__":
+        unittest.main()
@@ -0,0 +1,103 @@
+###################################################################
+# Script Name	 : "TEST_JOBS.PY"
+# Description	 : Tests for the webapp/jobs.py file
+# Args           :
+# Author       	 : Floris Remmen
+# Email          : floris.remmen@gmail.com
+# Date           : "18 October 2026"
+###################################################################
+
+import unittest
+from webapp.jobs import JobQueue
+
+import time
+import logging
+import threading
+
+class TestJobQueue(unittest.TestCase):
+    """
+    Testcase for the JobQueue and RenderJob Classes
+    """
+
+    def setUp(self):
+        self.queue = JobQueue(workers=2, max_jobs=2)
+
+    def test_submit(self):
+        """
+        A job should be returned immediately, and report its artifacts while it is running.
+        """
+        release = threading.Event()
+        overview_done = threading.Event()
+
+        def render(job, name):
+            job.complete('overview', f'{name}_overview_plot.png')
+            overview_done.set()
+            release.wait(5)
+            job.complete('closeup', f'{name}_closeup_plot.png')
+
+        job = self.queue.submit(render, 'test')
+        self.assertIs(self.queue.get(job.id), job)
+
+        overview_done.wait(5)
+        self.assertEqual(job.state, 'running')
+        self.assertDictEqual(job.completed, {'overview': 'test_overview_plot.png'})
+
+        release.set()
+        self.queue._pool.shutdown(wait=True)
+        self.assertEqual(job.state, 'done')
+        self.assertEqual(len(job.completed), 2)
+
+    def test_failure(self):
+        """
+        A failing job should store its error, and old finished jobs should be forgotten.
+        """
+        logging.getLogger('webapp.jobs').disabled = True
+
+        def fail(job):
+            raise ValueError('no stops in the bounding box')
+
+        jobs = []
+        for _ in range(4):
+            jobs.append(self.queue.submit(fail))
+            while not jobs[-1].finished:
+                time.sleep(0.01)
+
+        self.assertEqual(jobs[0].state, 'failed')
+        self.assertEqual(jobs[0].error, 'no stops in the bounding box')
+        self.assertIsNone(self.queue.get('unknown'))
+        self.assertEqual(len(self.queue._jobs), 2)
+        self.assertIsNone(self.queue.get(jobs[0].id))
+        self.assertIs(self.queue.get(jobs[-1].id), jobs[-1])
+
+    def test_submit_same_id(self):
+        """
+        A job should not run twice while it is in flight, but can run again once it is finished.
+        """
+        release = threading.Event()
+        runs = []
+
+        def render(job):
+            runs.append(job.id)
+            release.wait(5)
+
+        job = self.queue.submit(render, job_id='scenario')
+        self.assertIs(self.queue.submit(render, job_id='scenario'), job)
+        self.assertSetEqual(self.queue.active(), {'scenario'})
+
+        release.set()
+        while not job.finished:
+            time.sleep(0.01)
+        self.assertSetEqual(self.queue.active(), set())
+
+        rerun = self.queue.submit(render, job_id='scenario')
+        self.assertIsNot(rerun, job)
+        self.assertIs(self.queue.get('scenario'), rerun)
+        self.queue._pool.shutdown(wait=True)
+        self.assertListEqual(runs, ['scenario', 'scenario'])
+
+    def tearDown(self):
+        self.queue._pool.shutdown(wait=True)
+        logging.getLogger('webapp.jobs').disabled = False
+
+    if __name__ == "__main__":
+        unittest.main()
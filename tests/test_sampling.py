@@ -0,0 +1,67 @@
+###################################################################
+# Script Name	 : "TEST_SAMPLING.PY"
+# Description	 : Tests for the simulator/sampling.py file
+# Args           :
+# Author       	 : Floris Remmen
+# Email          : floris.remmen@gmail.com
+# Date           : "18 October 2026"
+###################################################################
+
+import unittest
+from simulator.sampling import AliasTable, AliasTableCache
+
+import numpy as np
+
+class TestAliasTable(unittest.TestCase):
+    """
+    Testcase for the AliasTable and AliasTableCache Classes
+    """
+
+    def setUp(self):
+        self.weights = np.array([0.0, 1.0, 2.0, 7.0])
+        self.rng = np.random.default_rng(0)
+
+    def test_draw(self):
+        """
+        Draws should follow the weights, and a stop with weight 0 should never be drawn.
+        """
+        draws = AliasTable(self.weights).draw(200000, self.rng)
+        frequencies = np.bincount(draws, minlength=len(self.weights)) / len(draws)
+
+        self.assertEqual(frequencies[0], 0)
+        np.testing.assert_allclose(frequencies, self.weights / self.weights.sum(), atol=0.005)
+
+    def test_zero_weights(self):
+        """
+        Weights that are all zero should be drawn uniformly.
+        """
+        draws = AliasTable(np.zeros(4)).draw(40000, self.rng)
+        np.testing.assert_allclose(np.bincount(draws, minlength=4) / len(draws), 0.25, atol=0.01)
+
+    def test_bad_weights(self):
+        """
+        Negative and non-finite weights should be rejected.
+        """
+        for weights in ([1.0, -1.0, 2.0], [1.0, np.nan, 2.0], [1.0, np.inf, 2.0]):
+            self.assertRaises(ValueError, AliasTable, weights)
+
+    def test_cache(self):
+        """
+        The table of the same weights and indices should only be built once.
+        """
+        cache = AliasTableCache(max_size=1)
+        table = cache.get(self.weights, np.array([1, 3]))
+
+        self.assertIs(cache.get(self.weights, np.array([1, 3])), table)
+        self.assertEqual(len(table), 2)
+        np.testing.assert_allclose(np.bincount(table.draw(80000, self.rng)) / 80000, [0.125, 0.875], atol=0.01)
+
+        # the least recently used table is evicted
+        cache.get(self.weights, np.array([2, 3]))
+        self.assertIsNot(cache.get(self.weights, np.array([1, 3])), table)
+
+    def tearDown(self):
+        pass
+
+    if __name__ == "__main__":
+        unittest.main()
@@ -9,6 +9,10 @@
 
 import unittest
 from simulator.simulator import Simulator
+from simulator.distances import haversine
+from simulator.trips import TripSampler, sample_grouped_trips
+
+import numpy as np
 
 import warnings
 
@@ -49,6 +53,209 @@ class TestSimulator(unittest.TestCase):
         self.assertIsInstance(simulation, dict)
         self.assertEqual(len(simulation), 3)
 
+    def test_simulate_many(self): 
+        """
+        Runs a batch of scenarios. The booking bins should be a 2D array with a row per scenario, counted
+        from its trips, and the most popular points of every scenario should be distinct stops within its 
+        bounding box, with their counts, most popular first.
+        """
+        bounding_boxes = np.array([
+            self.simulator.bounding_box, 
+            (13.2, 52.4, 13.3, 52.45), 
+            (0.0, 0.0, 1.0, 1.0)
+        ])
+        numbers_of_requests = np.array([self.n, 40, 5])
+        simulation = self.simulator.simulate_many(bounding_boxes, numbers_of_requests, seed=1)
+
+        self.assertEqual(simulation['booking_distance_bins'].shape, (3, len(self.simulator.booking_distance_distribution)))
+        self.assertListEqual(list(simulation['booking_distance_bins'].sum(axis=1)), [self.n, 40, 0])
+        self.assertListEqual(list(simulation['stops_within_bounds'][2:]), [0])
+
+        pickup_indices, pickup_offsets = simulation['most_popular_pickup_points']
+        pickup_counts = simulation['most_popular_pickup_counts']
+        self.assertEqual(len(pickup_counts), len(pickup_indices))
+        for i, bounding_box in enumerate(bounding_boxes): 
+            within_bounds = self.simulator.static_data.stop_index.query(bounding_box)
+            points = pickup_indices[pickup_offsets[i]:pickup_offsets[i + 1]]
+            counts = pickup_counts[pickup_offsets[i]:pickup_offsets[i + 1]]
+
+            self.assertLessEqual(len(points), min(numbers_of_requests[i], self.simulator.max_popular_points))
+            self.assertEqual(len(set(points)), len(points))
+            self.assertTrue(set(points) <= set(within_bounds))
+            self.assertTrue(np.all(counts > 0) and np.all(np.diff(counts) <= 0))
+            self.assertLessEqual(counts.sum(), numbers_of_requests[i])
+
+        # the same seed gives the same scenarios
+        repeated = self.simulator.simulate_many(bounding_boxes, numbers_of_requests, seed=1)
+        np.testing.assert_array_equal(repeated['most_popular_pickup_points'][0], pickup_indices)
+
+        # a scenario with more requests than max_grouped_requests gets a TripSampler of its own
+        self.simulator.max_grouped_requests = 10
+        mixed = self.simulator.simulate_many(bounding_boxes, numbers_of_requests, seed=1)
+        self.assertListEqual(list(mixed['booking_distance_bins'].sum(axis=1)), [self.n, 40, 0])
+        counts = np.split(mixed['most_popular_pickup_counts'], mixed['most_popular_pickup_points'][1][1:-1])
+        self.assertTrue(all(0 < part.sum() <= n for part, n in zip(counts[:2], numbers_of_requests)))
+
+    def test_generate_trips(self): 
+        """
+        Generates trips in chunks. Every trip should be between two different stops within the bounding box,
+        with the haversine distance of its stops and a distance bin matching that distance.
+        """
+        chunks = list(self.simulator.generate_trips(2500, seed=1, chunk_size=1000))
+        self.assertListEqual([len(chunk['pickup']) for chunk in chunks], [1000, 1000, 500])
+
+        stops = self.simulator.static_data.berlin_stops
+        within_bounds = set(self.simulator.get_stop_indices())
+        for chunk in chunks: 
+            self.assertTrue(set(chunk['pickup']) <= within_bounds)
+            self.assertTrue(set(chunk['dropoff']) <= within_bounds)
+            self.assertFalse(np.any(chunk['pickup'] == chunk['dropoff']))
+
+            distance = haversine(stops.lon[chunk['pickup']], stops.lat[chunk['pickup']], stops.lon[chunk['dropoff']], stops.lat[chunk['dropoff']])
+            # distances from a precomputed distance matrix are floored to whole metres
+            np.testing.assert_allclose(chunk['distance'], distance, atol=1e-3)
+            np.testing.assert_array_equal(chunk['distance_bin'], np.floor(distance))
+
+    def test_feasible_bins(self): 
+        """
+        Bins longer than any trip within a small bounding box should not be sampled, their trips get the 
+        bin of their actual distance. This holds with and without the distance matrix.
+        """
+        simulator = Simulator(bounding_box=(13.405, 52.518, 13.42, 52.527))
+        stops = simulator.static_data.berlin_stops
+
+        for distance_matrix in (simulator.distance_matrix, None): 
+            sampler = TripSampler(
+                stops.lon, stops.lat, simulator.get_stop_indices(), simulator.booking_distance_distribution, 
+                simulator.max_sampling_rounds, distance_matrix)
+            self.assertListEqual(sampler.feasible.tolist(), [True, False, False, False])
+            self.assertLessEqual(sampler.max_distance(), 2)
+
+            trips = sampler.sample(20000, np.random.default_rng(0))
+            np.testing.assert_array_equal(trips['distance_bin'], 0)
+            self.assertFalse(np.any(trips['pickup'] == trips['dropoff']))
+
+        # every bin can occur within the bounding box of the test
+        sampler = TripSampler(
+            stops.lon, stops.lat, self.simulator.get_stop_indices(), simulator.booking_distance_distribution, 
+            simulator.max_sampling_rounds)
+        self.assertTrue(sampler.feasible.all())
+
+    def test_grouped_trips(self): 
+        """
+        Trips sampled for many scenarios together should stay within their scenario, between two different stops 
+        in their distance bin, and have the same pickup and dropoff counts as trips of a TripSampler, up to the 
+        difference between two seeds. A scenario with a single stop has trips from and to that stop.
+        """
+        stops = self.simulator.static_data.berlin_stops
+        within_bounds = self.simulator.get_stop_indices()
+        distance_matrix = self.simulator.distance_matrix
+
+        # 2000 scenarios of the bounding box of the test, one with a single stop and an empty one
+        stop_indices = np.concatenate([np.tile(within_bounds, 2000), within_bounds[:1]])
+        stop_offsets = np.concatenate([np.arange(2001) * len(within_bounds), [len(stop_indices)] * 2])
+        numbers_of_requests = np.array([100] * 2000 + [5, 5])
+        trips = sample_grouped_trips(
+            stops.lon, stops.lat, stop_indices, stop_offsets, numbers_of_requests, self.simulator.booking_distance_distribution,
+            self.simulator.max_sampling_rounds, np.random.default_rng(0), distance_matrix)
+
+        np.testing.assert_array_equal(np.bincount(trips['scenario'], minlength=2002), [100] * 2000 + [5, 0])
+        for column in ('pickup', 'dropoff'): 
+            self.assertTrue(np.all(trips[column] >= stop_offsets[trips['scenario']]))
+            self.assertTrue(np.all(trips[column] < stop_offsets[trips['scenario'] + 1]))
+        pickup, dropoff = stop_indices[trips['pickup'][:-5]], stop_indices[trips['dropoff'][:-5]]
+        self.assertFalse(np.any(pickup == dropoff))
+        distance = distance_matrix.distance(pickup, dropoff) if distance_matrix is not None else haversine(stops.lon[pickup], stops.lat[pickup], stops.lon[dropoff], stops.lat[dropoff])
+        np.testing.assert_array_equal(trips['distance_bin'][:-5], np.floor(distance))
+
+        sampler = TripSampler(
+            stops.lon, stops.lat, within_bounds, self.simulator.booking_distance_distribution, 
+            self.simulator.max_sampling_rounds, distance_matrix)
+
+        def counts(pickup, dropoff): 
+            return np.concatenate([np.bincount(stop, minlength=len(stops)) for stop in (pickup, dropoff)]) / len(pickup)
+
+        first, second = (sampler.sample(200000, np.random.default_rng(seed)) for seed in (1, 2))
+        noise = np.abs(counts(first['pickup'], first['dropoff']) - counts(second['pickup'], second['dropoff'])).sum()
+        self.assertLess(np.abs(counts(pickup, dropoff) - counts(first['pickup'], first['dropoff'])).sum(), 1.5 * noise)
+
+    def test_simulate_trips(self): 
+        """
+        The booking distance bins counted from the trips should add up to the number of requests 
+        and follow the booking distance distribution.
+        """
+        number_of_requests = 20000
+        booking_distance_bins = self.simulator.simulate(number_of_requests, seed=1, trips=True)['booking_distance_bins']
+
+        self.assertEqual(sum(booking_distance_bins.values()), number_of_requests)
+        np.testing.assert_allclose(
+            np.array(list(booking_distance_bins.values())) / number_of_requests, 
+            self.simulator.booking_distance_distribution, 
+            atol=0.02
+        )
+
+    def test_most_popular_points(self): 
+        """
+        The most popular points should be the stops used most often in the trips, with their counts, most popular first.
+        """
+        simulation = self.simulator.simulate(5000, seed=2)
+        trip_counts = self.simulator.count_trips(self.simulator.generate_trips(5000, seed=np.random.SeedSequence(2).spawn(3)[0]))
+
+        for points, counts in ((simulation['most_popular_pickup_points'], trip_counts['pickup_counts']), 
+                               (simulation['most_popular_dropoff_points'], trip_counts['dropoff_counts'])): 
+            self.assertEqual(len(points), self.simulator.max_popular_points)
+            np.testing.assert_array_equal(points.counts, counts[points.index])
+            np.testing.assert_array_equal(points.counts, np.sort(counts)[::-1][:len(points)])
+
+        # with a handful of requests only the stops used in the trips are returned
+        simulation = self.simulator.simulate(self.n, seed=2)
+        self.assertLessEqual(len(simulation['most_popular_pickup_points']), self.n)
+        self.assertEqual(simulation['most_popular_pickup_points'].counts.sum(), self.n)
+
+    def test_demand_weights(self): 
+        """
+        With demand weights, stops with a higher weight should be used more often, and stops 
+        with weight 0 never. The distances should still follow the booking distance bins.
+        """
+        within_bounds = self.simulator.get_stop_indices()
+        weights = np.zeros(len(self.simulator.static_data.berlin_stops))
+        weights[within_bounds] = 1
+        weights[within_bounds[:len(within_bounds) // 2]] = 0
+
+        weighted_simulator = Simulator(bounding_box=self.simulator.bounding_box, demand_weights=weights)
+        trip_counts = weighted_simulator.count_trips(weighted_simulator.generate_trips(5000, seed=4))
+
+        self.assertEqual(trip_counts['pickup_counts'][weights == 0].sum(), 0)
+        self.assertEqual(trip_counts['dropoff_counts'][weights == 0].sum(), 0)
+        self.assertEqual(trip_counts['pickup_counts'].sum(), 5000)
+
+        for chunk in weighted_simulator.generate_trips(1000, seed=4): 
+            np.testing.assert_array_equal(chunk['distance_bin'], np.minimum(np.floor(chunk['distance']), 3))
+
+    def test_reproducible_workers(self): 
+        """
+        The same seed should give bit-identical trips and batch simulations for any number of worker processes.
+        """
+        parallel_simulator = Simulator(bounding_box=self.simulator.bounding_box, workers=2)
+
+        serial_trips = list(self.simulator.generate_trips(5000, seed=3, chunk_size=1000))
+        parallel_trips = list(parallel_simulator.generate_trips(5000, seed=3, chunk_size=1000))
+        self.assertEqual(len(serial_trips), len(parallel_trips))
+        for serial_chunk, parallel_chunk in zip(serial_trips, parallel_trips): 
+            for column in serial_chunk: 
+                np.testing.assert_array_equal(serial_chunk[column], parallel_chunk[column])
+
+        rng = np.random.default_rng(0)
+        centers = np.c_[rng.uniform(13.2, 13.6, 3000), rng.uniform(52.4, 52.6, 3000)]
+        bounding_boxes = np.c_[centers - 0.02, centers + 0.02]
+        serial_batch = self.simulator.simulate_many(bounding_boxes, 20, seed=3)
+        parallel_batch = parallel_simulator.simulate_many(bounding_boxes, 20, seed=3)
+        for column in ('most_popular_pickup_points', 'most_popular_dropoff_points'): 
+            np.testing.assert_array_equal(serial_batch[column][0], parallel_batch[column][0])
+            np.testing.assert_array_equal(serial_batch[column][1], parallel_batch[column][1])
+        for column in ('most_popular_pickup_counts', 'most_popular_dropoff_counts', 'booking_distance_bins'): 
+            np.testing.assert_array_equal(serial_batch[column], parallel_batch[column])
+
     def tearDown(self): 
         pass
 
@@ -0,0 +1,80 @@
+###################################################################
+# Script Name	 : "TEST_SPATIALINDEX.PY"
+# Description	 : Tests for the utilities/spatialindex.py file
+# Args           :
+# Author       	 : Floris Remmen
+# Email          : floris.remmen@gmail.com
+# Date           : "18 October 2026"
+###################################################################
+
+import unittest
+from utilities.spatialindex import GridIndex
+
+import numpy as np
+
+class TestGridIndex(unittest.TestCase):
+    """
+    Testcase for the GridIndex Class
+    """
+
+    def setUp(self):
+        """
+        Sets up an index over random points around Berlin.
+        """
+        rng = np.random.default_rng(0)
+        self.x = rng.uniform(13.0, 13.8, 5000)
+        self.y = rng.uniform(52.3, 52.7, 5000)
+        self.index = GridIndex(self.x, self.y)
+
+        self.bounding_box = (13.34014892578125, 52.52791908000258, 13.506317138671875, 52.562995039558004)
+
+    def test_query(self):
+        """
+        The query should return the same indices as a linear scan over all points.
+        """
+        x1, y1, x2, y2 = self.bounding_box
+        expected = np.flatnonzero((self.x > x1) & (self.x < x2) & (self.y > y1) & (self.y < y2))
+
+        np.testing.assert_array_equal(self.index.query(self.bounding_box), expected)
+        # the corner order of the bounding box does not matter
+        np.testing.assert_array_equal(self.index.query((x2, y2, x1, y1)), expected)
+
+    def test_query_outside(self):
+        """
+        A bounding box outside the points or with NaN coordinates should return no indices.
+        """
+        self.assertEqual(len(self.index.query((0.0, 0.0, 1.0, 1.0))), 0)
+        self.assertEqual(len(self.index.query((float("NaN"), float("NaN"), 23.4, 34.2))), 0)
+        self.assertEqual(len(GridIndex([], []).query(self.bounding_box)), 0)
+
+    def test_query_many(self):
+        """
+        Querying many boxes at once should give the same indices as querying them one by one.
+        """
+        bounding_boxes = [self.bounding_box, (13.1, 52.4, 13.2, 52.6), (0.0, 0.0, 1.0, 1.0), (13.5, 52.6, 13.3, 52.4)]
+        indices, offsets = self.index.query_many(bounding_boxes)
+
+        self.assertEqual(len(offsets), len(bounding_boxes) + 1)
+        for i, bounding_box in enumerate(bounding_boxes):
+            np.testing.assert_array_equal(indices[offsets[i]:offsets[i + 1]], self.index.query(bounding_box))
+
+    def test_count(self):
+        """
+        The count should equal the number of points of a query, for boxes of any size and position.
+        """
+        rng = np.random.default_rng(1)
+        corners = np.column_stack((
+            rng.uniform(12.9, 13.9, (500, 2)), 
+            rng.uniform(52.2, 52.8, (500, 2))))[:, [0, 2, 1, 3]]
+        boxes = np.vstack((corners, [self.bounding_box, (13.0, 52.3, 13.8, 52.7), (14.0, 53.0, 14.1, 53.1), 
+                                     (self.x[0], self.y[0], self.x[0], self.y[0]), (np.nan, 52.3, 13.8, 52.7)]))
+
+        for box in boxes:
+            self.assertEqual(self.index.count(box), len(self.index.query(box)))
+        self.assertEqual(GridIndex([], []).count(self.bounding_box), 0)
+
+    def tearDown(self):
+        pass
+
+    if __name__ == "__main__":
+        unittest.main()
@@ -9,6 +9,13 @@
 
 import unittest
 from utilities.staticdatareader import StaticDataReader
+from utilities.datacache import ArrayCache
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
 
 class TestStaticDataReader(unittest.TestCase): 
     """
@@ -52,6 +59,67 @@ class TestStaticDataReader(unittest.TestCase):
         self.assertFalse(self.static_data_good.berlin_stops.empty)
         self.assertTrue(self.static_data_bad.berlin_stops.empty)
 
+    def test_binary_cache(self): 
+        """
+        Reading the files should fill the binary cache, and a second read should give the same data.
+        Changing the source file should invalidate the cache entry.
+        """
+        cache_dir = tempfile.mkdtemp()
+        try: 
+            first = StaticDataReader('data/berlin_bounds.poly', 'data/berlin_stops.geojson', cache_dir=cache_dir)
+            self.assertIsNotNone(ArrayCache(cache_dir).load('data/berlin_stops.geojson'))
+            self.assertIsNotNone(ArrayCache(cache_dir).load('data/berlin_bounds.poly'))
+            self.assertEqual(os.stat(ArrayCache(cache_dir)._cache_file('data/berlin_stops.geojson')).st_mode & 0o777, 0o644)
+
+            second = StaticDataReader('data/berlin_bounds.poly', 'data/berlin_stops.geojson', cache_dir=cache_dir)
+            self.assertListEqual(list(first.berlin_stops.ids), list(second.berlin_stops.ids))
+            self.assertListEqual(list(first.berlin_stops.names), list(second.berlin_stops.names))
+            self.assertEqual(len(first.berlin_bounds), len(second.berlin_bounds))
+
+            # a changed source file is a cache miss
+            stops_file = shutil.copy('data/berlin_stops.geojson', cache_dir)
+            ArrayCache(cache_dir).save(stops_file, {'ids': first.berlin_stops.ids})
+            stat = os.stat(stops_file)
+            os.utime(stops_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+            self.assertIsNone(ArrayCache(cache_dir).load(stops_file))
+        finally: 
+            shutil.rmtree(cache_dir)
+
+    def test_projected_coordinates(self): 
+        """
+        The web mercator coordinates should match a geopandas reprojection, also for stops taken from the table.
+        """
+        stops = self.static_data_good.berlin_stops
+        projected = stops.to_geodataframe().to_crs(epsg=3857).geometry
+        np.testing.assert_allclose(stops.x, projected.x)
+        np.testing.assert_allclose(stops.y, projected.y)
+        np.testing.assert_array_equal(stops.take([3, 1]).x, stops.x[[3, 1]])
+
+        projected = self.static_data_good.berlin_bounds.to_crs(epsg=3857).geometry
+        np.testing.assert_allclose(self.static_data_good.berlin_bounds_xy, np.c_[projected.x, projected.y])
+        self.assertEqual(self.static_data_bad.berlin_bounds_xy.shape, (0, 2))
+        self.assertEqual(len(self.static_data_bad.berlin_stops.x), 0)
+
+    def test_demand_weights(self): 
+        """
+        The stops file has no weights, so the demand is uniform. Weights from a side file 
+        should be mapped to the stops by id, stops missing from the file get weight 1.
+        """
+        self.assertIsNone(self.static_data_good.get_demand_weights())
+
+        ids = self.static_data_good.berlin_stops.decoded_ids
+        handle, weights_file = tempfile.mkstemp(suffix='.csv')
+        try: 
+            with os.fdopen(handle, 'w') as f: 
+                f.write(f'id,weight\n{ids[1]},5\n{ids[0]},0\n')
+            weights = self.static_data_good.get_demand_weights(weights_file)
+
+            self.assertEqual(len(weights), len(ids))
+            self.assertListEqual(list(weights[:3]), [0.0, 5.0, 1.0])
+            self.assertIs(self.static_data_good.get_demand_weights(weights_file), weights)
+        finally: 
+            os.remove(weights_file)
+
     def tearDown(self): 
         pass
 
@@ -0,0 +1,78 @@
+###################################################################
+# Script Name	 : "TEST_STOPTABLE.PY"
+# Description	 : Tests for the utilities/stoptable.py file
+# Args           :
+# Author       	 : Floris Remmen
+# Email          : floris.remmen@gmail.com
+# Date           : "18 October 2026"
+###################################################################
+
+import unittest
+from utilities.stoptable import StopTable
+
+import numpy as np
+import warnings
+
+class TestStopTable(unittest.TestCase):
+    """
+    Testcase for the StopTable Class
+    """
+
+    def setUp(self):
+        """
+        Sets up a small stop table where two stops share a name.
+        FutureWarnings are ignored, due to the crs initialisation of geopandas==0.5.0
+        """
+        # TODO: Remove warnings filter when migrating to geopandas > 0.7.0 !
+        warnings.simplefilter('ignore', category=FutureWarning)
+
+        self.stops = StopTable(
+            lon=[13.49, 13.52, 13.43],
+            lat=[52.51, 52.48, 52.50],
+            ids=[b'u33depjmfnxb', b'u33deccqj25n', b'u33d9xpfkks7'],
+            name_codes=[1, 0, 1],
+            name_categories=['S Karlshorst Bhf (Berlin)', 'S+U Lichtenberg Bhf (Berlin)']
+        )
+
+    def test_storage(self):
+        """
+        Coordinates should be float64 arrays, ids fixed-width bytes and names decoded through the dictionary.
+        """
+        self.assertEqual(self.stops.lon.dtype, np.float64)
+        self.assertEqual(self.stops.ids.dtype, np.dtype('S12'))
+        self.assertListEqual(list(self.stops.names), ['S+U Lichtenberg Bhf (Berlin)', 'S Karlshorst Bhf (Berlin)', 'S+U Lichtenberg Bhf (Berlin)'])
+        self.assertListEqual(list(self.stops.decoded_ids), ['u33depjmfnxb', 'u33deccqj25n', 'u33d9xpfkks7'])
+        self.assertTrue(StopTable.empty_table().empty)
+
+    def test_take(self):
+        """
+        Taking rows should keep the row indices of the parent table.
+        """
+        subset = self.stops.take([2, 0])
+
+        self.assertEqual(len(subset), 2)
+        self.assertListEqual(list(subset.index), [2, 0])
+        self.assertListEqual(list(subset.lon), [13.43, 13.49])
+        self.assertIs(subset.name_categories, self.stops.name_categories)
+
+        # counts are kept with the stops they belong to
+        counted = self.stops.take([2, 0], counts=[7, 3])
+        self.assertListEqual(list(counted.take([1]).counts), [3])
+        self.assertListEqual(list(counted.counts), [7, 3])
+
+    def test_to_geodataframe(self):
+        """
+        The GeoDataFrame should contain the name, id and geometry of each stop.
+        """
+        gdf = self.stops.take([1]).to_geodataframe()
+
+        self.assertListEqual(list(gdf.columns), ['name', 'id', 'geometry'])
+        self.assertListEqual(list(gdf.index), [1])
+        self.assertEqual(gdf.iloc[0]['id'], 'u33deccqj25n')
+        self.assertEqual(gdf.geometry.x.iloc[0], 13.52)
+
+    def tearDown(self):
+        pass
+
+    if __name__ == "__main__":
+        unittest.main()
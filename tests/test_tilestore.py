@@ -0,0 +1,142 @@
+###################################################################
+# Script Name	 : "TEST_TILESTORE.PY"
+# Description	 : Tests for the visualiser/tilestore.py file
+# Args           :
+# Author       	 : Floris Remmen
+# Email          : floris.remmen@gmail.com
+# Date           : "18 October 2026"
+###################################################################
+
+import unittest
+from visualiser.tilestore import TileStore, TileBasemap, prefetch, fetch_tile
+
+import io
+import os
+import tempfile
+import urllib.error
+from unittest import mock
+
+import numpy as np
+import mercantile
+from PIL import Image
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+class TestTileStore(unittest.TestCase):
+    """
+    Testcase for the TileStore and TileBasemap Classes
+    """
+
+    def setUp(self):
+        """
+        Prefetches solid colored tiles around Berlin into a temporary MBTiles file, without network.
+        """
+        self.directory = tempfile.TemporaryDirectory()
+        self.tiles_file = os.path.join(self.directory.name, 'tiles.mbtiles')
+        self.bounds = (13.3, 52.45, 13.5, 52.55)
+        self.urls = []
+
+        def fetch(url):
+            self.urls.append(url)
+            z, x, y = (int(part) for part in url.split('/')[-3:])
+            buffer = io.BytesIO()
+            Image.new('RGB', (256, 256), (x % 256, y % 256, z)).save(buffer, format='png')
+            return buffer.getvalue()
+
+        store = TileStore(self.tiles_file, writable=True)
+        store.set_metadata(attribution='test tiles')
+        self.downloaded = prefetch(store, self.bounds, [11, 12], url='tiles/{z}/{x}/{y}', fetch=fetch, delay=0)
+        # a second prefetch skips the tiles that are already stored
+        self.downloaded_again = prefetch(store, self.bounds, [11, 12], url='tiles/{z}/{x}/{y}', fetch=fetch, delay=0)
+        store.close()
+
+    def test_prefetch(self):
+        """
+        Every tile should be downloaded once, and be read back by its XYZ address.
+        """
+        tiles = list(mercantile.tiles(*self.bounds, [11, 12]))
+        self.assertEqual(self.downloaded, len(tiles))
+        self.assertEqual(self.downloaded_again, 0)
+        self.assertEqual(len(self.urls), len(tiles))
+
+        store = TileStore(self.tiles_file)
+        self.assertEqual(len(store), len(tiles))
+        self.assertEqual(store.zoom_levels, (11, 12))
+        self.assertDictEqual(store.metadata, {'attribution': 'test tiles'})
+
+        tile = tiles[0]
+        color = Image.open(io.BytesIO(store.get(tile.z, tile.x, tile.y))).getpixel((0, 0))
+        self.assertTupleEqual(color, (tile.x % 256, tile.y % 256, tile.z))
+        self.assertIsNone(store.get(5, 0, 0))
+        store.close()
+
+    def test_fetch_retries(self):
+        """
+        Server errors and rate limits should be retried, other client errors should not.
+        """
+        response = mock.MagicMock()
+        response.__enter__.return_value.read.return_value = b'tile'
+
+        def error(code):
+            return urllib.error.HTTPError('https://tiles.invalid/1/2/3.png', code, 'error', {}, None)
+
+        with mock.patch('urllib.request.urlopen', side_effect=[error(503), error(429), response]) as urlopen:
+            self.assertEqual(fetch_tile('https://tiles.invalid/1/2/3.png', backoff=0), b'tile')
+        self.assertEqual(urlopen.call_count, 3)
+
+        with mock.patch('urllib.request.urlopen', side_effect=[error(404), response]) as urlopen:
+            self.assertRaises(urllib.error.HTTPError, fetch_tile, 'https://tiles.invalid/1/2/3.png', backoff=0)
+        self.assertEqual(urlopen.call_count, 1)
+
+    def test_mosaic(self):
+        """
+        The mosaic should stitch the stored tiles in place, cover the extent and be cached by (extent, zoom).
+        """
+        basemap = TileBasemap.get(self.tiles_file)
+        self.assertIs(TileBasemap.get(self.tiles_file), basemap)
+        self.assertIsNone(TileBasemap.get(os.path.join(self.directory.name, 'missing.mbtiles')))
+
+        x_min, y_min = mercantile.xy(13.35, 52.48)
+        x_max, y_max = mercantile.xy(13.45, 52.52)
+        extent = (x_min, x_max, y_min, y_max)
+        zoom = basemap.zoom(extent)
+        self.assertEqual(zoom, 12)
+
+        image, image_extent = basemap.mosaic(extent, zoom)
+        self.assertLessEqual(image_extent[0], x_min)
+        self.assertGreaterEqual(image_extent[1], x_max)
+        self.assertLessEqual(image_extent[2], y_min)
+        self.assertGreaterEqual(image_extent[3], y_max)
+
+        top_left = mercantile.tile(13.35, 52.52, zoom)
+        np.testing.assert_array_equal(image[0, 0], [top_left.x % 256, top_left.y % 256, zoom, 255])
+
+        basemap.mosaic(extent, zoom)
+        self.assertEqual(basemap.mosaic.cache_info().hits, 1)
+
+    def test_add_to(self):
+        """
+        The basemap should be drawn under the axes without changing their extent.
+        """
+        basemap = TileBasemap.get(self.tiles_file)
+        figure = Figure()
+        FigureCanvasAgg(figure)
+        ax = figure.subplots()
+
+        x_min, y_min = mercantile.xy(13.35, 52.48)
+        x_max, y_max = mercantile.xy(13.45, 52.52)
+        ax.set_xlim(x_min, x_max)
+        ax.set_ylim(y_min, y_max)
+        basemap.add_to(ax)
+
+        self.assertEqual(len(ax.images), 1)
+        self.assertTupleEqual(ax.axis(), (x_min, x_max, y_min, y_max))
+
+    def tearDown(self):
+        cached = TileBasemap._basemaps.pop(self.tiles_file, None)
+        if cached is not None:
+            cached[1].store.close()
+        self.directory.cleanup()
+
+    if __name__ == "__main__":
+        unittest.main()
@@ -0,0 +1,117 @@
+###################################################################
+# Script Name	 : "TEST_TIMING.PY"
+# Description	 : Tests for the utilities/timing.py and
+#                  webapp/metrics.py files
+# Args           :
+# Author       	 : Floris Remmen
+# Email          : floris.remmen@gmail.com
+# Date           : "18 October 2026"
+###################################################################
+
+import unittest
+from utilities.timing import Timings
+from webapp import create_app
+from webapp.config import Config
+
+import time
+
+class TestTimings(unittest.TestCase):
+    """
+    Testcase for the Timings Class and the metrics of the webapp
+    """
+
+    def setUp(self):
+        Timings.clear()
+        Timings.enabled = True
+
+    def tearDown(self):
+        Timings.enabled = False
+        Timings.clear()
+
+    def test_disabled(self):
+        """
+        Disabled stages should not be timed, and not be collected.
+        """
+        Timings.enabled = False
+        with Timings.collect() as timings:
+            with Timings.stage('test.disabled'):
+                pass
+
+        self.assertEqual(timings, {})
+        self.assertEqual(Timings.histograms(), {})
+
+    def test_stage(self):
+        """
+        Every duration of a stage should be counted in the cumulative buckets, and summed per collection.
+        """
+        with Timings.collect() as timings:
+            for _ in range(3):
+                with Timings.stage('test.stage'):
+                    time.sleep(0.002)
+        Timings.observe('test.stage', 20.0)
+
+        cumulative, count, total = Timings.histograms()['test.stage']
+        self.assertEqual(count, 4)
+        self.assertGreater(total, 20.006)
+        self.assertEqual(cumulative[Timings.buckets.index(0.001)], 0)
+        self.assertEqual(cumulative[Timings.buckets.index(1.0)], 3)
+        self.assertEqual(cumulative[-1], 3)
+
+        # only the stages within the collection are collected
+        self.assertEqual(list(timings), ['test.stage'])
+        self.assertAlmostEqual(timings['test.stage'], total - 20.0)
+
+    def test_timed(self):
+        """
+        A timed function should keep its result and be timed as a stage.
+        """
+        function = Timings.timed('test.timed')(lambda x: x + 1)
+
+        self.assertEqual(function(1), 2)
+        self.assertEqual(Timings.histograms()['test.timed'][1], 1)
+
+    def test_prometheus(self):
+        """
+        The histograms should be in the Prometheus text format.
+        """
+        Timings.observe('test.prometheus', 0.003)
+        lines = Timings.prometheus().splitlines()
+
+        self.assertIn(f'# TYPE {Timings.metric} histogram', lines)
+        self.assertIn(f'{Timings.metric}_bucket{{stage="test.prometheus",le="0.0025"}} 0', lines)
+        self.assertIn(f'{Timings.metric}_bucket{{stage="test.prometheus",le="0.005"}} 1', lines)
+        self.assertIn(f'{Timings.metric}_bucket{{stage="test.prometheus",le="+Inf"}} 1', lines)
+        self.assertIn(f'{Timings.metric}_count{{stage="test.prometheus"}} 1', lines)
+
+    def test_server_timing(self):
+        """
+        The durations should be a Server-Timing header in milliseconds.
+        """
+        self.assertEqual(Timings.server_timing({'a.b': 0.0123, 'total': 1}), 'a.b;dur=12.30, total;dur=1000.00')
+
+    def test_webapp(self):
+        """
+        With metrics, responses should carry the durations of their stages and /metrics should hold the histograms.
+        Without metrics there are no Server-Timing headers and no /metrics.
+        """
+        class MetricsConfig(Config):
+            METRICS = True
+
+        client = create_app(MetricsConfig).test_client()
+        response = client.get('/api/simulate', query_string={
+            'x1': 13.34, 'y1': 52.52, 'x2': 13.50, 'y2': 52.56, 'number_of_requests': 100})
+        stages = [metric.split(';')[0] for metric in response.headers['Server-Timing'].split(', ')]
+        self.assertIn('simulator.generate_trips', stages)
+        self.assertIn('simulator.stop_indices', stages)
+        self.assertEqual(stages[-1], 'total')
+
+        metrics = client.get('/metrics')
+        self.assertEqual(metrics.status_code, 200)
+        self.assertIn('stage="request.api.simulate"', metrics.get_data(as_text=True))
+
+        client = create_app().test_client()
+        self.assertNotIn('Server-Timing', client.get('/').headers)
+        self.assertEqual(client.get('/metrics').status_code, 404)
+
+    if __name__ == "__main__":
+        unittest.main()
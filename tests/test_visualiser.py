@@ -13,9 +13,17 @@ from visualiser.visualiser import Visualiser
 from utilities.bounding_box import BoundingBox
 from utilities.staticdatareader import StaticDataReader
 from simulator.simulator import Simulator
+from utilities.artifactcache import MemoryArtifactCache
+from utilities.stoptable import StopTable
 
 import warnings
 
+import json
+import numpy as np
+
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from os.path import isfile
 
 class TestVisualiser(unittest.TestCase): 
@@ -87,6 +95,88 @@ class TestVisualiser(unittest.TestCase):
             isfile(f"{self.visualiser.static_path}/{self.visualiser.id}_map.html")
         )
 
+    def test_generate_gmap_in_memory(self): 
+        """
+        Asserts a visualiser with a store renders into memory and writes no files.
+        """
+        store = MemoryArtifactCache(max_bytes=10**6)
+        visualiser = Visualiser(
+            bounding_box = self.visualiser.bounding_box, 
+            simulation_results = self.visualiser.simulation_results, 
+            static_data = self.visualiser.static_data, 
+            static_path = 'webapp/static', 
+            store = store
+        )
+        visualiser.generate_gmap()
+
+        self.assertTrue(store.get(visualiser.id, 'map.html').startswith(b'<!DOCTYPE html>'))
+        self.assertFalse(isfile(f"{visualiser.static_path}/{visualiser.id}_map.html"))
+
+    def test_generate_gmap_many_points(self): 
+        """
+        Asserts the map embeds 100k points as one compact json payload.
+        """
+        rng = np.random.default_rng(0)
+        n = 100000
+        points = StopTable(
+            lon = rng.uniform(13.3, 13.5, n), 
+            lat = rng.uniform(52.5, 52.6, n), 
+            ids = np.char.encode(np.char.zfill(np.arange(n).astype(str), 12), 'ascii'), 
+            name_codes = np.zeros(n), 
+            name_categories = ['stop'], 
+            counts = rng.integers(1, 100, n)
+        )
+        store = MemoryArtifactCache(max_bytes=10**8)
+        visualiser = Visualiser(
+            bounding_box = self.visualiser.bounding_box, 
+            simulation_results = {'most_popular_pickup_points': points, 'most_popular_dropoff_points': points.take([0])}, 
+            static_data = self.visualiser.static_data, 
+            static_path = 'webapp/static', 
+            store = store
+        )
+        visualiser.generate_gmap()
+
+        html = store.get(visualiser.id, 'map.html').decode('utf-8')
+        payload = html.split('<script id="map-data" type="application/json">')[1].split('</script>')[0]
+        pickup, dropoff = json.loads(payload)['layers']
+        self.assertEqual(len(pickup['lat']), n)
+        self.assertListEqual(pickup['counts'], points.counts.tolist())
+        self.assertListEqual(dropoff['ids'], ['000000000000'])
+        # about 50 bytes per point: coordinates, id and count
+        self.assertLess(len(html), 60 * n)
+
+    def test_concurrent_rendering(self): 
+        """
+        Figures rendered by many threads at once should be byte-identical to figures rendered one by one.
+        The basemap is left out, so no tiles are downloaded.
+        """
+        static_path = tempfile.mkdtemp()
+        try: 
+            def render(identifier): 
+                visualiser = Visualiser(
+                    bounding_box = self.visualiser.bounding_box, 
+                    simulation_results = self.visualiser.simulation_results, 
+                    static_data = self.visualiser.static_data, 
+                    static_path = static_path, 
+                    basemap = False
+                )
+                visualiser.id = identifier
+                visualiser.generate_overview_figure()
+                visualiser.generate_closeup_figure()
+
+                return [
+                    open(f"{static_path}/{identifier}_{name}_plot.png", 'rb').read() 
+                    for name in ('overview', 'closeup')]
+
+            expected = render('serial')
+            with ThreadPoolExecutor(max_workers=8) as pool: 
+                results = list(pool.map(render, [f'thread{i}' for i in range(16)]))
+
+            for result in results: 
+                self.assertEqual(result, expected)
+        finally: 
+            shutil.rmtree(static_path)
+
     def tearDown(self): 
         pass
 
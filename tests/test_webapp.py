@@ -0,0 +1,134 @@
+###################################################################
+# Script Name	 : "TEST_WEBAPP.PY"
+# Description	 : Tests for the webapp/__init__.py file
+# Args           :
+# Author       	 : Floris Remmen
+# Email          : floris.remmen@gmail.com
+# Date           : "18 October 2026"
+###################################################################
+
+import unittest
+from utilities.staticdatareader import StaticDataReader
+
+import sys
+import json
+import subprocess
+
+class TestCreateApp(unittest.TestCase):
+    """
+    Testcase for the application factory
+    """
+
+    # modules that are only needed to render, or to parse the static data files when they are not cached
+    heavy_modules = ('matplotlib', 'contextily', 'geopandas', 'pandas', 'pyproj')
+
+    @classmethod
+    def setUpClass(self):
+        """
+        Parses the static data files into their cache, so the app does not parse them.
+        """
+        StaticDataReader('data/berlin_bounds.poly', 'data/berlin_stops.geojson')
+
+    def imported_modules(self, code: str) -> list:
+        """
+        Returns the heavy modules that are imported by code, in a new process.
+        :rtype list
+        """
+        code += f'\nimport sys, json\nprint(json.dumps([m for m in {self.heavy_modules!r} if m in sys.modules]))'
+        output = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True).stdout
+
+        return json.loads(output.splitlines()[-1])
+
+    def test_lazy_imports(self):
+        """
+        Creating the app should not import the plotting stack, nor pandas and geopandas.
+        """
+        self.assertEqual(self.imported_modules('from webapp import create_app\ncreate_app()'), [])
+
+    def test_preload_visualiser(self):
+        """
+        With PRELOAD_VISUALISER the plotting stack should be imported by the app factory.
+        """
+        code = (
+            'from webapp import create_app\n'
+            'from webapp.config import Config\n'
+            'class PreloadConfig(Config):\n'
+            '    PRELOAD_VISUALISER = True\n'
+            'create_app(PreloadConfig)'
+        )
+        imported = self.imported_modules(code)
+
+        self.assertIn('matplotlib', imported)
+        self.assertIn('contextily', imported)
+
+    def test_outside_city(self):
+        """
+        A bounding box outside of berlin should be an error of the trigger form, without a render job.
+        """
+        from webapp import create_app
+        from webapp.config import Config
+
+        class TestConfig(Config):
+            WTF_CSRF_ENABLED = False
+
+        application = create_app(TestConfig)
+        form = {'x1_field': 2.29, 'y1_field': 48.84, 'x2_field': 2.39, 'y2_field': 48.88, 'number_of_requests_field': 10}
+        response = application.test_client().post('/', data=form)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'The bounding box is outside of Berlin.', response.data)
+        self.assertEqual(application.extensions['render_jobs'].active(), set())
+
+    def test_negative_seed(self):
+        """
+        A negative seed should be an error of the trigger form, without a render job.
+        """
+        from webapp import create_app
+        from webapp.config import Config
+
+        class TestConfig(Config):
+            WTF_CSRF_ENABLED = False
+
+        application = create_app(TestConfig)
+        form = {'x1_field': 13.34, 'y1_field': 52.52, 'x2_field': 13.5, 'y2_field': 52.56, 'number_of_requests_field': 10, 'seed_field': -1}
+        response = application.test_client().post('/', data=form)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'Number must be at least 0.', response.data)
+        self.assertEqual(application.extensions['render_jobs'].active(), set())
+
+    def test_evicted_job(self):
+        """
+        A finished job should only be reported with the artifacts that are still cached, and not at all once they are evicted.
+        """
+        from webapp import create_app
+        from webapp.config import Config
+        from webapp.routes import artifact_files
+
+        class MemoryConfig(Config):
+            ARTIFACT_STORE = 'memory'
+
+        application = create_app(MemoryConfig)
+        artifact_cache = application.extensions['artifact_cache']
+        job_queue = application.extensions['render_jobs']
+
+        def render(job):
+            for artifact, filename in artifact_files.items():
+                artifact_cache.put(job.id, filename, b'0' * 50)
+                job.complete(artifact, filename)
+
+        job = job_queue.submit(render, job_id=artifact_cache.key('evicted'))
+        job_queue._pool.shutdown(wait=True)
+        client = application.test_client()
+
+        status = client.get(f'/jobs/{job.id}').get_json()
+        self.assertEqual(status['state'], 'done')
+        for url in status['artifacts'].values():
+            self.assertEqual(client.get(url).status_code, 200)
+
+        artifact_cache.max_bytes = 0
+        artifact_cache.evict()
+        self.assertEqual(client.get(f'/jobs/{job.id}').status_code, 404)
+
+    if __name__ == "__main__":
+        unittest.main()
@@ -0,0 +1,214 @@
+###################################################################
+# Script Name	 : "ARTIFACTCACHE.PY"
+# Description	 : Class definitions for the content-addressed caches
+#                  of rendered simulation artifacts, on disk or in memory.
+# Args           :
+# Author       	 : Floris Remmen
+# Email          : floris.remmen@gmail.com
+# Date           : "18 October 2026"
+###################################################################
+
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from string import hexdigits
+from collections import OrderedDict
+
+class ArtifactCache:
+    """
+    Content-addressed cache of the artifacts of simulations, in a directory on disk.
+
+    An artifact is stored as `<key>_<name>`, where the key is a hash of everything that
+    determines the simulation (bounding box, number of requests, seed, data version).
+    The same inputs therefore always map to the same files, which are reused instead of
+    rendered again. The modification time of a file is its last use: when the files grow
+    beyond `max_bytes`, the least recently used keys are removed first.
+    """
+
+    # length of a key in hex characters (128 bits)
+    key_length = 32
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"ArtifactCache in {self.directory} of at most {self.max_bytes} bytes."
+
+    @classmethod
+    def key(cls, *parts) -> str:
+        """
+        Returns the key of the given inputs: a hash of their json representation.
+        :rtype str
+        """
+        data = json.dumps(parts, sort_keys=True, default=str).encode('utf-8')
+        return hashlib.sha256(data).hexdigest()[:cls.key_length]
+
+    def path(self, key: str, name: str) -> str:
+        """
+        Returns the path of an artifact.
+        :rtype str
+        """
+        return os.path.join(self.directory, f'{key}_{name}')
+
+    def lookup(self, key: str, names) -> bool:
+        """
+        Returns True if all of the named artifacts of a key are cached, and marks them as used.
+        :rtype bool
+        """
+        # keys come from urls, anything that is not a key is never a path in the cache
+        if len(key) != self.key_length or not all(c in hexdigits for c in key):
+            return False
+
+        try:
+            for name in names:
+                os.utime(self.path(key, name))
+        except OSError:
+            return False
+
+        return True
+
+    def get(self, key: str, name: str) -> bytes:
+        """
+        Returns the content of an artifact, or None if it is not cached.
+        :rtype bytes
+        """
+        if not self.lookup(key, (name,)):
+            return None
+
+        try:
+            with open(self.path(key, name), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put(self, key: str, name: str, data: bytes):
+        """
+        Stores an artifact. The file is written under a temporary name and then renamed,
+        so a concurrent lookup never sees a partially written artifact. It is readable by
+        everyone, e.g. a web server in front of the static folder.
+        """
+        handle, temporary_file = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'wb') as f:
+                f.write(data)
+            # mkstemp creates the file for its owner only (0600)
+            os.chmod(temporary_file, 0o644)
+            os.replace(temporary_file, self.path(key, name))
+        except OSError:
+            os.remove(temporary_file)
+            raise
+
+    def evict(self, protected=()) -> int:
+        """
+        Removes the least recently used keys until the cache fits in max_bytes.
+        The artifacts of `protected` keys (e.g. jobs that are still rendering) are kept.
+        Returns the number of removed keys.
+        :rtype int
+        """
+        with self._lock:
+            # key -> [total size, last use, paths]
+            entries = {}
+            for entry in os.scandir(self.directory):
+                key = entry.name[:self.key_length]
+                if len(entry.name) <= self.key_length or entry.name[self.key_length] != '_' or not entry.is_file():
+                    continue
+                stat = entry.stat()
+                size, last_use, paths = entries.setdefault(key, [0, 0, []])
+                entries[key] = [size + stat.st_size, max(last_use, stat.st_mtime_ns), paths + [entry.path]]
+
+            total = sum(size for size, _, _ in entries.values())
+            removed = 0
+            for key, (size, _, paths) in sorted(entries.items(), key=lambda item: item[1][1]):
+                if total <= self.max_bytes:
+                    break
+                if key in protected:
+                    continue
+                for path in paths:
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                total -= size
+                removed += 1
+
+        return removed
+
+class MemoryArtifactCache(ArtifactCache):
+    """
+    In-process cache of the artifacts of simulations, for instances that do not share a
+    (writable) disk. The artifacts are held as bytes and served from memory, so nothing is
+    written to the filesystem. The same keys are used as by the ArtifactCache on disk.
+    Like on disk, the cache is kept within `max_bytes` by `evict`, which drops the least recently
+    used keys first. Storing an artifact never drops other keys, they may belong to jobs that are still rendering.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+
+        # key -> {name: bytes}, the least recently used key first
+        self._artifacts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"MemoryArtifactCache of {self.size} out of {self.max_bytes} bytes."
+
+    def lookup(self, key: str, names) -> bool:
+        """
+        Returns True if all of the named artifacts of a key are cached, and marks them as used.
+        :rtype bool
+        """
+        with self._lock:
+            artifacts = self._artifacts.get(key)
+            if artifacts is None or any(name not in artifacts for name in names):
+                return False
+            self._artifacts.move_to_end(key)
+
+        return True
+
+    def get(self, key: str, name: str) -> bytes:
+        """
+        Returns the content of an artifact, or None if it is not cached.
+        :rtype bytes
+        """
+        with self._lock:
+            artifacts = self._artifacts.get(key)
+            if artifacts is None or name not in artifacts:
+                return None
+            self._artifacts.move_to_end(key)
+
+            return artifacts[name]
+
+    def put(self, key: str, name: str, data: bytes):
+        """
+        Stores an artifact. The cache may grow beyond max_bytes until it is evicted.
+        """
+        data = bytes(data)
+        with self._lock:
+            artifacts = self._artifacts.setdefault(key, {})
+            self.size += len(data) - len(artifacts.get(name, b''))
+            artifacts[name] = data
+            self._artifacts.move_to_end(key)
+
+    def evict(self, protected=()) -> int:
+        """
+        Drops the least recently used keys until the cache fits in max_bytes.
+        The artifacts of `protected` keys (e.g. jobs that are still rendering) are kept.
+        Returns the number of dropped keys.
+        :rtype int
+        """
+        removed = 0
+        with self._lock:
+            for key in list(self._artifacts):
+                if self.size <= self.max_bytes:
+                    break
+                if key in protected:
+                    continue
+                self.size -= sum(len(data) for data in self._artifacts.pop(key).values())
+                removed += 1
+
+        return removed
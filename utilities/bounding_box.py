@@ -7,7 +7,9 @@
 # Date           : "28 September 2020"                                     
 ###################################################################
 
-from pyproj import Proj, transform
+import numpy as np
+
+from utilities.projection import get_transformer, transform
 
 class BoundingBox: 
     """
@@ -23,16 +25,27 @@ class BoundingBox:
         """
         Projects the bounding box coordinates to a new coordinate system. 
         Needed for plotting onto a web mercator map, e.g. contextily.
+        Both corners are projected in one call, with a transformer shared by the process.
         :rtype tuple
         """
+        (x1_proj, x2_proj), (y1_proj, y2_proj) = get_transformer(4326, epsg).transform(
+            (self.bounding_box[0], self.bounding_box[2]), 
+            (self.bounding_box[1], self.bounding_box[3])
+        )
 
-        in_proj = Proj(init='epsg:4326')
-        out_proj = Proj(init=f'epsg:{epsg}')
+        return (x1_proj, y1_proj, x2_proj, y2_proj)
 
-        x1_proj, y1_proj = transform(in_proj, out_proj, self.bounding_box[0], self.bounding_box[1])
-        x2_proj, y2_proj = transform(in_proj, out_proj, self.bounding_box[2], self.bounding_box[3])
+    @staticmethod
+    def to_crs_many(bounding_boxes, epsg=3857) -> np.ndarray: 
+        """
+        Projects an (n, 4) array of bounding boxes (x1, y1, x2, y2) to a new coordinate system, 
+        all corners in a single vectorised call. Returns an (n, 4) array.
+        :rtype numpy.ndarray
+        """
+        bounding_boxes = np.asarray(bounding_boxes, dtype=np.float64).reshape(-1, 4)
+        x, y = transform(bounding_boxes[:, [0, 2]], bounding_boxes[:, [1, 3]], 4326, epsg)
 
-        return (x1_proj, y1_proj, x2_proj, y2_proj)
+        return np.c_[x[:, 0], y[:, 0], x[:, 1], y[:, 1]]
 
     @property
     def center(self) -> tuple: 
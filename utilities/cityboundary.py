@@ -0,0 +1,84 @@
+###################################################################
+# Script Name	 : "CITYBOUNDARY.PY"
+# Description	 : Class definition for the boundary of the city,
+#                  to validate and clip bounding boxes against it.
+# Args           :
+# Author       	 : Floris Remmen
+# Email          : floris.remmen@gmail.com
+# Date           : "18 October 2026"
+###################################################################
+
+from functools import lru_cache
+
+import numpy as np
+
+class CityBoundary:
+    """
+    The boundary of the city as a prepared polygon, built once from the vertices of the bounds file.
+
+    Bounding boxes (x1, y1, x2, y2 in lon/lat) are checked against it before anything is simulated or
+    rendered. A box that does not reach the envelope of the polygon is outside without any geometry.
+    Otherwise the prepared polygon answers whether the box is within or intersects the city in a
+    few microseconds. The results of the most recent boxes are cached.
+    """
+
+    # number of bounding boxes whose result is kept
+    max_bounding_boxes = 4096
+
+    def __init__(self, lon, lat):
+        # shapely is imported with the first boundary, which is built once per static data set
+        from shapely.geometry import Polygon
+        from shapely.prepared import prep
+
+        polygon = Polygon(np.c_[np.asarray(lon, dtype=np.float64), np.asarray(lat, dtype=np.float64)])
+        self.polygon = polygon if polygon.is_valid else polygon.buffer(0)
+
+        # the envelope (min lon, min lat, max lon, max lat) of the polygon
+        self.bounds = self.polygon.bounds
+        self._prepared = prep(self.polygon)
+
+        # the clipped box of the most recent bounding boxes
+        self.clip = lru_cache(maxsize=self.max_bounding_boxes)(self._clip)
+
+    def __repr__(self):
+        return f"CityBoundary of {len(self.polygon.exterior.coords)} vertices within {self.bounds}."
+
+    def _clip(self, bounding_box: tuple) -> tuple:
+        """
+        Returns the bounding box (x1, y1, x2, y2) clipped to its part within the city: the smallest box
+        around that part. A box within the city is returned as it is, None if no part of it is in the city.
+        :rtype tuple
+        """
+        from shapely.geometry import box
+
+        if not np.all(np.isfinite(bounding_box)):
+            return None
+
+        x1, y1, x2, y2 = bounding_box
+        west, south, east, north = min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)
+
+        # the fast paths: boxes that miss the envelope, or cover all of it
+        if west > self.bounds[2] or east < self.bounds[0] or south > self.bounds[3] or north < self.bounds[1]:
+            return None
+        if west <= self.bounds[0] and south <= self.bounds[1] and east >= self.bounds[2] and north >= self.bounds[3]:
+            return self.bounds
+
+        geometry = box(west, south, east, north)
+        if self._prepared.contains(geometry):
+            return tuple(bounding_box)
+        if not self._prepared.intersects(geometry):
+            return None
+
+        return self.polygon.intersection(geometry).bounds
+
+    def validate(self, bounding_box, clip: bool = True) -> tuple:
+        """
+        Returns the bounding box to simulate for a bounding box (x1, y1, x2, y2): None if it is outside of
+        the city, clipped to its part within the city if `clip`, otherwise the bounding box itself.
+        :rtype tuple
+        """
+        clipped = self.clip(tuple(float(value) for value in bounding_box))
+        if clipped is None or clip:
+            return clipped
+
+        return tuple(bounding_box)
@@ -0,0 +1,77 @@
+###################################################################
+# Script Name	 : "DATACACHE.PY"
+# Description	 : Class definition for the binary static data cache
+# Args           :
+# Author       	 : Floris Remmen
+# Email          : floris.remmen@gmail.com
+# Date           : "18 October 2026"
+###################################################################
+
+import os
+import tempfile
+
+import numpy as np
+
+class ArrayCache:
+    """
+    Binary cache of the arrays parsed from a static data file.
+
+    The arrays of a source file are stored in a single uncompressed .npz file in the
+    cache directory, together with the mtime and size of the source file. Loading a
+    cache entry is a plain copy of the arrays, no parsing is involved. An entry is
+    invalid as soon as the source file changes or the cache format version is bumped.
+    """
+
+    # bump when the layout of the cached arrays changes
+    format_version = 3
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+
+    def __repr__(self):
+        return f"Binary array cache in {self.cache_dir}"
+
+    def _cache_file(self, source_file: str) -> str:
+        """
+        Returns the path of the cache file for a source file.
+        :rtype str
+        """
+        return os.path.join(self.cache_dir, f'{os.path.basename(source_file)}.npz')
+
+    def _signature(self, source_file: str) -> np.ndarray:
+        """
+        Returns the signature of the source file: format version, mtime and size.
+        :rtype numpy.ndarray
+        """
+        stat = os.stat(source_file)
+        return np.array([self.format_version, stat.st_mtime_ns, stat.st_size], dtype=np.int64)
+
+    def load(self, source_file: str) -> dict:
+        """
+        Returns the cached arrays of the source file, or None if there is no valid cache entry.
+        :rtype dict
+        """
+        try:
+            with np.load(self._cache_file(source_file), allow_pickle=False) as data:
+                if not np.array_equal(data['__signature__'], self._signature(source_file)):
+                    return None
+                return {name: data[name] for name in data.files if name != '__signature__'}
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def save(self, source_file: str, arrays: dict):
+        """
+        Stores the arrays of the source file. The cache file is replaced atomically, and readable by everyone
+        so other users of the cache directory share it. A cache directory that can not be written 
+        (e.g. a read-only container) is ignored.
+        """
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            handle, temporary_file = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(handle, 'wb') as f:
+                np.savez(f, __signature__=self._signature(source_file), **arrays)
+            # mkstemp creates the file for its owner only (0600)
+            os.chmod(temporary_file, 0o644)
+            os.replace(temporary_file, self._cache_file(source_file))
+        except OSError:
+            pass
@@ -0,0 +1,90 @@
+###################################################################
+# Script Name	 : "DATASTORE.PY"
+# Description	 : Process-wide store for the static data files.
+# Args           :
+# Author       	 : Floris Remmen
+# Email          : floris.remmen@gmail.com
+# Date           : "18 October 2026"
+###################################################################
+
+import os
+import threading
+
+from utilities.staticdatareader import StaticDataReader
+
+class StaticDataStore:
+    """
+    Process-wide store of StaticDataReader instances.
+
+    The static data is parsed once per (bounds file, stops file) pair and shared
+    by every request in the process. Loading the store before the server forks
+    its workers lets them share the data copy-on-write. A reader is reloaded
+    automatically when the mtime or size of one of its files changes.
+    """
+
+    default_berlin_bounds_file = 'data/berlin_bounds.poly'
+    default_berlin_stops_file = 'data/berlin_stops.geojson'
+
+    # (bounds file, stops file) -> (file signature, StaticDataReader)
+    _readers = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _signature(*files) -> tuple:
+        """
+        Returns the (mtime, size) of each file, or None for a missing file.
+        :rtype tuple
+        """
+        signature = []
+        for f in files:
+            try:
+                stat = os.stat(f)
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    @classmethod
+    def version(cls, *files) -> tuple:
+        """
+        Returns the version of static data files, their (mtime, size) signature. 
+        Anything derived from the files is outdated once their version changes.
+        :rtype tuple
+        """
+        return cls._signature(*files)
+
+    @classmethod
+    def get(cls, berlin_bounds_file=default_berlin_bounds_file, berlin_stops_file=default_berlin_stops_file) -> StaticDataReader:
+        """
+        Returns the shared StaticDataReader for the given files.
+        The files are only parsed on the first call, or when they changed on disk.
+        :rtype utilities.staticdatareader.StaticDataReader
+        """
+        key = (berlin_bounds_file, berlin_stops_file)
+        signature = cls._signature(*key)
+
+        cached = cls._readers.get(key)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        with cls._lock:
+            # another thread may have reloaded the files while we waited
+            cached = cls._readers.get(key)
+            if cached is not None and cached[0] == signature:
+                return cached[1]
+
+            reader = StaticDataReader(
+                berlin_bounds_file=berlin_bounds_file,
+                berlin_stops_file=berlin_stops_file
+            )
+            cls._readers[key] = (signature, reader)
+
+        return reader
+
+    @classmethod
+    def clear(cls):
+        """
+        Drops all of the stored readers.
+        """
+        with cls._lock:
+            cls._readers.clear()
@@ -0,0 +1,35 @@
+###################################################################
+# Script Name	 : "PROJECTION.PY"
+# Description	 : Cached coordinate transforms between EPSG codes
+# Args           :
+# Author       	 : Floris Remmen
+# Email          : floris.remmen@gmail.com
+# Date           : "18 October 2026"
+###################################################################
+
+from functools import lru_cache
+
+import numpy as np
+
+@lru_cache(maxsize=None)
+def get_transformer(source_epsg: int, target_epsg: int):
+    """
+    Returns the pyproj Transformer from source_epsg to target_epsg, with x/y in lon/lat order.
+    Creating a transformer is slow, so one transformer per pair of EPSG codes is shared by
+    the whole process. Transformers are thread-safe since pyproj 3.1.
+    pyproj is only imported by the first transform, the cached static data is already projected.
+    :rtype pyproj.Transformer
+    """
+    from pyproj import Transformer
+
+    return Transformer.from_crs(f'epsg:{source_epsg}', f'epsg:{target_epsg}', always_xy=True)
+
+def transform(x, y, source_epsg: int = 4326, target_epsg: int = 3857) -> tuple:
+    """
+    Projects arrays of x/y (lon/lat) coordinates in a single vectorised call.
+    :rtype tuple
+    """
+    x, y = get_transformer(source_epsg, target_epsg).transform(
+        np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64))
+
+    return np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
@@ -0,0 +1,175 @@
+###################################################################
+# Script Name	 : "SPATIALINDEX.PY"
+# Description	 : Class definition for a grid based spatial index.
+# Args           :
+# Author       	 : Floris Remmen
+# Email          : floris.remmen@gmail.com
+# Date           : "18 October 2026"
+###################################################################
+
+import numpy as np
+
+class GridIndex:
+    """
+    Spatial index over a set of points, used to find the points inside a bounding box.
+
+    The points are bucketed in a regular grid. The point indices are stored sorted by
+    grid cell, so the cells of one grid row form a single contiguous slice. A query
+    only compares the coordinates of the points in the rows and columns overlapped
+    by the bounding box. A summed-area table of the cell counts answers how many points
+    are inside a bounding box, only comparing the points in the cells on its edge.
+    """
+
+    def __init__(self, x, y, points_per_cell: int = 4):
+
+        # coordinates of the points, as contiguous float arrays
+        self.x = np.ascontiguousarray(x, dtype=np.float64)
+        self.y = np.ascontiguousarray(y, dtype=np.float64)
+
+        n = len(self.x)
+        if n:
+            self.x_min, self.x_max = float(self.x.min()), float(self.x.max())
+            self.y_min, self.y_max = float(self.y.min()), float(self.y.max())
+        else:
+            self.x_min = self.x_max = self.y_min = self.y_max = 0.0
+
+        # a square-ish grid with on average `points_per_cell` points per cell
+        cells_per_axis = max(1, int(np.sqrt(n / points_per_cell)))
+        self.shape = (cells_per_axis, cells_per_axis) # rows (y), columns (x)
+        self.cell_width = max(self.x_max - self.x_min, 1e-12) / self.shape[1]
+        self.cell_height = max(self.y_max - self.y_min, 1e-12) / self.shape[0]
+
+        # cell of each point, row major
+        self.cell = self._row(self.y) * self.shape[1] + self._column(self.x)
+
+        # point indices sorted by cell, and the offset of each cell in that order
+        self.order = np.argsort(self.cell, kind='stable')
+        counts = np.bincount(self.cell, minlength=self.shape[0] * self.shape[1])
+        self.offsets = np.concatenate(([0], np.cumsum(counts)))
+
+        # summed-area table: summed_counts[r, c] is the number of points in the rows < r and columns < c
+        self.summed_counts = np.zeros((self.shape[0] + 1, self.shape[1] + 1), dtype=np.int64)
+        self.summed_counts[1:, 1:] = counts.reshape(self.shape).cumsum(axis=0).cumsum(axis=1)
+
+    def __repr__(self):
+        return f"GridIndex over {len(self)} points with a {self.shape[0]}x{self.shape[1]} grid."
+
+    def __len__(self):
+        return len(self.x)
+
+    def _column(self, x) -> np.ndarray:
+        """
+        Returns the grid column of the x coordinate(s), clipped to the grid.
+        :rtype numpy.ndarray
+        """
+        column = np.floor((np.asarray(x, dtype=np.float64) - self.x_min) / self.cell_width)
+        return np.clip(column, 0, self.shape[1] - 1).astype(np.intp)
+
+    def _row(self, y) -> np.ndarray:
+        """
+        Returns the grid row of the y coordinate(s), clipped to the grid.
+        :rtype numpy.ndarray
+        """
+        row = np.floor((np.asarray(y, dtype=np.float64) - self.y_min) / self.cell_height)
+        return np.clip(row, 0, self.shape[0] - 1).astype(np.intp)
+
+    def query(self, bounding_box: tuple) -> np.ndarray:
+        """
+        Returns the sorted indices of the points strictly inside the bounding box (x1, y1, x2, y2).
+        Points on the edge of the bounding box are not inside, like shapely's `within`.
+        :rtype numpy.ndarray
+        """
+        indices, _ = self.query_many([bounding_box])
+        return indices
+
+    def count(self, bounding_box: tuple) -> int:
+        """
+        Returns the number of points strictly inside the bounding box (x1, y1, x2, y2), the same as len(query(bounding_box)).
+        All points in the cells between the edge rows and columns of the box are inside it, they are counted in O(1)
+        from the summed-area table. Only the points in the cells on the edge of the box are compared.
+        :rtype int
+        """
+        x1, y1, x2, y2 = (float(c) for c in bounding_box)
+        x_lo, x_hi, y_lo, y_hi = min(x1, x2), max(x1, x2), min(y1, y2), max(y1, y2)
+
+        # NaN coordinates or boxes that do not overlap the points contain nothing
+        if not (x_lo <= self.x_max and x_hi >= self.x_min and y_lo <= self.y_max and y_hi >= self.y_min and len(self)):
+            return 0
+
+        column_lo, column_hi = int(self._column(x_lo)), int(self._column(x_hi))
+        row_lo, row_hi = int(self._row(y_lo)), int(self._row(y_hi))
+
+        # the cells strictly between the edge rows and columns. The cell of a coordinate is monotonic, 
+        # so their points are strictly inside the box.
+        inner = 0
+        if row_hi - row_lo > 1 and column_hi - column_lo > 1:
+            summed = self.summed_counts
+            inner = summed[row_hi, column_hi] - summed[row_lo + 1, column_hi] \
+                - summed[row_hi, column_lo + 1] + summed[row_lo + 1, column_lo + 1]
+
+        # the edge cells: the first and last row, and the first and last column of the rows in between
+        edge_rows = np.unique([row_lo, row_hi])
+        middle_cells = (np.arange(row_lo + 1, row_hi)[:, None] * self.shape[1] + np.unique([column_lo, column_hi])).ravel()
+        starts = np.concatenate((self.offsets[edge_rows * self.shape[1] + column_lo], self.offsets[middle_cells]))
+        ends = np.concatenate((self.offsets[edge_rows * self.shape[1] + column_hi + 1], self.offsets[middle_cells + 1]))
+
+        # exact test on the points of the edge cells only
+        candidates = self.order[_ragged_arange(starts, ends - starts)]
+        x, y = self.x[candidates], self.y[candidates]
+        edge = np.count_nonzero((x > x_lo) & (x < x_hi) & (y > y_lo) & (y < y_hi))
+
+        return int(inner + edge)
+
+    def query_many(self, bounding_boxes) -> tuple:
+        """
+        Queries many bounding boxes (an (n, 4) array of x1, y1, x2, y2) in one vectorised pass.
+        Returns a ragged array as a tuple (indices, offsets): the sorted indices of the points
+        inside box i are indices[offsets[i]:offsets[i + 1]].
+        :rtype tuple
+        """
+        boxes = np.asarray(bounding_boxes, dtype=np.float64).reshape(-1, 4)
+        x_lo, x_hi = np.minimum(boxes[:, 0], boxes[:, 2]), np.maximum(boxes[:, 0], boxes[:, 2])
+        y_lo, y_hi = np.minimum(boxes[:, 1], boxes[:, 3]), np.maximum(boxes[:, 1], boxes[:, 3])
+
+        # NaN coordinates or boxes that do not overlap the points have no candidates
+        overlaps = (x_lo <= self.x_max) & (x_hi >= self.x_min) & (y_lo <= self.y_max) & (y_hi >= self.y_min) & (len(self) > 0)
+        column_lo = self._column(np.where(overlaps, x_lo, self.x_min))
+        column_hi = self._column(np.where(overlaps, x_hi, self.x_min))
+        row_lo = self._row(np.where(overlaps, y_lo, self.y_min))
+        row_hi = self._row(np.where(overlaps, y_hi, self.y_min))
+
+        # every overlapped grid row of a box is one contiguous slice of the sorted indices
+        rows_per_box = np.where(overlaps, row_hi - row_lo + 1, 0)
+        box_of_row = np.repeat(np.arange(len(boxes)), rows_per_box)
+        rows = row_lo[box_of_row] + _ragged_arange(np.zeros(len(boxes), dtype=np.intp), rows_per_box)
+        starts = self.offsets[rows * self.shape[1] + column_lo[box_of_row]]
+        ends = self.offsets[rows * self.shape[1] + column_hi[box_of_row] + 1]
+
+        # expand the slices to candidate points, remembering the box of each candidate
+        box_of_candidate = np.repeat(box_of_row, ends - starts)
+        candidates = self.order[_ragged_arange(starts, ends - starts)]
+
+        # exact test on the candidates only
+        x, y = self.x[candidates], self.y[candidates]
+        inside = (x > x_lo[box_of_candidate]) & (x < x_hi[box_of_candidate]) & (y > y_lo[box_of_candidate]) & (y < y_hi[box_of_candidate])
+        candidates, box_of_candidate = candidates[inside], box_of_candidate[inside]
+
+        # sort the indices within each box
+        order = np.lexsort((candidates, box_of_candidate))
+        offsets = np.concatenate(([0], np.cumsum(np.bincount(box_of_candidate, minlength=len(boxes)))))
+
+        return candidates[order], offsets
+
+def _ragged_arange(starts, lengths) -> np.ndarray:
+    """
+    Concatenates the ranges starts[i], ..., starts[i] + lengths[i] - 1 without a python loop.
+    :rtype numpy.ndarray
+    """
+    starts = np.asarray(starts, dtype=np.intp)
+    lengths = np.asarray(lengths, dtype=np.intp)
+
+    # position of every element within its own range
+    range_offsets = np.cumsum(lengths) - lengths
+    position = np.arange(lengths.sum()) - np.repeat(range_offsets, lengths)
+
+    return np.repeat(starts, lengths) + position
@@ -7,62 +7,235 @@
 # Date           : "28 September 2020"                                     
 ###################################################################
 
-import pandas as pd 
-import geopandas as gpd 
+import json
+import numpy as np
 
-from os.path import isfile
+from os import stat
+from os.path import isfile, dirname, join
+from functools import cached_property
+
+from utilities.spatialindex import GridIndex
+from utilities.cityboundary import CityBoundary
+from utilities.datacache import ArrayCache
+from utilities.stoptable import StopTable
+from utilities.projection import transform
+from utilities.timing import Timings
 
 class StaticDataReader: 
     """
-    Reads the static data files
+    Reads the static data files. 
+    All coordinates are held in WGS84 (lon/lat) and in web mercator (x/y), so plotting 
+    never has to reproject them. The parsed arrays are kept in a binary cache, by default in a `cache` directory
+    next to each file, so the files are only parsed again when they change.
     """
 
-    def __init__(self, berlin_bounds_file, berlin_stops_file): 
+    # the geojson property with the demand weight of a stop
+    weight_property = 'weight'
+
+    # the projected coordinate system stored alongside WGS84: web mercator, used by the web tiles
+    projected_epsg = 3857
+
+    def __init__(self, berlin_bounds_file, berlin_stops_file, cache_dir=None): 
 
         # set filenames
         self.berlin_bounds_file = berlin_bounds_file
         self.berlin_stops_file  = berlin_stops_file
+        self.cache_dir = cache_dir
+
+        # demand weight side files: file -> (signature, weights)
+        self._demand_weights = {}
 
-        # read files 
+        # read files. The geodataframe of the bounds is made on first use, see berlin_bounds
         self.berlin_stops   = self._read_berlin_stops()
-        self.berlin_bounds  = self._read_berlin_bounds()
+
+        # the bounds of berlin in web mercator, as an (n, 2) array of x/y
+        self.berlin_bounds_xy = self._read_berlin_bounds_xy()
     
     def __repr__(self): 
         return f"Reads static data files {self.berlin_bounds_file} and {self.berlin_stops_file}"
 
-    def _read_berlin_stops(self) -> gpd.GeoDataFrame: 
+    @cached_property
+    def berlin_bounds(self): 
         """
-        Reads berlin stops from a geojson file, with epsg 4326. 
-        If the file does not exist, return an empty geodataframe.
+        The bounds of berlin as a geodataframe, made on first use. The simulator and the figures 
+        use the arrays of berlin_bounds_xy, so geopandas is not imported unless this is used.
         :rtype geopandas.GeoDataFrame
         """
+        return self._read_berlin_bounds()
+
+    @cached_property
+    def stop_index(self) -> GridIndex: 
+        """
+        Spatial index over the berlin stops, built on first use. 
+        Queries return row indices into berlin_stops.
+        :rtype utilities.spatialindex.GridIndex
+        """
+        with Timings.stage('static_data.stop_index'): 
+            return GridIndex(self.berlin_stops.lon, self.berlin_stops.lat)
+
+    @cached_property
+    def city_boundary(self) -> CityBoundary: 
+        """
+        The boundary of berlin as a prepared polygon, built on first use to validate bounding boxes. 
+        None if there is no bounds file.
+        :rtype utilities.cityboundary.CityBoundary
+        """
+        if not isfile(self.berlin_bounds_file): 
+            return None
+
+        arrays = self._load_arrays(self.berlin_bounds_file, self._parse_berlin_bounds)
+
+        return CityBoundary(arrays['lon'], arrays['lat'])
+
+    def get_demand_weights(self, demand_weights_file=None) -> np.ndarray: 
+        """
+        Returns the demand weight of every berlin stop, or None for uniform demand. 
+        Without a file these are the weights of the stops geojson. A side file is a csv 
+        with `id` and `weight` columns, stops missing from it get weight 1. 
+        The weights of a side file are read again only when the file changes.
+        :rtype numpy.ndarray
+        """
+        if demand_weights_file is None: 
+            return self.berlin_stops.weights
+
+        import pandas as pd
+
+        signature = (stat(demand_weights_file).st_mtime_ns, stat(demand_weights_file).st_size)
+        cached = self._demand_weights.get(demand_weights_file)
+        if cached is None or cached[0] != signature: 
+            df = pd.read_csv(demand_weights_file, dtype={'id': str, 'weight': np.float64})
+            weights = df.set_index('id').weight.reindex(self.berlin_stops.decoded_ids).fillna(1.0)
+            cached = (signature, weights.values.astype(np.float64))
+            self._demand_weights[demand_weights_file] = cached
+
+        return cached[1]
+
+    def get_cache_dir(self, source_file: str) -> str: 
+        """
+        Returns the cache directory of a static data file.
+        :rtype str
+        """
+        return self.cache_dir or join(dirname(source_file), 'cache')
+
+    def _load_arrays(self, source_file: str, parse) -> dict: 
+        """
+        Returns the arrays of a static data file from the binary cache. 
+        On a cache miss the file is parsed with `parse` and the result is cached.
+        :rtype dict
+        """
+        cache = ArrayCache(self.get_cache_dir(source_file))
+
+        with Timings.stage('static_data.load_cache'): 
+            arrays = cache.load(source_file)
+        if arrays is None: 
+            with Timings.stage(f"static_data.{parse.__name__.lstrip('_')}"): 
+                arrays = parse()
+            cache.save(source_file, arrays)
+
+        return arrays
+
+    @classmethod
+    def _project(cls, lon, lat) -> tuple: 
+        """
+        Projects arrays of WGS84 coordinates to the projected coordinate system in a single vectorised call.
+        :rtype tuple
+        """
+        with Timings.stage('static_data.project'): 
+            return transform(lon, lat, 4326, cls.projected_epsg)
+
+    def _parse_berlin_stops(self) -> dict: 
+        """
+        Parses the berlin stops geojson file to arrays: 
+        lon/lat coordinates and their x/y projection, ids, and the names as unique names + a code per stop.
+        If any stop has a demand weight property, the weights are parsed too (default 1).
+        :rtype dict
+        """
+        with open(self.berlin_stops_file, encoding='utf-8') as f: 
+            features = json.load(f)['features']
+
+        coordinates = np.array([feature['geometry']['coordinates'][:2] for feature in features], dtype=np.float64).reshape(-1, 2)
+        ids = np.array([feature['properties']['id'] for feature in features], dtype=np.bytes_)
+        names, name_codes = np.unique(
+            np.array([feature['properties']['name'] for feature in features], dtype=np.str_), 
+            return_inverse=True
+        )
+
+        x, y = self._project(coordinates[:, 0], coordinates[:, 1])
+        arrays = {
+            'lon': coordinates[:, 0], 
+            'lat': coordinates[:, 1], 
+            'x': x, 
+            'y': y, 
+            'ids': ids, 
+            'names': names, 
+            'name_codes': name_codes.astype(np.int32)
+        }
+
+        if any(self.weight_property in feature['properties'] for feature in features): 
+            arrays['weights'] = np.array(
+                [feature['properties'].get(self.weight_property, 1.0) for feature in features], dtype=np.float64)
+
+        return arrays
+
+    def _parse_berlin_bounds(self) -> dict: 
+        """
+        Parses the berlin bounds poly file to lon/lat arrays and their x/y projection.
+        :rtype dict
+        """
+        # one whitespace separated lon lat pair per line
+        lon, lat = np.loadtxt(self.berlin_bounds_file, dtype=np.float64, ndmin=2).T
+        x, y = self._project(lon, lat)
+
+        return {
+            'lon': lon, 
+            'lat': lat, 
+            'x': x, 
+            'y': y
+        }
+
+    def _read_berlin_stops(self) -> StopTable: 
+        """
+        Reads berlin stops from a geojson file, with epsg 4326, into an array backed StopTable. 
+        If the file does not exist, return an empty table.
+        :rtype utilities.stoptable.StopTable
+        """
 
         if not isfile(self.berlin_stops_file): 
-            return gpd.GeoDataFrame()
+            return StopTable.empty_table()
 
-        return gpd.read_file(self.berlin_stops_file, crs='epsg:4326')
+        return StopTable.from_arrays(self._load_arrays(self.berlin_stops_file, self._parse_berlin_stops))
 
-    def _read_berlin_bounds(self) -> gpd.GeoDataFrame: 
+    def _read_berlin_bounds(self): 
         """
         Reads berlin bounds from a poly file and set epsg to 4326.
         If the file does not exist, return an empty geodataframe.
         :rtype geopandas.GeoDataFrame
         """
+        import geopandas as gpd
+
         if not isfile(self.berlin_bounds_file): 
             return gpd.GeoDataFrame()
 
-        df = pd.read_csv(self.berlin_bounds_file, delim_whitespace=True, header=None)
-        df.columns = ['lat', 'lon']
+        arrays = self._load_arrays(self.berlin_bounds_file, self._parse_berlin_bounds)
 
         # create a geodataframe
         gdf = gpd.GeoDataFrame(
-            df,
-            geometry = gpd.points_from_xy(df.lat, df.lon)
+            geometry = gpd.points_from_xy(arrays['lon'], arrays['lat'])
         )
-
-        # drop the lat, lon columns as they are in the geometry column
-        gdf.drop(['lat', 'lon'], axis=1, inplace=True)
         # set the coordinate system. This has to be done this way due to geopandas==0.5.0
         gdf.crs = {'init': 'epsg:4326'}
 
-        return gdf
\ No newline at end of file
+        return gdf
+
+    def _read_berlin_bounds_xy(self) -> np.ndarray: 
+        """
+        Reads the web mercator coordinates of the berlin bounds from the binary cache.
+        If the file does not exist, return an empty array.
+        :rtype numpy.ndarray
+        """
+        if not isfile(self.berlin_bounds_file): 
+            return np.empty((0, 2))
+
+        arrays = self._load_arrays(self.berlin_bounds_file, self._parse_berlin_bounds)
+
+        return np.c_[arrays['x'], arrays['y']]
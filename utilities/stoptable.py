@@ -0,0 +1,151 @@
+###################################################################
+# Script Name	 : "STOPTABLE.PY"
+# Description	 : Class definition for the array backed stop table
+# Args           :
+# Author       	 : Floris Remmen
+# Email          : floris.remmen@gmail.com
+# Date           : "18 October 2026"
+###################################################################
+
+import numpy as np
+
+class StopTable:
+    """
+    Compact, array backed table of stops.
+
+    Coordinates are contiguous float64 arrays, in WGS84 (lon/lat) and optionally
+    projected to web mercator (x/y) once when the stops are read. Ids are fixed-width bytes
+    and names are dictionary encoded: one array of unique names and an int32 code
+    per stop. A table made with `take` keeps the row indices of its stops in the
+    parent table in `index`. Stops can carry a demand weight, used as the prior of
+    the stop in weighted simulations. A GeoDataFrame is only built on demand, when plotting.
+    """
+
+    def __init__(self, lon, lat, ids, name_codes, name_categories, index=None, counts=None, weights=None, x=None, y=None):
+
+        # coordinates in EPSG:4326
+        self.lon = np.ascontiguousarray(lon, dtype=np.float64)
+        self.lat = np.ascontiguousarray(lat, dtype=np.float64)
+
+        # coordinates in EPSG:3857, if they were projected
+        self.x = None if x is None else np.ascontiguousarray(x, dtype=np.float64)
+        self.y = None if y is None else np.ascontiguousarray(y, dtype=np.float64)
+
+        # fixed-width identifiers (geohashes)
+        self.ids = np.asarray(ids, dtype=np.bytes_)
+
+        # dictionary encoded names
+        self.name_codes = np.asarray(name_codes, dtype=np.int32)
+        self.name_categories = np.asarray(name_categories, dtype=np.str_)
+
+        # row indices into the table this one was taken from
+        self.index = np.arange(len(self.lon)) if index is None else np.asarray(index, dtype=np.intp)
+
+        # optional count per stop, e.g. how often it was used in a simulation
+        self.counts = None if counts is None else np.asarray(counts, dtype=np.int64)
+
+        # optional demand weight per stop
+        self.weights = None if weights is None else np.asarray(weights, dtype=np.float64)
+
+    def __repr__(self):
+        return f"StopTable with {len(self)} stops."
+
+    def __len__(self):
+        return len(self.lon)
+
+    @classmethod
+    def from_arrays(cls, arrays: dict):
+        """
+        Creates a stop table from the arrays of the static data cache.
+        :rtype utilities.stoptable.StopTable
+        """
+        return cls(
+            lon=arrays['lon'],
+            lat=arrays['lat'],
+            ids=arrays['ids'],
+            name_codes=arrays['name_codes'],
+            name_categories=arrays['names'],
+            weights=arrays.get('weights'),
+            x=arrays.get('x'),
+            y=arrays.get('y')
+        )
+
+    @classmethod
+    def empty_table(cls):
+        """
+        Creates a stop table without stops.
+        :rtype utilities.stoptable.StopTable
+        """
+        return cls(lon=[], lat=[], ids=np.empty(0, dtype='S12'), name_codes=[], name_categories=[], x=[], y=[])
+
+    @property
+    def empty(self) -> bool:
+        """
+        True if the table contains no stops.
+        :rtype bool
+        """
+        return len(self) == 0
+
+    @property
+    def names(self) -> np.ndarray:
+        """
+        Returns the decoded name of every stop.
+        :rtype numpy.ndarray
+        """
+        return self.name_categories[self.name_codes]
+
+    @property
+    def decoded_ids(self) -> np.ndarray:
+        """
+        Returns the id of every stop as a string.
+        :rtype numpy.ndarray
+        """
+        return np.char.decode(self.ids, 'ascii')
+
+    def take(self, indices, counts=None) -> 'StopTable':
+        """
+        Returns a new stop table with the stops at the given row indices.
+        The name dictionary is shared with this table. The counts of the new
+        table are `counts` if given, otherwise the counts of the taken stops.
+        :rtype utilities.stoptable.StopTable
+        """
+        indices = np.asarray(indices, dtype=np.intp)
+        if counts is None and self.counts is not None:
+            counts = self.counts[indices]
+
+        return StopTable(
+            lon=self.lon[indices],
+            lat=self.lat[indices],
+            ids=self.ids[indices],
+            name_codes=self.name_codes[indices],
+            name_categories=self.name_categories,
+            index=self.index[indices],
+            counts=counts,
+            weights=None if self.weights is None else self.weights[indices],
+            x=None if self.x is None else self.x[indices],
+            y=None if self.y is None else self.y[indices]
+        )
+
+    def to_geodataframe(self):
+        """
+        Converts the table to a GeoDataFrame with name, id (count and weight) and point geometry columns, in epsg 4326.
+        The GeoDataFrame is indexed by the row indices of the stops. geopandas is imported on the first conversion.
+        :rtype geopandas.GeoDataFrame
+        """
+        import geopandas as gpd
+
+        columns = {'name': self.names, 'id': self.decoded_ids}
+        if self.counts is not None:
+            columns['count'] = self.counts
+        if self.weights is not None:
+            columns['weight'] = self.weights
+
+        gdf = gpd.GeoDataFrame(
+            columns,
+            geometry=gpd.points_from_xy(self.lon, self.lat),
+            index=self.index
+        )
+        # set the coordinate system. This has to be done this way due to geopandas==0.5.0
+        gdf.crs = {'init': 'epsg:4326'}
+
+        return gdf
@@ -0,0 +1,188 @@
+###################################################################
+# Script Name	 : "TIMING.PY"
+# Description	 : Process-wide histograms of the durations of the
+#                  stages of the reader, simulator and visualiser.
+# Args           :
+# Author       	 : Floris Remmen
+# Email          : floris.remmen@gmail.com
+# Date           : "18 October 2026"
+###################################################################
+
+import time
+import threading
+from bisect import bisect_left
+from functools import wraps
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+class Stage:
+    """
+    Times a block of code as a stage of Timings.
+    """
+
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        Timings.observe(self.name, time.perf_counter() - self.start)
+
+class Timings:
+    """
+    Process-wide histograms of the durations of named stages, e.g. `simulator.simulate`.
+
+    Stages are timed with `with Timings.stage(name):`. The durations are added to a histogram
+    per stage, which is exported in the Prometheus text format, and to the durations of the
+    current request or job (see `collect`), which are echoed in a Server-Timing header.
+    While timing is disabled, `stage` returns a shared context manager that does nothing.
+    """
+
+    # whether the stages are timed, set by the application factory
+    enabled = False
+
+    # upper bounds of the histogram buckets, in seconds
+    buckets = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    # the name of the histogram in the Prometheus text format
+    metric = 'mi_stage_duration_seconds'
+
+    # stage -> [number of durations per bucket, and above the last bucket; sum of the durations]
+    _histograms = {}
+    _lock = threading.Lock()
+
+    # stage -> summed duration of the current request or job, if they are collected
+    _current = ContextVar('timings', default=None)
+    _disabled = nullcontext()
+
+    @classmethod
+    def stage(cls, name: str):
+        """
+        Returns a context manager that times a stage, if timing is enabled.
+        """
+        if not cls.enabled:
+            return cls._disabled
+
+        return Stage(name)
+
+    @classmethod
+    def timed(cls, name: str):
+        """
+        Returns a decorator that times every call of a function as a stage.
+        """
+        def decorator(function):
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                with cls.stage(name):
+                    return function(*args, **kwargs)
+            return wrapper
+
+        return decorator
+
+    @classmethod
+    def observe(cls, name: str, seconds: float):
+        """
+        Adds the duration of a stage to its histogram, and to the durations of the current request or job.
+        """
+        bucket = bisect_left(cls.buckets, seconds)
+        with cls._lock:
+            histogram = cls._histograms.get(name)
+            if histogram is None:
+                histogram = cls._histograms[name] = [[0] * (len(cls.buckets) + 1), 0.0]
+            histogram[0][bucket] += 1
+            histogram[1] += seconds
+
+        cls.add({name: seconds})
+
+    @classmethod
+    def add(cls, timings: dict):
+        """
+        Adds durations by stage to the durations of the current request or job, without adding them to the histograms.
+        """
+        current = cls._current.get()
+        if current is not None:
+            for name, seconds in timings.items():
+                current[name] = current.get(name, 0.0) + seconds
+
+    @classmethod
+    def start(cls, timings: dict):
+        """
+        Starts collecting the summed durations of the stages that run in this thread (or context) into timings.
+        Returns a token to stop collecting.
+        :rtype contextvars.Token
+        """
+        return cls._current.set(timings)
+
+    @classmethod
+    def stop(cls, token):
+        """
+        Stops collecting the durations of a token of `start`.
+        """
+        cls._current.reset(token)
+
+    @classmethod
+    @contextmanager
+    def collect(cls, timings: dict = None):
+        """
+        Collects the summed durations of the stages that run in the block (in this thread) into
+        a dict, which is returned by the context manager.
+        """
+        timings = {} if timings is None else timings
+        token = cls.start(timings)
+        try:
+            yield timings
+        finally:
+            cls.stop(token)
+
+    @classmethod
+    def histograms(cls) -> dict:
+        """
+        Returns a copy of the histograms: stage -> (cumulative number of durations per bucket, count, sum).
+        :rtype dict
+        """
+        with cls._lock:
+            histograms = {name: (list(counts), total) for name, (counts, total) in cls._histograms.items()}
+
+        return {
+            name: ([sum(counts[:i + 1]) for i in range(len(cls.buckets))], sum(counts), total)
+            for name, (counts, total) in histograms.items()
+        }
+
+    @classmethod
+    def clear(cls):
+        """
+        Removes all histograms.
+        """
+        with cls._lock:
+            cls._histograms.clear()
+
+    @classmethod
+    def prometheus(cls) -> str:
+        """
+        Returns the histograms in the Prometheus text exposition format.
+        :rtype str
+        """
+        lines = [
+            f'# HELP {cls.metric} Duration of the stages of the static data reader, simulator and visualiser.',
+            f'# TYPE {cls.metric} histogram'
+        ]
+        for name, (cumulative, count, total) in sorted(cls.histograms().items()):
+            for bound, bucket_count in zip(cls.buckets, cumulative):
+                lines.append(f'{cls.metric}_bucket{{stage="{name}",le="{bound}"}} {bucket_count}')
+            lines.append(f'{cls.metric}_bucket{{stage="{name}",le="+Inf"}} {count}')
+            lines.append(f'{cls.metric}_sum{{stage="{name}"}} {total!r}')
+            lines.append(f'{cls.metric}_count{{stage="{name}"}} {count}')
+
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def server_timing(timings: dict) -> str:
+        """
+        Returns durations by stage as the value of a Server-Timing header, in milliseconds.
+        :rtype str
+        """
+        return ', '.join(f'{name};dur={seconds * 1000:.2f}' for name, seconds in timings.items())
@@ -0,0 +1,157 @@
+###################################################################
+# Script Name	 : "BASELAYER.PY"
+# Description	 : Class definition for the cached base layer of the
+#                  overview figure.
+# Args           :
+# Author       	 : Floris Remmen
+# Email          : floris.remmen@gmail.com
+# Date           : "18 October 2026"
+###################################################################
+
+import threading
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image
+
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from utilities.staticdatareader import StaticDataReader
+from visualiser.tilestore import add_basemap
+
+class BaseLayer:
+    """
+    The static part of the overview figure, rendered once to a raster: the basemap,
+    all of the berlin stops and the bounds of berlin.
+
+    `image` is an RGBA array that covers `extent` = (x_min, x_max, y_min, y_max) in web
+    mercator, the projection of the static data and of the web tiles, so it can be drawn with `imshow` under the
+    request-specific bounding box and markers. The layer of a StaticDataReader is only
+    rendered once per process, and again when the static data is reloaded. A layer without
+    basemap is cached separately, it needs no tiles.
+    """
+
+    # size of the raster in inches along its longest side, and its resolution.
+    # This is about the size of the axes of the overview figure, so it is hardly resampled.
+    size = 12
+    dpi = 100
+
+    # relative margin around the stops and bounds
+    margin = 0.05
+
+    # (stops file, bounds file, basemap) -> (StaticDataReader, BaseLayer)
+    _layers = {}
+    _lock = threading.Lock()
+
+    def __init__(self, image: np.ndarray, extent: tuple):
+        self.image = image
+        self.extent = extent
+
+        # backgrounds with the raster resampled to the pixel boxes it was composited at
+        self.background = lru_cache(maxsize=8)(self._background)
+
+    def __repr__(self):
+        return f"BaseLayer of {self.image.shape[1]}x{self.image.shape[0]} pixels covering {self.extent}."
+
+    @classmethod
+    def get(cls, static_data: StaticDataReader, basemap: bool = True):
+        """
+        Returns the base layer of the static data, rendered on first use.
+        Returns None if there are no stops and no bounds to render.
+        :rtype visualiser.baselayer.BaseLayer
+        """
+        key = (static_data.berlin_stops_file, static_data.berlin_bounds_file, basemap)
+
+        cached = cls._layers.get(key)
+        if cached is None or cached[0] is not static_data:
+            with cls._lock:
+                cached = cls._layers.get(key)
+                if cached is None or cached[0] is not static_data:
+                    cached = (static_data, cls.render(static_data, basemap))
+                    cls._layers[key] = cached
+
+        return cached[1]
+
+    def _background(self, width: int, height: int, x0: int, y0: int, x1: int, y1: int) -> Image.Image:
+        """
+        Returns a white width x height image with the raster resampled into the pixel box
+        (x0, y0, x1, y1), measured from the bottom left corner like matplotlib display coordinates.
+        :rtype PIL.Image.Image
+        """
+        background = Image.new('RGBA', (width, height), 'white')
+        raster = Image.fromarray(self.image).resize((x1 - x0, y1 - y0), Image.BILINEAR)
+        background.paste(raster, (x0, height - y1))
+
+        return background
+
+    def composite(self, figure, ax):
+        """
+        Composites the artists of a figure on top of the raster, drawn under ax. Returns a PIL image.
+        If the axes show exactly the extent of the raster, the raster is only resampled once for
+        the pixel box of the axes, and the figure is drawn transparently on top of that background.
+        Otherwise the raster is drawn with imshow. The layout of the figure has to be final.
+        :rtype PIL.Image.Image
+        """
+        ax.apply_aspect()
+        if (*ax.get_xlim(), *ax.get_ylim()) != self.extent:
+            limits = ax.get_xlim(), ax.get_ylim()
+            ax.imshow(self.image, extent=self.extent, interpolation='bilinear', zorder=0)
+            ax.set_xlim(*limits[0])
+            ax.set_ylim(*limits[1])
+            figure.canvas.draw()
+            return Image.fromarray(np.asarray(figure.canvas.buffer_rgba()))
+
+        figure.patch.set_alpha(0)
+        figure.canvas.draw()
+        overlay = Image.fromarray(np.asarray(figure.canvas.buffer_rgba()))
+
+        background = self.background(*overlay.size, *np.round(ax.bbox.extents).astype(int).tolist())
+        return Image.alpha_composite(background, overlay)
+
+    @classmethod
+    def render(cls, static_data: StaticDataReader, basemap: bool = True):
+        """
+        Renders the stops, the bounds of berlin and optionally a basemap to a raster.
+        :rtype visualiser.baselayer.BaseLayer
+        """
+        # the stops and bounds are projected once, when the static data is read
+        stops = np.c_[static_data.berlin_stops.x, static_data.berlin_stops.y]
+        bounds = static_data.berlin_bounds_xy
+
+        points = np.concatenate([stops, bounds])
+        if not len(points):
+            return None
+
+        # the extent of the raster: the stops and bounds with a margin
+        (x_min, y_min), (x_max, y_max) = points.min(axis=0), points.max(axis=0)
+        dx, dy = (x_max - x_min) * cls.margin, (y_max - y_min) * cls.margin
+        extent = (x_min - dx, x_max + dx, y_min - dy, y_max + dy)
+
+        # a figure with the aspect ratio of the extent, the axes cover the whole figure
+        width, height = extent[1] - extent[0], extent[3] - extent[2]
+        scale = cls.size / max(width, height)
+        figure = Figure(figsize=(width * scale, height * scale), dpi=cls.dpi)
+        canvas = FigureCanvasAgg(figure)
+        ax = figure.add_axes([0, 0, 1, 1])
+
+        # plot all of the stops and the polygon around berlin
+        if len(stops):
+            ax.scatter(stops[:, 0], stops[:, 1], marker='.', s=15)
+        if len(bounds):
+            ax.plot(*np.concatenate([bounds, bounds[:1]]).T, color='red')
+
+        # add a basemap from the local tile store or contextily, for exactly the extent of the raster
+        ax.set_xlim(extent[0], extent[1])
+        ax.set_ylim(extent[2], extent[3])
+        if basemap:
+            add_basemap(ax)
+        ax.set_aspect('auto')
+        ax.set_xlim(extent[0], extent[1])
+        ax.set_ylim(extent[2], extent[3])
+        ax.set_axis_off()
+
+        canvas.draw()
+        image = np.asarray(canvas.buffer_rgba()).copy()
+
+        return cls(image, extent)
@@ -0,0 +1,329 @@
+###################################################################
+# Script Name	 : "TILESTORE.PY"
+# Description	 : Offline store of web map tiles in an MBTiles file,
+#                  and a basemap provider that reads from it. Can be
+#                  run as a script to prefetch the tiles of Berlin.
+# Args           : --tiles, --stops, --bounds, --zoom, --url, --delay
+# Author       	 : Floris Remmen
+# Email          : floris.remmen@gmail.com
+# Date           : "18 October 2026"
+###################################################################
+
+import os
+import io
+import time
+import sqlite3
+import argparse
+import threading
+import urllib.error
+import urllib.request
+from functools import lru_cache
+
+import numpy as np
+import mercantile
+import contextily as ctx
+from PIL import Image
+
+from utilities.datastore import StaticDataStore
+from utilities.timing import Timings
+
+# the tile store that is used by the visualisations if it exists, made with `python -m visualiser.tilestore`
+default_tiles_file = os.path.join('data', 'berlin_tiles.mbtiles')
+
+# the default tiles of contextily, openstreetmap in the humanitarian style
+default_tile_url = 'https://a.tile.openstreetmap.fr/hot/{z}/{x}/{y}.png'
+default_attribution = '(C) OpenStreetMap contributors, Tiles style by Humanitarian OpenStreetMap Team hosted by OpenStreetMap France'
+
+# The tile usage policies of the openstreetmap servers forbid bulk downloads. Larger prefetches
+# need the --url of a tile server that allows them.
+max_default_tiles = 1000
+
+class TileStore:
+    """
+    Web map tiles in a single MBTiles file, an SQLite database with a `tiles` and a `metadata` table.
+
+    Tiles are addressed by their XYZ (web mercator) zoom, column and row. The MBTiles spec stores
+    the rows in the TMS scheme, with the row numbers flipped, which is done when they are read or written.
+    A store that is not writable is opened read-only, so it can be read from a read-only filesystem.
+    """
+
+    def __init__(self, path: str, writable: bool = False):
+        self.path = path
+        self.writable = writable
+
+        # one connection, shared by the threads that render and guarded by a lock
+        self._connection = sqlite3.connect(
+            f"file:{path}?mode={'rwc' if writable else 'ro'}", uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+
+        if writable:
+            with self._lock, self._connection:
+                self._connection.execute('CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT)')
+                self._connection.execute(
+                    'CREATE TABLE IF NOT EXISTS tiles (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB, '
+                    'PRIMARY KEY (zoom_level, tile_column, tile_row))')
+
+    def __repr__(self):
+        return f"TileStore {self.path} with zoom levels {self.zoom_levels}."
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute('SELECT COUNT(*) FROM tiles').fetchone()[0]
+
+    @property
+    def metadata(self) -> dict:
+        """
+        Returns the metadata of the store, e.g. its name, attribution, bounds, minzoom and maxzoom.
+        :rtype dict
+        """
+        with self._lock:
+            return dict(self._connection.execute('SELECT name, value FROM metadata').fetchall())
+
+    @property
+    def zoom_levels(self) -> tuple:
+        """
+        Returns the lowest and highest zoom level in the store, or None if it holds no tiles.
+        :rtype tuple
+        """
+        with self._lock:
+            zoom_levels = self._connection.execute('SELECT MIN(zoom_level), MAX(zoom_level) FROM tiles').fetchone()
+
+        return None if zoom_levels[0] is None else zoom_levels
+
+    def get(self, z: int, x: int, y: int) -> bytes:
+        """
+        Returns the encoded image of the XYZ tile, or None if it is not in the store.
+        :rtype bytes
+        """
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT tile_data FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?',
+                (z, x, (1 << z) - 1 - y)).fetchone()
+
+        return None if row is None else bytes(row[0])
+
+    def put(self, z: int, x: int, y: int, data: bytes):
+        """
+        Stores the encoded image of the XYZ tile.
+        """
+        with self._lock, self._connection:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO tiles (zoom_level, tile_column, tile_row, tile_data) VALUES (?, ?, ?, ?)',
+                (z, x, (1 << z) - 1 - y, sqlite3.Binary(data)))
+
+    def set_metadata(self, **values):
+        """
+        Stores metadata values of the store.
+        """
+        with self._lock, self._connection:
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO metadata (name, value) VALUES (?, ?)',
+                [(name, str(value)) for name, value in values.items()])
+
+    def close(self):
+        """
+        Closes the database connection.
+        """
+        with self._lock:
+            self._connection.close()
+
+class TileBasemap:
+    """
+    Draws basemaps from a TileStore, like contextily's add_basemap but without any network access.
+
+    The tiles that cover the extent of a figure are decoded and stitched to a single mosaic in web
+    mercator, the projection of the figures, so it is drawn without warping. The most recent mosaics
+    are kept by (extent, zoom), so repeated renders of the same extent skip the tile store entirely.
+    """
+
+    # number of stitched mosaics that are kept
+    max_mosaics = 16
+
+    # tiles file -> (file signature, TileBasemap)
+    _basemaps = {}
+    _lock = threading.Lock()
+
+    def __init__(self, store: TileStore):
+        self.store = store
+        self.attribution = store.metadata.get('attribution')
+        self.zoom_levels = store.zoom_levels
+
+        # the most recently stitched mosaics, by (extent, zoom)
+        self.mosaic = lru_cache(maxsize=self.max_mosaics)(self._mosaic)
+
+    def __repr__(self):
+        return f"TileBasemap from {self.store.path}."
+
+    @classmethod
+    def get(cls, tiles_file: str = default_tiles_file):
+        """
+        Returns the shared basemap of a tiles file, or None if the file does not exist.
+        The store is opened again when the file changes, e.g. after a new prefetch.
+        :rtype visualiser.tilestore.TileBasemap
+        """
+        signature = StaticDataStore.version(tiles_file)
+        if signature[0] is None:
+            return None
+
+        cached = cls._basemaps.get(tiles_file)
+        if cached is None or cached[0] != signature:
+            with cls._lock:
+                cached = cls._basemaps.get(tiles_file)
+                if cached is None or cached[0] != signature:
+                    cached = (signature, cls(TileStore(tiles_file)))
+                    cls._basemaps[tiles_file] = cached
+
+        return cached[1]
+
+    def zoom(self, extent: tuple) -> int:
+        """
+        Returns the zoom level for an extent (x_min, x_max, y_min, y_max) in web mercator, chosen like
+        contextily's automatic zoom and clipped to the zoom levels in the store.
+        :rtype int
+        """
+        west, south = mercantile.lnglat(extent[0], extent[2])
+        east, north = mercantile.lnglat(extent[1], extent[3])
+        zoom = int(np.ceil(np.log2(720.0 / max(east - west, north - south, 1e-9))))
+
+        if self.zoom_levels is None:
+            return zoom
+        return int(np.clip(zoom, *self.zoom_levels))
+
+    def _mosaic(self, extent: tuple, zoom: int) -> tuple:
+        """
+        Stitches the tiles that cover the extent (x_min, x_max, y_min, y_max) at the zoom level.
+        Returns the RGBA image and its extent in web mercator. Tiles that are not in the store are transparent.
+        :rtype tuple
+        """
+        west, south = mercantile.lnglat(extent[0], extent[2])
+        east, north = mercantile.lnglat(extent[1], extent[3])
+        tiles = list(mercantile.tiles(west, south, east, north, [zoom]))
+
+        x_min, y_min = min(t.x for t in tiles), min(t.y for t in tiles)
+        x_max, y_max = max(t.x for t in tiles), max(t.y for t in tiles)
+
+        images = {}
+        for tile in tiles:
+            data = self.store.get(tile.z, tile.x, tile.y)
+            if data is not None:
+                images[tile] = np.asarray(Image.open(io.BytesIO(data)).convert('RGBA'))
+
+        size = next(iter(images.values())).shape[0] if images else 256
+        image = np.zeros(((y_max - y_min + 1) * size, (x_max - x_min + 1) * size, 4), dtype=np.uint8)
+        for tile, tile_image in images.items():
+            row, column = (tile.y - y_min) * size, (tile.x - x_min) * size
+            image[row:row + size, column:column + size] = tile_image
+
+        top_left = mercantile.xy_bounds(x_min, y_min, zoom)
+        bottom_right = mercantile.xy_bounds(x_max, y_max, zoom)
+
+        return image, (top_left.left, bottom_right.right, bottom_right.bottom, top_left.top)
+
+    def add_to(self, ax, zoom='auto'):
+        """
+        Draws the basemap under the current extent of ax, which is kept.
+        """
+        extent = ax.axis()
+        if zoom == 'auto':
+            zoom = self.zoom(extent)
+
+        image, image_extent = self.mosaic(tuple(extent), zoom)
+        ax.imshow(image, extent=image_extent, interpolation='bilinear', aspect=ax.get_aspect())
+        ax.axis(extent)
+
+        if self.attribution:
+            ctx.add_attribution(ax, self.attribution)
+
+@Timings.timed('visualiser.basemap')
+def add_basemap(ax, tiles_file: str = default_tiles_file):
+    """
+    Adds a basemap under ax, in web mercator. The tiles are read from the local tile store if it
+    exists, otherwise they are downloaded by contextily.
+    """
+    basemap = TileBasemap.get(tiles_file)
+    if basemap is None:
+        ctx.add_basemap(ax)
+    else:
+        basemap.add_to(ax)
+
+def fetch_tile(url: str, retries: int = 3, backoff: float = 2.0) -> bytes:
+    """
+    Downloads the encoded image of a tile. Failed downloads are retried after an increasing wait,
+    or the Retry-After of the server, except for client errors that are not rate limits.
+    :rtype bytes
+    """
+    request = urllib.request.Request(url, headers={'User-Agent': 'mi-code-challenge tile prefetch'})
+    for attempt in range(retries + 1):
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                return response.read()
+        except urllib.error.HTTPError as error:
+            if attempt == retries or (error.code < 500 and error.code != 429):
+                raise
+            retry_after = error.headers.get('Retry-After', '')
+            time.sleep(float(retry_after) if retry_after.isdigit() else backoff * 2 ** attempt)
+        except urllib.error.URLError:
+            if attempt == retries:
+                raise
+            time.sleep(backoff * 2 ** attempt)
+
+def missing_tiles(store: TileStore, bounds: tuple, zoom_levels) -> list:
+    """
+    Returns the tiles that cover bounds (west, south, east, north in lon/lat) at every zoom level
+    and are not in the store yet.
+    :rtype list
+    """
+    return [tile for tile in mercantile.tiles(*bounds, list(zoom_levels)) if store.get(tile.z, tile.x, tile.y) is None]
+
+def prefetch(store: TileStore, bounds: tuple, zoom_levels, url: str = default_tile_url, fetch=fetch_tile, delay: float = 0.5) -> int:
+    """
+    Downloads the tiles that cover bounds (west, south, east, north in lon/lat) at every zoom level
+    into the store, one after another with `delay` seconds between them. Tiles that are already in 
+    the store are skipped. Returns the number of downloaded tiles.
+    :rtype int
+    """
+    downloaded = 0
+    for tile in missing_tiles(store, bounds, zoom_levels):
+        if downloaded and delay:
+            time.sleep(delay)
+        store.put(tile.z, tile.x, tile.y, fetch(url.format(z=tile.z, x=tile.x, y=tile.y)))
+        downloaded += 1
+
+    return downloaded
+
+if __name__ == "__main__":
+
+    from utilities.staticdatareader import StaticDataReader
+    from visualiser.baselayer import BaseLayer
+
+    parser = argparse.ArgumentParser(description='Prefetches the web tiles around the stops and bounds of berlin into an MBTiles file.')
+    parser.add_argument('--tiles', default=default_tiles_file, help='the MBTiles file to write')
+    parser.add_argument('--stops', default='data/berlin_stops.geojson', help='the stops geojson file')
+    parser.add_argument('--bounds', default='data/berlin_bounds.poly', help='the bounds poly file')
+    parser.add_argument('--zoom', type=int, nargs='+', default=list(range(10, 14)), help='the zoom levels to fetch')
+    parser.add_argument('--url', default=None, help=f'the url template of the tiles, with {{z}}, {{x}} and {{y}}. Required for more than {max_default_tiles} tiles, defaults to {default_tile_url}')
+    parser.add_argument('--delay', type=float, default=0.5, help='the seconds to wait between two downloads')
+    parser.add_argument('--attribution', default=default_attribution, help='the attribution of the tiles')
+    args = parser.parse_args()
+
+    # the extent of the overview figure: the stops and the bounds of berlin, with a margin
+    static_data = StaticDataReader(args.bounds, args.stops)
+    points = np.concatenate([np.c_[static_data.berlin_stops.x, static_data.berlin_stops.y], static_data.berlin_bounds_xy])
+    (x_min, y_min), (x_max, y_max) = points.min(axis=0), points.max(axis=0)
+    dx, dy = (x_max - x_min) * BaseLayer.margin, (y_max - y_min) * BaseLayer.margin
+    west, south = mercantile.lnglat(x_min - dx, y_min - dy)
+    east, north = mercantile.lnglat(x_max + dx, y_max + dy)
+
+    store = TileStore(args.tiles, writable=True)
+    if args.url is None and len(missing_tiles(store, (west, south, east, north), args.zoom)) > max_default_tiles:
+        store.close()
+        parser.error(
+            f'more than {max_default_tiles} tiles are missing. The openstreetmap tile usage policies forbid bulk downloads, '
+            'pass the --url of a tile server that allows them, or fewer --zoom levels')
+
+    store.set_metadata(
+        name='berlin', format='png', attribution=args.attribution,
+        bounds=f'{west},{south},{east},{north}', minzoom=min(args.zoom), maxzoom=max(args.zoom))
+    downloaded = prefetch(store, (west, south, east, north), args.zoom, url=args.url or default_tile_url, delay=args.delay)
+    print(f'Downloaded {downloaded} tiles. {store}')
+    store.close()
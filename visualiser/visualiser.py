@@ -13,37 +13,52 @@ import warnings
 warnings.simplefilter(action='ignore', category=FutureWarning)
 
 # data manipulation
-import pandas as pd
-import geopandas as gpd
+import numpy as np
 
 # for hints
 from utilities.bounding_box import BoundingBox
 from utilities.staticdatareader import StaticDataReader
+# durations of the stages of the visualisations
+from utilities.timing import Timings
 
-# plotting figures
-import matplotlib
-matplotlib.use('Agg') # non interactive backend for matplotlib
-import matplotlib.pyplot as plt
-import contextily as ctx
-from shapely.geometry import Polygon # to plot berlin bounds as polygon
+# The plotting stack (matplotlib, contextily, the base layer and the tile store) is imported by the
+# first render and not with this module, so the webapp starts without it. The object oriented API of 
+# matplotlib is used instead of pyplot, which holds global state, so figures can be rendered by 
+# concurrent requests in a threaded server.
 
 # for visualiser ID generation
-from random import randint
+import secrets
 
-# google maps plotting
-import gmplot
+# the interactive map is a static html template with a json payload
+import json
+from functools import lru_cache
 
 # to edit the contextily cache directory
 import os
+# to render into memory buffers
+from io import BytesIO
+import threading
 
 class Visualiser: 
     """
     Class to generate visualisations based on the output of a Simulator instance.
+    Every figure has its own canvas, so visualisers can render from several threads at once.
     """
 
+    # the output file of every visualisation, prefixed with the identifier of the visualiser
+    output_files = {
+        'overview': 'overview_plot.png', 
+        'closeup': 'closeup_plot.png', 
+        'gmap': 'map.html'
+    }
+
+    # the contextily cache directory is process-wide state, it is set once and not by every request
+    _contextily_cache_dir = None
+    _lock = threading.Lock()
+
     ## TODO: Use booking bins
 
-    def __init__(self, bounding_box: BoundingBox, simulation_results: dict, static_data: StaticDataReader, static_path: str):
+    def __init__(self, bounding_box: BoundingBox, simulation_results: dict, static_data: StaticDataReader, static_path: str, basemap: bool = True, identifier: str = None, store=None):
         
         # read the static data files. 
         self.static_data = static_data
@@ -52,54 +67,82 @@ class Visualiser:
         self.bounding_box = bounding_box
         self.simulation_results = simulation_results
 
-        # a random identifier for the simulation
-        self.id = randint(0, 69420)
+        # the identifier of the simulation, the prefix of its output files. Random ids are 64 bits, so they do not collide
+        self.id = identifier or secrets.token_hex(8)
         
         # the directory to store the output visualisations
         self.static_path = static_path
 
+        # optional artifact cache (e.g. in memory) to put the output visualisations in, instead of the static path
+        self.store = store
+
         # set the contextily cache dir to reduce downloads
-        ctx.set_cache_dir(os.path.join(os.getcwd(), 'data', 'contextily_cache'))
+        contextily_cache_dir = os.path.join(os.getcwd(), 'data', 'contextily_cache')
+        with Visualiser._lock: 
+            if Visualiser._contextily_cache_dir != contextily_cache_dir: 
+                import contextily as ctx
+                ctx.set_cache_dir(contextily_cache_dir)
+                Visualiser._contextily_cache_dir = contextily_cache_dir
 
-        # set the visualiser coordinate system. Usually web tiles are provided using web mercator
-        self.crs_epsg = 3857
+        # whether to add openstreetmap tiles under the figures. Without it nothing is downloaded.
+        self.basemap = basemap
+
+        # set the visualiser coordinate system. Usually web tiles are provided using web mercator.
+        # The static data and the simulation results already hold their coordinates in this system.
+        self.crs_epsg = static_data.projected_epsg
 
     def __repr__(self): 
         return f"Visualiser class for mi-code-challenge around {self.bounding_box.center}."
 
+    @staticmethod
+    def preload(): 
+        """
+        Imports the plotting stack ahead of the first render, e.g. in the master process of a 
+        preforking server, so its workers share the imported modules instead of importing them each.
+        """
+        import contextily
+        import matplotlib.figure, matplotlib.backends.backend_agg, matplotlib.patches
+        import visualiser.baselayer, visualiser.tilestore
+
+    @Timings.timed('visualiser.overview')
     def generate_overview_figure(self):
         """
         Generates an overview image using matplotlib.
-        The data is first converted to the correct Coordinate system. 
-        The following features can be observed in the output image: 
+        All of the data is plotted in the web mercator coordinates it was read with. 
+        The stops, bounds and basemap do not depend on the simulation, they are drawn from a 
+        cached BaseLayer raster. The following features can be observed in the output image: 
         - all of the berlin stops
         - a visual sanity check containing the bounds of berlin, 
             to assert that the bounding box is not outside of berlin
         - the bounding box itself
         - the simulation results: pickups / dropoffs
         - a background map using contextily / openstreetmap data
-        The image is saved in the webapp/static directory with the identifier of the Visualiser instance.
+        The image is saved with the identifier of the Visualiser instance, in the webapp/static directory or the store.
         """
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg # non interactive backend for matplotlib
+        from matplotlib.patches import Rectangle
+        # the cached stops, bounds and basemap of the overview figure
+        from visualiser.baselayer import BaseLayer
+        # basemaps from the local tile store, or downloaded by contextily
+        from visualiser.tilestore import add_basemap
 
-        _, ax = plt.subplots(figsize=(15,12)) 
-        plt.title('Overview plot')
+        figure = Figure(figsize=(15,12))
+        FigureCanvasAgg(figure)
+        ax = figure.subplots()
+        ax.set_title('Overview plot')
 
-        # plotting all of the stops in Berlin in correct crs
-        if not self.static_data.berlin_stops.empty:
-            self.static_data.berlin_stops.to_crs(epsg=self.crs_epsg).plot(ax=ax, marker='.', markersize=15, label='Stops') 
-        
-        # plotting the polygon around berlin
-        if not self.static_data.berlin_bounds.empty:
-            # convert the bounds of berlin to the correct crs
-            berlin_bounds_points = self.static_data.berlin_bounds.to_crs(epsg=self.crs_epsg)
-            # convert the points to a polygon
-            berlin_bounds_poly = Polygon([[p.x, p.y] for p in berlin_bounds_points.geometry])
-            # plot the polygon's exterior --> this is the bounds of berlin.
-            ax.plot(*berlin_bounds_poly.exterior.xy, color='red')
+        # the basemap, all of the stops in Berlin and the polygon around berlin are rendered once 
+        # to a cached raster. Only the bounding box and the simulation results are drawn per request.
+        with Timings.stage('visualiser.base_layer'): 
+            base_layer = BaseLayer.get(self.static_data, basemap=self.basemap)
+        if base_layer is not None: 
+            # a legend entry for the stops in the raster
+            ax.plot([], [], marker='.', linestyle='', label='Stops')
 
         # plot the bounding box as a matplotlib Rectangle
         x1, y1, x2, y2 = self.bounding_box.to_crs(epsg=self.crs_epsg)
-        bounding_box_handle = matplotlib.patches.Rectangle(
+        bounding_box_handle = Rectangle(
             xy=(min(x1,x2), min(y1,y2)), 
             width=abs(x2-x1), 
             height=abs(y2-y1), 
@@ -110,118 +153,164 @@ class Visualiser:
         )
         ax.add_patch(bounding_box_handle)
 
-        # Set the coordinate system of the simulation to EPSG 3857. This is the most popular one for web tiles
-        pickup_data = self.simulation_results['most_popular_pickup_points'].to_crs(epsg=self.crs_epsg)
-        dropoff_data = self.simulation_results['most_popular_dropoff_points'].to_crs(epsg=self.crs_epsg)
+        # The simulation results carry their EPSG 3857 coordinates, the most popular one for web tiles
+        pickup_data = self.simulation_results['most_popular_pickup_points']
+        dropoff_data = self.simulation_results['most_popular_dropoff_points']
 
-        # plot pickup points
+        # plot pickup points. The markers are scattered directly on the axes, geopandas plotting 
+        # redraws the whole figure, including the base layer.
         if not pickup_data.empty:
-            pickup_data.plot(ax=ax, 
+            ax.scatter(pickup_data.x, pickup_data.y, 
                             marker='^',          
-                            markersize=150, 
+                            s=150, 
                             color='green', 
                             label='Pickup Requests')
         # plot dropoff points
         if not dropoff_data.empty:
-            dropoff_data.plot(ax=ax, 
+            ax.scatter(dropoff_data.x, dropoff_data.y, 
                             marker='v', 
-                            markersize=150, 
+                            s=150, 
                             color='red', 
                             label='Dropoff Requests')
         # set labels on axes
         ax.set(xlabel="Latitude", ylabel="Longitude")
-        # add a basemap using contextily
-        ctx.add_basemap(ax)
+        if base_layer is not None: 
+            # show the whole base layer, extended to the bounding box if it reaches outside of it
+            ax.set_xlim(min(base_layer.extent[0], x1, x2), max(base_layer.extent[1], x1, x2))
+            ax.set_ylim(min(base_layer.extent[2], y1, y2), max(base_layer.extent[3], y1, y2))
+            ax.set_aspect('equal')
+        elif self.basemap: 
+            # add a basemap using contextily
+            add_basemap(ax)
         # remove axes
         ax.set_axis_off()
         # legend to the right of the figure
-        plt.legend(bbox_to_anchor=(1.05, 1))
-        plt.tight_layout()
-        # save the figure
-        plt.savefig(f'{self.static_path}/{self.id}_overview_plot.png')
-        # close the image
-        plt.close()
+        ax.legend(bbox_to_anchor=(1.05, 1))
+        figure.tight_layout()
+        if base_layer is not None: 
+            # the raster is added after the layout is final, the figure is composited on top of it
+            with Timings.stage('visualiser.composite'): 
+                image = base_layer.composite(figure, ax)
+            buffer = BytesIO()
+            with Timings.stage('visualiser.savefig'): 
+                image.save(buffer, format='png')
+        else: 
+            # save the figure
+            buffer = BytesIO()
+            with Timings.stage('visualiser.savefig'): 
+                figure.savefig(buffer, format='png')
+        self.save('overview', buffer.getvalue())
 
+    @Timings.timed('visualiser.closeup')
     def generate_closeup_figure(self): 
         """
         Generates a closeup image using matplotlib.
-        The data is first converted to the correct Coordinate system. 
+        The simulation results are plotted in the web mercator coordinates they carry. 
         Visualises the results provided by the simulation with the following features: 
         - the bounding box itself
         - the simulation results: pickups / dropoffs
-        The image is saved in the webapp/static directory with the identifier of the Visualiser instance.
+        The image is saved with the identifier of the Visualiser instance, in the webapp/static directory or the store.
         """
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from visualiser.tilestore import add_basemap
 
-        _, ax = plt.subplots(figsize=(15,7)) 
+        figure = Figure(figsize=(15,7))
+        FigureCanvasAgg(figure)
+        ax = figure.subplots()
 
-        plt.title('Close up')
-        # Set the coordinate system to EPSG 3857. This is the most popular CRS for web tiles
-        pickup_data = self.simulation_results['most_popular_pickup_points'].to_crs(epsg=self.crs_epsg)
-        dropoff_data = self.simulation_results['most_popular_dropoff_points'].to_crs(epsg=self.crs_epsg)
+        ax.set_title('Close up')
+        # The simulation results carry their EPSG 3857 coordinates, the most popular CRS for web tiles
+        pickup_data = self.simulation_results['most_popular_pickup_points']
+        dropoff_data = self.simulation_results['most_popular_dropoff_points']
         # plot pickup points
         if not pickup_data.empty: 
-            pickup_data.plot(ax=ax, 
+            ax.scatter(pickup_data.x, pickup_data.y, 
                             marker='^',          
-                            markersize=150, 
+                            s=150, 
                             color='green', 
                             label='Pickup Requests')
         else: 
             ax.text(0.5, 0.4, 'No Data found for Pickup!', horizontalalignment='center')
         # plot dropoff points
         if not dropoff_data.empty:
-            dropoff_data.plot(ax=ax, 
+            ax.scatter(dropoff_data.x, dropoff_data.y, 
                             marker='v', 
-                            markersize=150, 
+                            s=150, 
                             color='red', 
                             label='Dropoff Requests')
         else: 
             ax.text(0.5, 0.5, 'No Data found for Dropoff!', horizontalalignment='center')
+        # equal scaling of the projected axes
+        ax.set_aspect('equal')
         
         # set labels on axes
         ax.set(xlabel="Latitude", ylabel="Longitude")
         # add a basemap using contextily & remove axes
-        ctx.add_basemap(ax=ax)
+        if self.basemap: 
+            add_basemap(ax)
         ax.set_axis_off() 
         # legend to the right of the figure
-        plt.legend(bbox_to_anchor=(1.05, 1))
-        plt.tight_layout()
+        ax.legend(bbox_to_anchor=(1.05, 1))
+        figure.tight_layout()
         # save figure
-        plt.savefig(f'{self.static_path}/{self.id}_closeup_plot.png')
-        # close 
-        plt.close()
+        buffer = BytesIO()
+        with Timings.stage('visualiser.savefig'): 
+            figure.savefig(buffer, format='png')
+        self.save('closeup', buffer.getvalue())
 
+    @Timings.timed('visualiser.gmap')
     def generate_gmap(self): 
         """
-        Generates an interactive google maps plot as an HTML file using gmplot.
-        No API key was defined, so only for development purposes.
+        Generates an interactive map as an HTML file, showing the most popular pickup and dropoff
+        points and the bounding box on openstreetmap tiles. All points are embedded as one compact 
+        json payload in a static template, and drawn client-side on a single canvas. 
+        Generating the map takes a few milliseconds, also for 100k points.
         """
-        # Create the map plotter. No API key for this project
-        apikey = ''
-        gmap = gmplot.GoogleMapPlotter(*self.bounding_box.center, 13, apikey=apikey, map_type='hybrid')
-        
-        # scatter pickup points
-        gmap.scatter(self.simulation_results['most_popular_pickup_points'].geometry.y, 
-                        self.simulation_results['most_popular_pickup_points'].geometry.x, 
-                        color='green', marker=True)
-        # add the identifier to the marker. Unfortunately no function for gmap.scatter to annotate
-        for _, row in self.simulation_results['most_popular_pickup_points'].iterrows(): 
-            gmap.text(row.geometry.y, row.geometry.x, row.id)
-    
-        # scatter dropoff points
-        gmap.scatter(self.simulation_results['most_popular_dropoff_points'].geometry.y, 
-                        self.simulation_results['most_popular_dropoff_points'].geometry.x, 
-                        color='red', marker=True)
-        # add the identifier to the marker. Unfortunately no function for gmap.scatter to annotate
-        for _, row in self.simulation_results['most_popular_dropoff_points'].iterrows(): 
-            gmap.text(row.geometry.y, row.geometry.x, row.id)
-            
-        # plot bounding box. The function requires four coordinates for a box.
-        gmap.polygon(
-            self.bounding_box.lats,
-            self.bounding_box.lons,
-            color='orange', 
-            edge_width=5
-        )
-    
-        # Draw the map to an HTML file:
-        gmap.draw(f'{self.static_path}/{self.id}_map.html')
+        pickup_points = self.simulation_results['most_popular_pickup_points']
+        dropoff_points = self.simulation_results['most_popular_dropoff_points']
+
+        # columns of coordinates, ids and counts of the points, coordinates to 6 decimals (~0.1m)
+        layers = [
+            {
+                'name': name, 
+                'color': color, 
+                'lat': np.round(points.lat, 6).tolist(), 
+                'lon': np.round(points.lon, 6).tolist(), 
+                'ids': points.decoded_ids.tolist(), 
+                'counts': None if points.counts is None else points.counts.tolist()
+            }
+            for name, color, points in (('Pickup', 'green', pickup_points), ('Dropoff', 'red', dropoff_points))
+        ]
+        data = json.dumps({
+            'center': self.bounding_box.center, 
+            'zoom': 13, 
+            'bounding_box': [list(corner) for corner in zip(self.bounding_box.lats, self.bounding_box.lons)], 
+            'layers': layers
+        }, separators=(',', ':'))
+
+        # the payload is in a script element, so it may not close the element
+        html = self._map_template().replace('__MAP_DATA__', data.replace('</', '<\\/'))
+        self.save('gmap', html.encode('utf-8'))
+
+    @staticmethod
+    @lru_cache(maxsize=1)
+    def _map_template() -> str: 
+        """
+        Returns the html template of the interactive map, read once.
+        :rtype str
+        """
+        with open(os.path.join(os.path.dirname(__file__), 'templates', 'map.html'), encoding='utf-8') as f: 
+            return f.read()
+
+    def save(self, visualisation: str, data: bytes): 
+        """
+        Saves the rendered bytes of a visualisation. They are put in the store of the visualiser
+        if it has one, otherwise they are written to the static path.
+        """
+        with Timings.stage('visualiser.save'): 
+            if self.store is not None: 
+                self.store.put(self.id, self.output_files[visualisation], data)
+            else: 
+                with open(f'{self.static_path}/{self.id}_{self.output_files[visualisation]}', 'wb') as f: 
+                    f.write(data)
@@ -8,29 +8,84 @@
 # Date           : "28 September 2020"                                     
 ###################################################################
 
+import os
+
 from flask import Flask
 from flask_wtf import CSRFProtect
 
 from webapp.routes import routes
+from visualiser.visualiser import Visualiser
+from simulator.distancematrix import DistanceMatrix
+from webapp.api import api
+from webapp.metrics import metrics
 from webapp.config import Config
+from webapp.jobs import JobQueue
+from utilities.artifactcache import ArtifactCache, MemoryArtifactCache
+from utilities.datastore import StaticDataStore
+from utilities.timing import Timings
 
-def create_app():
+def create_app(config=Config):
     """
-    Creates a basic Flask application. 
-    Uses CSRF and registers the routing blueprints.
+    Creates a basic Flask application, configured from the `config` class. 
+    Uses CSRF, creates the render job queue and the artifact cache and registers the routing blueprints.
+    Timing of the stages is process-wide, it is enabled or disabled by the METRICS setting of the last app.
+    The static data is loaded into the process-wide StaticDataStore, so it is
+    parsed before the workers fork and never on the request path. Nothing that cannot be 
+    shared by forked workers (threads, database connections) is started here, so the app 
+    can be created once in the master process of a preforking server (preload-then-fork).
+    The render jobs (and the artifacts with ARTIFACT_STORE = 'memory') are held per process, so such a server
+    needs a single worker process, or routing that sends every job id to the same worker.
+    The plotting stack is imported by the first render, or here with PRELOAD_VISUALISER.
     
     :rtype flask.app.Flask
     """
 
     # create a Flask application
     application =  Flask(__name__)
-    application.config.from_object(Config)
+    application.config.from_object(config)
 
     # CSRF is required for submitting forms (e.g. to run a simulation)
     csrf = CSRFProtect()
     csrf.init_app(application)
 
-    # register the routing blueprint
+    # the stage timers are process-wide, set before the static data is loaded so its parsing is timed too
+    Timings.enabled = application.config['METRICS']
+
+    # load the static data once, it is shared by all requests (and forked workers)
+    static_data = StaticDataStore.get(
+        berlin_bounds_file=application.config['BERLIN_BOUNDS_FILE'],
+        berlin_stops_file=application.config['BERLIN_STOPS_FILE']
+    )
+    # build the spatial index over the stops and the boundary of berlin before any request needs them
+    static_data.stop_index
+    static_data.city_boundary
+    # map the precomputed distance matrix, if there is one (python -m simulator.distancematrix)
+    DistanceMatrix.get(static_data.berlin_stops_file, static_data.get_cache_dir(static_data.berlin_stops_file))
+
+    # with a preforking server the plotting stack is imported once, before the workers fork
+    if application.config['PRELOAD_VISUALISER']:
+        Visualiser.preload()
+
+    # the simulations and visualisations are rendered by a local pool of worker threads
+    application.extensions['render_jobs'] = JobQueue(
+        workers=application.config['RENDER_WORKERS'],
+        max_jobs=application.config['MAX_RENDER_JOBS']
+    )
+
+    # the rendered artifacts are cached in the static folder or in memory, keyed by the inputs of the simulation
+    if application.config['ARTIFACT_STORE'] == 'memory':
+        application.extensions['artifact_cache'] = MemoryArtifactCache(
+            max_bytes=application.config['ARTIFACT_CACHE_BYTES']
+        )
+    else:
+        application.extensions['artifact_cache'] = ArtifactCache(
+            directory=os.path.join(application.root_path, application.static_folder),
+            max_bytes=application.config['ARTIFACT_CACHE_BYTES']
+        )
+
+    # register the routing blueprints
     application.register_blueprint(routes)
+    application.register_blueprint(api)
+    application.register_blueprint(metrics)
 
     return application
\ No newline at end of file
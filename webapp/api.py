@@ -0,0 +1,231 @@
+###################################################################
+# Script Name	 : "API.PY"
+# Description	 : Json endpoints of the python flask application,
+#                  to use the simulator without any rendering.
+# Args           :
+# Author       	 : Floris Remmen
+# Email          : floris.remmen@gmail.com
+# Date           : "18 October 2026"
+###################################################################
+
+from flask import Blueprint, current_app, request, jsonify
+
+from simulator.simulator import Simulator
+from utilities.datastore import StaticDataStore
+from utilities.bounding_box import BoundingBox
+from utilities.stoptable import StopTable
+
+import json
+import threading
+import numpy as np
+
+api = Blueprint('api', __name__, url_prefix='/api')
+
+# a trip as a GeoJSON feature: a line from the pickup to the dropoff stop. The coordinates and ids
+# (geohashes, which need no escaping) of the stops are formatted once, the features are formatted
+# from them without json.dumps.
+trip_feature = (
+    '{"type":"Feature","geometry":{"type":"LineString","coordinates":[%s,%s]},'
+    '"properties":{"role":"trip","pickup":"%s","dropoff":"%s","distance_km":%s,"distance_bin":%d}}'
+)
+
+# id(stop table) -> (stop table, json coordinates of every stop, id of every stop)
+_stop_strings = {}
+_lock = threading.Lock()
+
+class ApiError(Exception):
+    """
+    A bad request to the api, answered with status 400 and a json error message.
+    """
+
+@api.errorhandler(ApiError)
+def bad_request(error):
+    """
+    Returns the message of an ApiError as json, with status 400.
+    """
+    return jsonify(error=str(error)), 400
+
+def get_argument(name: str, dtype, default=None):
+    """
+    Returns a query argument of the request, converted to dtype.
+    Arguments without a default are required.
+    """
+    value = request.args.get(name)
+    if value is None:
+        if default is None:
+            raise ApiError(f'missing argument {name}')
+        return default
+
+    try:
+        return dtype(value)
+    except ValueError:
+        raise ApiError(f'argument {name} is not a valid {dtype.__name__}')
+
+def get_bounding_box() -> BoundingBox:
+    """
+    Returns the bounding box of the x1, y1, x2 and y2 arguments of the request.
+    :rtype utilities.bounding_box.BoundingBox
+    """
+    return BoundingBox(tuple(get_argument(name, float) for name in ('x1', 'y1', 'x2', 'y2')))
+
+def get_stop_strings(stops: StopTable) -> tuple:
+    """
+    Returns the json coordinates and the id of every stop as lists of strings.
+    They are formatted once per stop table, and shared by all requests.
+    :rtype tuple
+    """
+    cached = _stop_strings.get(id(stops))
+    if cached is None or cached[0] is not stops:
+        with _lock:
+            _stop_strings.clear()
+            cached = (
+                stops,
+                ['[%r,%r]' % point for point in zip(stops.lon.tolist(), stops.lat.tolist())],
+                stops.decoded_ids.tolist()
+            )
+            _stop_strings[id(stops)] = cached
+
+    return cached[1], cached[2]
+
+def trip_features(stops: StopTable, chunk: dict, size: int = 10000, separator: str = '\n'):
+    """
+    Yields the trips of a chunk of Simulator.generate_trips as GeoJSON features,
+    in strings of at most `size` features.
+    """
+    coordinates, ids = get_stop_strings(stops)
+
+    for start in range(0, len(chunk['pickup']), size):
+        rows = zip(
+            chunk['pickup'][start:start + size].tolist(),
+            chunk['dropoff'][start:start + size].tolist(),
+            np.round(chunk['distance'][start:start + size], 3).tolist(),
+            chunk['distance_bin'][start:start + size].tolist()
+        )
+        yield separator.join([
+            trip_feature % (coordinates[pickup], coordinates[dropoff], ids[pickup], ids[dropoff], distance, distance_bin)
+            for pickup, dropoff, distance, distance_bin in rows])
+
+def point_features(points: StopTable, role: str) -> list:
+    """
+    Returns the most popular points of a simulation as GeoJSON features.
+    :rtype list
+    """
+    return [
+        json.dumps({
+            'type': 'Feature',
+            'geometry': {'type': 'Point', 'coordinates': [lon, lat]},
+            'properties': {'role': role, 'id': identifier, 'name': name, 'count': count}
+        }, separators=(',', ':'))
+        for lon, lat, identifier, name, count in zip(
+            points.lon.tolist(), points.lat.tolist(), points.decoded_ids.tolist(),
+            points.names.tolist(), points.counts.tolist())
+    ]
+
+def result_features(results: dict) -> list:
+    """
+    Returns the most popular pickup and dropoff points of simulation results as GeoJSON features.
+    :rtype list
+    """
+    return point_features(results['most_popular_pickup_points'], 'pickup') + \
+        point_features(results['most_popular_dropoff_points'], 'dropoff')
+
+@api.route('/bbox-stats')
+def bbox_stats():
+    """
+    Returns the number of stops inside the bounding box (x1, y1, x2, y2) as json, and whether
+    the bounding box is outside of berlin. It is answered from the summed-area table of the stop index 
+    and the prepared boundary of berlin without simulating, fast enough to be called while the bounding box is typed.
+    """
+    bounding_box = get_bounding_box()
+
+    static_data = StaticDataStore.get(
+        berlin_bounds_file=current_app.config['BERLIN_BOUNDS_FILE'],
+        berlin_stops_file=current_app.config['BERLIN_STOPS_FILE']
+    )
+
+    outside_city = static_data.city_boundary is not None and \
+        static_data.city_boundary.validate(bounding_box.bounding_box) is None
+
+    return jsonify(stops=static_data.stop_index.count(bounding_box.bounding_box), outside_city=outside_city)
+
+@api.route('/simulate')
+def simulate():
+    """
+    Runs a simulation without rendering it. The arguments are the bounding box (x1, y1, x2, y2),
+    number_of_requests and an optional seed. The results are the same as those of the visualisations.
+
+    Every trip is a LineString feature, every most popular pickup/dropoff point a Point feature.
+    Up to API_GEOJSON_MAX_REQUESTS requests the results are a GeoJSON FeatureCollection, with the
+    booking distance bins as a member. Above it (or with format=ndjson) the features are streamed
+    as newline delimited json while they are simulated, followed by a line with the booking distance bins.
+
+    A bounding box outside of berlin is rejected, one that reaches outside of it is clipped to its part
+    within berlin (CLIP_TO_CITY). The simulated bounding box is a member of the results.
+    """
+    bounding_box = get_bounding_box()
+    number_of_requests = get_argument('number_of_requests', int)
+    seed = get_argument('seed', int, default=0)
+
+    if not 0 < number_of_requests <= current_app.config['API_MAX_REQUESTS']:
+        raise ApiError(f"number_of_requests must be between 1 and {current_app.config['API_MAX_REQUESTS']}")
+    if seed < 0:
+        raise ApiError('seed must not be negative')
+
+    geojson_max_requests = current_app.config['API_GEOJSON_MAX_REQUESTS']
+    output_format = get_argument('format', str,
+        default='geojson' if number_of_requests <= geojson_max_requests else 'ndjson')
+    if output_format not in ('geojson', 'ndjson'):
+        raise ApiError('format must be geojson or ndjson')
+    if output_format == 'geojson' and number_of_requests > geojson_max_requests:
+        raise ApiError(f'geojson is limited to {geojson_max_requests} requests, use format=ndjson')
+
+    # Get the static data from the process-wide store. It is only re-read when the files change.
+    static_data = StaticDataStore.get(
+        berlin_bounds_file=current_app.config['BERLIN_BOUNDS_FILE'],
+        berlin_stops_file=current_app.config['BERLIN_STOPS_FILE']
+    )
+    if static_data.city_boundary is not None:
+        clipped = static_data.city_boundary.validate(bounding_box.bounding_box, clip=current_app.config['CLIP_TO_CITY'])
+        if clipped is None:
+            raise ApiError('the bounding box is outside of berlin')
+        bounding_box = BoundingBox(clipped)
+
+    simulator = Simulator(
+        bounding_box = bounding_box.bounding_box,
+        path_to_stops = current_app.config['BERLIN_STOPS_FILE'],
+        static_data = static_data,
+        demand_weights = current_app.config.get('DEMAND_WEIGHTS_FILE')
+    )
+    stops = static_data.berlin_stops
+
+    def stream():
+        # the trips are encoded chunk by chunk while the simulator generates them
+        trip_counts = simulator.new_trip_counts()
+        for chunk in simulator.stream_trips(number_of_requests, seed, trip_counts):
+            for features in trip_features(stops, chunk):
+                yield features + '\n'
+
+        results = simulator.get_trip_results(trip_counts)
+        for feature in result_features(results):
+            yield feature + '\n'
+        yield json.dumps({
+            'bounding_box': list(bounding_box.bounding_box), 
+            'booking_distance_bins': results['booking_distance_bins']
+        }) + '\n'
+
+    if output_format == 'ndjson':
+        return current_app.response_class(stream(), mimetype='application/x-ndjson')
+
+    trip_counts = simulator.new_trip_counts()
+    features = [
+        features
+        for chunk in simulator.stream_trips(number_of_requests, seed, trip_counts)
+        for features in trip_features(stops, chunk, size=number_of_requests, separator=',')]
+    results = simulator.get_trip_results(trip_counts)
+
+    body = '{"type":"FeatureCollection","bounding_box":%s,"booking_distance_bins":%s,"features":[%s]}' % (
+        json.dumps(list(bounding_box.bounding_box)),
+        json.dumps(results['booking_distance_bins']),
+        ','.join(features + result_features(results)))
+
+    return current_app.response_class(body, mimetype='application/geo+json')
@@ -19,3 +19,35 @@ class Config:
 
     BERLIN_BOUNDS_FILE = 'data/berlin_bounds.poly'
     BERLIN_STOPS_FILE = 'data/berlin_stops.geojson'
+
+    # optional csv file with `id` and `weight` columns, the demand prior of the stops
+    DEMAND_WEIGHTS_FILE = None
+
+    # Bounding boxes outside of berlin are always rejected. Boxes that reach outside of it are clipped to their 
+    # part within berlin, or simulated as they are without CLIP_TO_CITY.
+    CLIP_TO_CITY = True
+
+    # whether the figures are drawn on a basemap. Without a local tile store (python -m visualiser.tilestore) this needs network access
+    BASEMAP = True
+
+    # whether the plotting stack is imported when the app is created instead of by the first render. 
+    # Set it with a preforking server (e.g. gunicorn --preload), the workers then share the imported modules.
+    PRELOAD_VISUALISER = False
+
+    # number of threads that render simulations in the background, and how many jobs are remembered.
+    # The jobs are held by the process that queued them, so their status is not shared between worker processes.
+    RENDER_WORKERS = 2
+    MAX_RENDER_JOBS = 256
+
+    # where the rendered artifacts are kept: 'disk' (the static folder) or 'memory' (served by the artifact route, 
+    # for instances without a shared or writable disk), and the budget of the least recently used results
+    ARTIFACT_STORE = 'disk'
+    ARTIFACT_CACHE_BYTES = 256 * 1024 * 1024
+
+    # whether the stages of the reader, simulator and visualiser are timed: histograms on /metrics (Prometheus)
+    # and a Server-Timing header on every response. Disabled, the timers do nothing.
+    METRICS = False
+
+    # the simulation api returns geojson up to API_GEOJSON_MAX_REQUESTS requests and streams ndjson above it
+    API_GEOJSON_MAX_REQUESTS = 10000
+    API_MAX_REQUESTS = 10000000
@@ -9,7 +9,7 @@
 
 from wtforms import SubmitField, IntegerField, FloatField
 from flask_wtf import FlaskForm, CSRFProtect
-from wtforms.validators import DataRequired
+from wtforms.validators import DataRequired, Optional, NumberRange
 
 class TriggerForm(FlaskForm): 
     """
@@ -29,6 +29,13 @@ class TriggerForm(FlaskForm):
         validators=[DataRequired()]
     )
 
+    # Seed of the simulation. The same inputs and seed always give the same (cached) results. Not negative
+    seed_field = IntegerField(
+        "Seed",
+        default=0,
+        validators=[Optional(), NumberRange(min=0)]
+    )
+
     # Submit field
     submit = SubmitField(
         "Trigger Simulator & Visualise Results"
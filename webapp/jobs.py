@@ -0,0 +1,129 @@
+###################################################################
+# Script Name	 : "JOBS.PY"
+# Description	 : Class definitions for the asynchronous render
+#                  job queue of the flask application.
+# Args           :
+# Author       	 : Floris Remmen
+# Email          : floris.remmen@gmail.com
+# Date           : "18 October 2026"
+###################################################################
+
+import secrets
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from utilities.timing import Timings
+
+class RenderJob:
+    """
+    A simulation and its visualisations, rendered in the background.
+    The job moves from `queued` to `running` to `done` or `failed`. Every artifact
+    is registered as soon as it is written, so it can be shown before the job is done.
+    """
+
+    # the artifacts of a job, in the order they are rendered
+    artifacts = ('overview', 'closeup', 'gmap')
+
+    def __init__(self, job_id: str):
+        self.id = job_id
+        self.state = 'queued'
+        self.error = None
+
+        # artifact -> name of its output file
+        self.completed = {}
+
+        # stage -> summed duration, of the stages that are timed while the job runs
+        self.timings = {}
+
+    def __repr__(self):
+        return f"RenderJob {self.id} ({self.state})"
+
+    @property
+    def finished(self) -> bool:
+        """
+        True if the job is done or failed.
+        :rtype bool
+        """
+        return self.state in ('done', 'failed')
+
+    def complete(self, artifact: str, filename: str):
+        """
+        Registers a rendered artifact of the job.
+        """
+        self.completed[artifact] = filename
+
+class JobQueue:
+    """
+    Runs render jobs in a local pool of worker threads.
+    The rendering holds no global state, so jobs can run concurrently. The queue keeps
+    the most recent `max_jobs` jobs, older finished jobs are forgotten.
+    """
+
+    def __init__(self, workers: int = 2, max_jobs: int = 256):
+        self.workers = workers
+        self.max_jobs = max_jobs
+
+        # the threads are only started by the first job, so the queue can be created before forking
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='render')
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"JobQueue with {self.workers} workers and {len(self._jobs)} jobs."
+
+    def submit(self, function, *args, job_id: str = None) -> RenderJob:
+        """
+        Queues function(job, *args) and returns the job immediately.
+        A job that is submitted with the id of a job that is still queued or running is not 
+        run twice, the existing job is returned instead.
+        :rtype webapp.jobs.RenderJob
+        """
+        job = RenderJob(job_id or secrets.token_hex(8))
+
+        with self._lock:
+            existing = self._jobs.get(job.id)
+            if existing is not None and not existing.finished:
+                return existing
+
+            self._jobs.pop(job.id, None)
+            self._jobs[job.id] = job
+            # forget the oldest finished jobs
+            for old_job in [old_job for old_job in self._jobs.values() if old_job.finished][:max(0, len(self._jobs) - self.max_jobs)]:
+                del self._jobs[old_job.id]
+
+        self._pool.submit(self._run, job, function, args)
+
+        return job
+
+    def get(self, job_id: str) -> RenderJob:
+        """
+        Returns the job with the given id, or None if it does not exist (anymore).
+        :rtype webapp.jobs.RenderJob
+        """
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def active(self) -> set:
+        """
+        Returns the ids of the jobs that are queued or running.
+        :rtype set
+        """
+        with self._lock:
+            return {job.id for job in self._jobs.values() if not job.finished}
+
+    @staticmethod
+    def _run(job: RenderJob, function, args):
+        """
+        Runs a job in a worker thread. Errors are stored with the job, as are the durations of its stages.
+        """
+        job.state = 'running'
+        try:
+            with Timings.collect(job.timings):
+                function(job, *args)
+            job.state = 'done'
+        except Exception as error:
+            logging.getLogger(__name__).exception(f"{job} failed")
+            job.error = str(error)
+            job.state = 'failed'
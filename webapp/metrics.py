@@ -0,0 +1,67 @@
+###################################################################
+# Script Name	 : "METRICS.PY"
+# Description	 : Prometheus metrics endpoint and Server-Timing
+#                  headers of the python flask application.
+# Args           :
+# Author       	 : Floris Remmen
+# Email          : floris.remmen@gmail.com
+# Date           : "18 October 2026"
+###################################################################
+
+from flask import Blueprint, abort, g, request, current_app
+
+from utilities.timing import Timings
+
+import time
+
+metrics = Blueprint('metrics', __name__)
+
+@metrics.before_app_request
+def start_timings():
+    """
+    Starts collecting the durations of the stages of a request, if timing is enabled.
+    """
+    if not Timings.enabled:
+        return
+
+    g.timings = {}
+    g.timings_token = Timings.start(g.timings)
+    g.timings_start = time.perf_counter()
+
+@metrics.after_app_request
+def add_server_timing(response):
+    """
+    Adds the durations of the stages of a request to its Server-Timing header, with the total
+    duration of the request. The total is also added to the histogram of its endpoint.
+    A streamed response is only timed until its body starts.
+    """
+    token = g.pop('timings_token', None)
+    if token is None:
+        return response
+
+    total = time.perf_counter() - g.timings_start
+    Timings.stop(token)
+
+    Timings.observe(f"request.{request.endpoint or 'unknown'}", total)
+    response.headers['Server-Timing'] = Timings.server_timing(dict(g.timings, total=total))
+    return response
+
+@metrics.teardown_app_request
+def stop_timings(error=None):
+    """
+    Stops collecting the durations of a request that failed before its response.
+    """
+    token = g.pop('timings_token', None)
+    if token is not None:
+        Timings.stop(token)
+
+@metrics.route('/metrics')
+def prometheus():
+    """
+    Returns the histograms of the durations of the stages in the Prometheus text format.
+    Not found if timing is disabled.
+    """
+    if not Timings.enabled:
+        abort(404)
+
+    return current_app.response_class(Timings.prometheus(), mimetype='text/plain; version=0.0.4')
@@ -8,28 +8,43 @@
 # Date           : "28 September 2020"                                     
 ###################################################################
 
-from flask import (Flask, render_template, request, 
+from flask import (Flask, render_template, request, abort, jsonify, 
                     redirect, url_for, Blueprint, current_app)
 
 from webapp.forms import TriggerForm
 from simulator.simulator import Simulator
 from visualiser.visualiser import Visualiser
-from utilities.cleanup import Cleaner
-from utilities.staticdatareader import StaticDataReader
+from utilities.datastore import StaticDataStore
 from utilities.bounding_box import BoundingBox
+from utilities.artifactcache import MemoryArtifactCache
+from utilities.timing import Timings
 
 import os
-import random 
+import mimetypes
 
 routes = Blueprint('routes', __name__)
 
+# the output file of every artifact of a render job, prefixed with the job id
+artifact_files = Visualiser.output_files
+
+def artifact_url(job_id: str, filename: str) -> str: 
+    """
+    Returns the url of an artifact: the artifact route if the artifacts are held in memory, 
+    otherwise the file in the static folder.
+    :rtype str
+    """
+    if isinstance(current_app.extensions['artifact_cache'], MemoryArtifactCache): 
+        return url_for('routes.artifact', job_id=job_id, filename=filename)
+
+    return url_for('static', filename=f'{job_id}_{filename}')
+
 @routes.route('/', methods=['GET', 'POST'])
 def trigger_page():
     """
     Renders the trigger page. This page contains an instance of a TriggerForm.
     The TriggerForm contains input fields for the simulation. If the submit
-    button is pressed, a simulation is triggered and the results are generated
-    using the Visualiser class. If all succeeds, forward to endpoint "visualise"
+    button is pressed, a simulation is queued and the results are generated
+    in the background using the Visualiser class. Forwards to endpoint "visualise" immediately.
     """
     form = TriggerForm() 
 
@@ -39,68 +54,183 @@ def trigger_page():
         # get the static path from the current application to store the visualisations
         static_path = os.path.join(current_app.root_path, current_app.static_folder)
 
-        # clean up the previous simulation results
-        Cleaner().remove_previous_simulation_results(static_path=static_path)
-
-        # retrieve number of requests from the form
+        # retrieve number of requests and the seed from the form
         number_of_requests = form.number_of_requests_field.data
+        seed = form.seed_field.data or 0
 
-        # Create an instance of the bounding box class, using the form data
-        bounding_box = BoundingBox(
-            (
-            form.x1_field.data, 
-            form.y1_field.data, 
-            form.x2_field.data, 
-            form.y2_field.data
-            )
-        )
-
-        # Create an instance of the StaticDataReader class.
-        static_data = StaticDataReader(
+        # Get the static data from the process-wide store. It is only re-read when the files change.
+        static_data = StaticDataStore.get(
             berlin_bounds_file=current_app.config['BERLIN_BOUNDS_FILE'], 
             berlin_stops_file=current_app.config['BERLIN_STOPS_FILE']
         ) 
 
-        # Create an instance of the Simulator class.
-        simulator = Simulator(
-            bounding_box = bounding_box.bounding_box, 
-            path_to_stops=current_app.config['BERLIN_STOPS_FILE']
+        # The bounding box of the form, checked against the boundary of berlin before anything is simulated. 
+        # A box outside of berlin is an error of the form, a box that reaches outside of it is clipped.
+        bounding_box = (form.x1_field.data, form.y1_field.data, form.x2_field.data, form.y2_field.data)
+        if static_data.city_boundary is not None: 
+            bounding_box = static_data.city_boundary.validate(bounding_box, clip=current_app.config['CLIP_TO_CITY'])
+        if bounding_box is None: 
+            for field in (form.x1_field, form.y1_field, form.x2_field, form.y2_field): 
+                field.errors.append('The bounding box is outside of Berlin.')
+            return render_template('trigger_page.html', title="MI Code Challenge", form=form)
+
+        # Create an instance of the bounding box class
+        bounding_box = BoundingBox(bounding_box)
+
+        # The results are identified by everything that determines them, including the version of the data files. 
+        # Repeated inputs map to the same job and artifacts, so they are only simulated and rendered once.
+        data_files = (
+            current_app.config['BERLIN_BOUNDS_FILE'], 
+            current_app.config['BERLIN_STOPS_FILE'], 
+            current_app.config.get('DEMAND_WEIGHTS_FILE')
         )
-        # Run a simulation
-        simulation_results = simulator.simulate(number_of_requests)
-
-        # Create an instance of the Visualiser class.
-        visualiser = Visualiser(
-            bounding_box = bounding_box, 
-            simulation_results = simulation_results, 
-            static_path = static_path,
-            static_data = static_data
+        artifact_cache = current_app.extensions['artifact_cache']
+        key = artifact_cache.key(
+            bounding_box.bounding_box, 
+            number_of_requests, 
+            seed, 
+            data_files, 
+            StaticDataStore.version(*[f for f in data_files if f]), 
+            current_app.config['BASEMAP']
+        )
+
+        # the artifacts are cached from an earlier request, there is nothing to render
+        if artifact_cache.lookup(key, artifact_files.values()): 
+            return redirect(url_for('routes.visualise', job_id = key))
+
+        # Queue the simulation and its visualisations. The worker has no application context, 
+        # so everything it needs from the configuration is passed along.
+        job_queue = current_app.extensions['render_jobs']
+        job = job_queue.submit(
+            render_simulation, 
+            bounding_box, 
+            number_of_requests, 
+            seed, 
+            static_data, 
+            static_path, 
+            artifact_cache, 
+            current_app.config['BERLIN_STOPS_FILE'], 
+            current_app.config.get('DEMAND_WEIGHTS_FILE'), 
+            current_app.config['BASEMAP'], 
+            job_id = key
         )
 
-        # Generate visualisations
-        visualiser.generate_overview_figure()
-        visualiser.generate_closeup_figure()
-        visualiser.generate_gmap()
+        # keep the cache within its budget, without removing the results of jobs that are still rendering
+        artifact_cache.evict(protected=job_queue.active())
         
-        # redirect to the visualise endpoint
-        return redirect(url_for('routes.visualise', visualiser_id = visualiser.id))
+        # redirect to the visualise endpoint, which shows the results as they are rendered
+        return redirect(url_for('routes.visualise', job_id = job.id))
 
     # render a template for the trigger page.
     return render_template('trigger_page.html', title="MI Code Challenge", form=form)
 
-@routes.route('/visualise/<int:visualiser_id>')
-def visualise(visualiser_id):
+def render_simulation(job, bounding_box, number_of_requests, seed, static_data, static_path, artifact_cache, path_to_stops, demand_weights, basemap=True): 
     """
-    Renders a page with generated images.
-    The image is made prior to this route, and an ID is prepended to the filename.
-    The id is passed as a parameter.
-    :type visualiser_id: int
+    Runs a simulation and generates its visualisations, in a worker thread of the job queue.
+    The visualisations are put in the artifact cache, on disk or in memory. Every visualisation 
+    is registered with the job as soon as it is stored.
     """
+    # Create an instance of the Simulator class.
+    simulator = Simulator(
+        bounding_box = bounding_box.bounding_box, 
+        path_to_stops=path_to_stops,
+        static_data=static_data,
+        demand_weights=demand_weights
+    )
+    # Run a simulation
+    simulation_results = simulator.simulate(number_of_requests, seed=seed)
+
+    # Create an instance of the Visualiser class, identified by the job.
+    visualiser = Visualiser(
+        bounding_box = bounding_box, 
+        simulation_results = simulation_results, 
+        static_path = static_path,
+        static_data = static_data, 
+        identifier = job.id, 
+        store = artifact_cache, 
+        basemap = basemap
+    )
+
+    # Generate visualisations
+    visualiser.generate_overview_figure()
+    job.complete('overview', artifact_files['overview'])
+    visualiser.generate_closeup_figure()
+    job.complete('closeup', artifact_files['closeup'])
+    visualiser.generate_gmap()
+    job.complete('gmap', artifact_files['gmap'])
+
+@routes.route('/visualise/<job_id>')
+def visualise(job_id):
+    """
+    Renders a page for the visualisations of a render job.
+    The page polls the job status endpoint and shows every visualisation once it is rendered.
+    :type job_id: str
+    """
+    if current_app.extensions['render_jobs'].get(job_id) is None and not \
+            current_app.extensions['artifact_cache'].lookup(job_id, artifact_files.values()): 
+        abort(404)
 
     return render_template('visualise.html',
-            overview_image_url= url_for('static', filename=f'{visualiser_id}_overview_plot.png'), 
-            closeup_image_url=url_for('static', filename=f'{visualiser_id}_closeup_plot.png'),
-            gmap_url=url_for('static', filename=f'{visualiser_id}_map.html'))
+            status_url=url_for('routes.job_status', job_id=job_id))
+
+@routes.route('/jobs/<job_id>')
+def job_status(job_id): 
+    """
+    Returns the status of a render job as json: its state, an error message if it failed, 
+    and the url of every visualisation that is already rendered and still cached.
+    Cached results are done, also when their job is no longer known. Not found if neither 
+    the job nor its results are known, or if its results were evicted.
+    The durations of the stages of the job so far are added to the Server-Timing header.
+    :type job_id: str
+    """
+    job = current_app.extensions['render_jobs'].get(job_id)
+    if job is None: 
+        if not current_app.extensions['artifact_cache'].lookup(job_id, artifact_files.values()): 
+            abort(404)
+
+        return jsonify(
+            state='done', 
+            error=None, 
+            artifacts={
+                artifact: artifact_url(job_id, filename) 
+                for artifact, filename in artifact_files.items()}
+        )
+
+    # only artifacts that are still in the cache are shown. A finished job whose artifacts 
+    # were evicted since is gone, like a forgotten job.
+    artifact_cache = current_app.extensions['artifact_cache']
+    completed = {
+        artifact: filename for artifact, filename in dict(job.completed).items() 
+        if artifact_cache.lookup(job.id, (filename,))}
+    if job.state == 'done' and len(completed) < len(job.artifacts): 
+        abort(404)
+
+    Timings.add({f'job.{stage}': seconds for stage, seconds in dict(job.timings).items()})
+
+    return jsonify(
+        state=job.state, 
+        error=job.error, 
+        artifacts={
+            artifact: artifact_url(job.id, completed[artifact]) if artifact in completed else None
+            for artifact in job.artifacts}
+    )
+
+@routes.route('/artifacts/<job_id>/<filename>')
+def artifact(job_id, filename): 
+    """
+    Serves an artifact straight from the in-memory artifact cache, with the content type of its file name.
+    Artifacts never change once they are rendered, so clients may cache them indefinitely.
+    :type job_id: str
+    :type filename: str
+    """
+    data = current_app.extensions['artifact_cache'].get(job_id, filename)
+    if data is None: 
+        abort(404)
+
+    response = current_app.response_class(data, mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+    response.cache_control.public = True
+    response.cache_control.max_age = 31536000
+    return response
 
 @routes.before_request
 def before_request():